@@ -0,0 +1,6 @@
+"""Shared helpers for the verification modules in ``verifications/``.
+
+Checker modules add their own directory to ``sys.path`` and import from this
+package, so it must be deployed next to ``module_<n>.py``. Anything cached at
+module level here is shared by every verification running in the same process.
+"""
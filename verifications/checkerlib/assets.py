@@ -0,0 +1,135 @@
+"""Process-wide cache of overlay sprites (flags, cones, minerals).
+
+Sprites are decoded, resized and masked once per process and then shared by
+every verification run. Returned arrays are read-only; copy them before
+drawing on them.
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+from .cache import LRUCache
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Search order used by the checkers: deployed test assets first, repo copy second.
+DEFAULT_SEARCH = ("auto_tests/images", "images")
+
+# Green backdrop of flag_finish.jpg.
+FLAG_KEY = ((0, 240, 0), (50, 255, 50))
+# Green backdrop of traffic-sign.jpg (cones, zone markers).
+CONE_KEY = ((0, 240, 0), (35, 255, 35))
+
+MAX_ENTRIES = 32
+
+_cache = LRUCache(MAX_ENTRIES)
+
+
+def memoize(key, build):
+    """Return the cached value for ``key``, calling ``build()`` on a miss."""
+    return _cache.get_or_build(key, build)
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def find_asset(name, search=DEFAULT_SEARCH):
+    """Return the first existing path for ``name`` in ``search`` or None."""
+    for folder in search:
+        path = os.path.join(BASE_DIR, folder, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _freeze(*arrays):
+    for array in arrays:
+        array.flags.writeable = False
+    return arrays
+
+
+def _resize(img, scale, size):
+    if size is not None:
+        return cv2.resize(img, size)
+    if scale != 1:
+        # round() keeps int(w * (1 / 3)) equal to the legacy int(w / 3)
+        width = int(round(img.shape[1] * scale, 6))
+        height = int(round(img.shape[0] * scale, 6))
+        return cv2.resize(img, (width, height))
+    return img
+
+
+def keyed_sprite(name, scale=1, size=None, key_range=FLAG_KEY,
+                 search=DEFAULT_SEARCH, placeholder=None, warn=True):
+    """Load ``name`` and mask out its chroma-key backdrop.
+
+    ``size`` (w, h) wins over ``scale``. When the file is missing the image
+    returned by ``placeholder()`` is used instead, with a printed warning
+    unless ``warn`` is False; without a placeholder the result is None.
+    Returns ``(sprite, mask)``.
+    """
+    key = ("keyed", name, scale, size,
+           tuple(map(tuple, key_range)), tuple(search))
+
+    def build():
+        path = find_asset(name, search)
+        img = cv2.imread(path) if path else None
+        if img is None:
+            if placeholder is None:
+                return None
+            if warn:
+                print(f"Warning: {name} not found, using placeholder")
+            img = placeholder()
+        img = _resize(img, scale, size)
+        lower, upper = (np.array(bound) for bound in key_range)
+        mask = cv2.bitwise_not(cv2.inRange(img, lower, upper))
+        return _freeze(img, mask)
+
+    return memoize(key, build)
+
+
+def tinted_sprite(name, color, **kwargs):
+    """Solid ``color`` variant of ``keyed_sprite`` (the green "hit" flag)."""
+    key = ("tinted", name, tuple(color), tuple(sorted(kwargs.items(), key=lambda kv: kv[0])))
+
+    def build():
+        base = keyed_sprite(name, **kwargs)
+        if base is None:
+            return None
+        sprite, mask = base
+        tinted = sprite.copy()
+        tinted[mask > 0] = color
+        return _freeze(tinted, mask)
+
+    return memoize(key, build)
+
+
+def luma_sprite(name, scale=1, size=None, threshold=10, alpha=False,
+                search=("images",)):
+    """Load a sprite whose transparent parts are black (or alpha when ``alpha``).
+
+    Returns ``(bgr, mask)`` or None when the file is missing.
+    """
+    key = ("luma", name, scale, size, threshold, alpha, tuple(search))
+
+    def build():
+        path = find_asset(name, search)
+        flags = cv2.IMREAD_UNCHANGED if alpha else cv2.IMREAD_COLOR
+        img = cv2.imread(path, flags) if path else None
+        if img is None:
+            return None
+        img = _resize(img, scale, size)
+        if img.ndim == 3 and img.shape[2] == 4:
+            bgr = np.ascontiguousarray(img[:, :, :3])
+            _, mask = cv2.threshold(img[:, :, 3], 1, 255, cv2.THRESH_BINARY)
+        else:
+            bgr = img
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            _, mask = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)
+        return _freeze(bgr, mask)
+
+    return memoize(key, build)
@@ -0,0 +1,250 @@
+"""Per-frame latency benchmark of every checker.
+
+Every task listed in a module's ``target_points`` is replayed (see
+``checkerlib.replay``) over synthetic 1280x960 frames. The robot follows a
+scripted loop that starts at the task's start point and heading, and a
+steady stream of typical robot messages arrives while it drives. Two
+passes are made per checker:
+
+* timing pass: p50 / p95 / p99 / max of the time spent inside the checker;
+* allocation pass (``tracemalloc``): peak and net bytes allocated per frame.
+
+The JSON report is meant to be kept and diffed between commits::
+
+    cd verifications
+    python -m checkerlib.bench --out bench.json
+    python -m checkerlib.bench --out new.json --compare bench.json
+
+Nothing is displayed, so it runs on a headless box.
+"""
+
+import argparse
+import functools
+import importlib
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from .replay import load_task, replay
+
+
+MODULES = [
+    "module_0", "module_1", "module_2", "module_3", "module_4", "module_5",
+    "module_6", "module_7", "module_8", "module_9", "module_11",
+]
+
+FRAME_SIZE = (1280, 960)
+FPS = 15.0
+PX_PER_CM = 10.0
+
+LOOP_RADIUS_CM = 20.0
+SPEED_CM_S = 6.0
+MESSAGE_PERIOD_S = 0.2
+# every LOST_MARKER_EVERY-th frame the marker is not detected
+LOST_MARKER_EVERY = 37
+
+MESSAGES = [
+    "Mission Start!", "Error: 12", "Distance: 12.5", "Scan - R:10 G:20 B:30",
+    "Found: RED | Raw Data: R:200 G:10 B:10", "Red (Raw: R:200 G:10 B:10)",
+    "Green: led on", "KICK", "Charging: 40", "STATUS: speed=40;battery=80",
+    "Sector #1", "Complete",
+]
+
+
+def synthetic_frame(size=FRAME_SIZE, seed=0):
+    """Textured floor with a black line loop and colour patches."""
+    w, h = size
+    rng = np.random.default_rng(seed)
+    frame = rng.normal(150, 12, (h, w, 3)).clip(0, 255).astype(np.uint8)
+    cv2.ellipse(frame, (w // 2, h // 2), (w // 3, h // 3), 0, 0, 360, (20, 20, 20), 18)
+    cv2.line(frame, (w // 6, h // 2), (5 * w // 6, h // 2), (20, 20, 20), 18)
+    for i, color in enumerate([(40, 40, 200), (40, 200, 40), (200, 40, 40), (40, 200, 200)]):
+        x = w // 8 + i * w // 5
+        cv2.rectangle(frame, (x, h // 8), (x + 90, h // 8 + 90), color, -1)
+    return frame
+
+
+def scripted_poses(start, heading, frames, fps=FPS):
+    """A circular loop through ``start`` (cm), tangent to ``heading`` (dx, dy)."""
+    hx, hy = heading
+    norm = math.hypot(hx, hy) or 1.0
+    hx, hy = hx / norm, hy / norm
+    # centre on the left of the heading so the loop starts along it
+    cx, cy = start[0] + hy * LOOP_RADIUS_CM, start[1] - hx * LOOP_RADIUS_CM
+    phase0 = math.atan2(start[1] - cy, start[0] - cx)
+    omega = SPEED_CM_S / LOOP_RADIUS_CM
+    poses = []
+    for i in range(frames):
+        t = i / fps
+        if i % LOST_MARKER_EVERY == LOST_MARKER_EVERY - 1:
+            poses.append({"t": t, "position": None})
+            continue
+        phase = phase0 - omega * t
+        x = cx + LOOP_RADIUS_CM * math.cos(phase)
+        y = cy + LOOP_RADIUS_CM * math.sin(phase)
+        angle = math.degrees(math.atan2(-math.cos(phase), math.sin(phase))) % 360
+        poses.append({"t": t, "position": [x, y], "angle": angle})
+    return poses
+
+
+def scripted_messages(frames, fps=FPS):
+    count = int(frames / fps / MESSAGE_PERIOD_S)
+    return [{"t": i * MESSAGE_PERIOD_S, "msg": MESSAGES[i % len(MESSAGES)]}
+            for i in range(count)]
+
+
+def discover(modules=MODULES):
+    """``module.task`` for every task in the modules' ``target_points``."""
+    specs = []
+    for name in modules:
+        module = importlib.import_module(name)
+        for task in getattr(module, "target_points", {}):
+            if callable(getattr(module, task, None)):
+                specs.append(f"{name}.{task}")
+    return specs
+
+
+def _percentiles(samples):
+    ms = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def _traced(task, peaks, nets):
+    @functools.wraps(task)
+    def wrapper(robot, image, td, user_code):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        out = task(robot, image, td, user_code)
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        nets.append(current - before)
+        return out
+    return wrapper
+
+
+def bench_task(spec, frames=300, alloc_frames=60, user_code="", seed=0):
+    task = load_task(spec)
+    module = sys.modules[task.__module__]
+    start, heading = module.target_points[task.__name__]
+    poses = scripted_poses(start, heading, frames)
+    messages = scripted_messages(frames)
+    base = synthetic_frame(seed=seed)
+
+    def frames_iter(n):
+        for _ in range(n):
+            yield base.copy()
+
+    run = replay(task, frames_iter(frames), poses, messages, user_code, fps=FPS,
+                 px_per_cm=PX_PER_CM, stop_on_verdict=False)
+    entry = {"frames": run.frames}
+    entry.update(_percentiles(run.frame_times))
+    entry["success"] = bool(run.result and run.result.get("success"))
+
+    peaks, nets = [], []
+    tracemalloc.start()
+    try:
+        replay(_traced(task, peaks, nets), frames_iter(alloc_frames), poses, messages,
+               user_code, fps=FPS, px_per_cm=PX_PER_CM, stop_on_verdict=False)
+    finally:
+        tracemalloc.stop()
+    entry["alloc_peak_kb"] = round(max(peaks) / 1024, 1)
+    # the first frame builds td and caches; steady state is what matters
+    steady = peaks[1:] or peaks
+    entry["alloc_peak_steady_kb"] = round(max(steady) / 1024, 1)
+    entry["alloc_mean_kb"] = round(sum(steady) / len(steady) / 1024, 1)
+    entry["retained_kb"] = round(sum(nets) / 1024, 1)
+    return entry
+
+
+def run_suite(specs, frames=300, alloc_frames=60, user_code=""):
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "frame_size": list(FRAME_SIZE),
+            "frames": frames,
+            "alloc_frames": alloc_frames,
+        },
+        "checkers": {},
+    }
+    for spec in specs:
+        try:
+            report["checkers"][spec] = bench_task(spec, frames, alloc_frames, user_code)
+        except Exception as e:
+            report["checkers"][spec] = {"error": f"{type(e).__name__}: {e}"}
+    return report
+
+
+def compare(old, new, key="p95_ms"):
+    """Rows of (checker, old, new, ratio) for ``key``, worst regression first."""
+    rows = []
+    for spec, entry in new["checkers"].items():
+        before = old["checkers"].get(spec, {}).get(key)
+        after = entry.get(key)
+        if before is None or after is None:
+            continue
+        rows.append((spec, before, after, after / before if before else math.inf))
+    rows.sort(key=lambda row: -row[3])
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-frame latency benchmark of the checkers.")
+    parser.add_argument("--only", nargs="*", help="modules or module.task specs to run")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--alloc-frames", type=int, default=60)
+    parser.add_argument("--code", help="file with learner code passed to every checker")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to compare p95 against")
+    args = parser.parse_args(argv)
+
+    if args.only:
+        modules = [s for s in args.only if "." not in s]
+        specs = [s for s in args.only if "." in s] + (discover(modules) if modules else [])
+    else:
+        specs = discover()
+    user_code = ""
+    if args.code:
+        with open(args.code, encoding="utf-8") as f:
+            user_code = f.read()
+
+    report = run_suite(specs, args.frames, args.alloc_frames, user_code)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    print(f"{'checker':45} {'p50':>8} {'p95':>8} {'p99':>8} {'peak kB':>9}")
+    for spec, entry in report["checkers"].items():
+        if "error" in entry:
+            print(f"{spec:45} {entry['error']}")
+            continue
+        print(f"{spec:45} {entry['p50_ms']:8.2f} {entry['p95_ms']:8.2f} "
+              f"{entry['p99_ms']:8.2f} {entry['alloc_peak_steady_kb']:9.1f}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        print("\np95 change (new / old):")
+        for spec, before, after, ratio in compare(old, report):
+            print(f"{spec:45} {before:8.2f} -> {after:8.2f}  x{ratio:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Checkpoint placement on a printed line track, cached per track layout.
+
+The track under the camera does not change between verifications, so the
+adaptive threshold / morphology / contour work that places the checkpoints
+is done once per layout. A layout is recognised by an average hash of the
+region of interest: frames whose hashes differ by at most
+``MAX_HASH_DISTANCE`` bits (lighting, the robot standing on the paper) reuse
+the same checkpoints.
+"""
+
+import threading
+
+import cv2
+import numpy as np
+
+
+HASH_SIZE = 16
+MAX_HASH_DISTANCE = 12
+# layouts remembered per (cells, roi) key
+MAX_LAYOUTS = 8
+
+GRID_ROWS = 3
+GRID_COLS = 4
+MIN_CONTOUR_AREA = 800
+
+_OPEN_KERNEL = np.ones((7, 7), np.uint8)
+
+_layouts = {}
+_lock = threading.Lock()
+
+
+def average_hash(image, size=HASH_SIZE):
+    """``size * size`` bits: pixel brighter than the mean of the thumbnail."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    thumb = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+    return np.packbits(thumb > thumb.mean())
+
+
+def hash_distance(a, b):
+    return int(np.unpackbits(np.bitwise_xor(a, b)).sum())
+
+
+def nearest_point(points, target):
+    """Row of ``points`` (N x 2) closest to ``target``; the first one on ties."""
+    d = (points[:, 0] - target[0]) ** 2 + (points[:, 1] - target[1]) ** 2
+    return points[int(np.argmin(d))]
+
+
+def extract_checkpoints(image, cell_indices, roi):
+    """Checkpoints ``(y, x)`` on the line, one per listed grid cell that has one.
+
+    ``roi`` is ``(top, bottom, left, right)``; it is split into a 3x4 grid and
+    in each requested cell the line point nearest to the cell centre wins.
+    """
+    top, bottom, left, right = roi
+    roi_img = image[top:bottom, left:right]
+    roi_h, roi_w = roi_img.shape[:2]
+    cell_h = roi_h // GRID_ROWS
+    cell_w = roi_w // GRID_COLS
+    cell_center = (cell_w // 2, cell_h // 2)
+
+    positions = []
+    for cell_index in cell_indices:
+        row = cell_index // GRID_COLS
+        col = cell_index % GRID_COLS
+        y1 = row * cell_h
+        y2 = (row + 1) * cell_h if row < GRID_ROWS - 1 else roi_h
+        x1 = col * cell_w
+        x2 = (col + 1) * cell_w if col < GRID_COLS - 1 else roi_w
+
+        gray = cv2.cvtColor(roi_img[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+        binary = cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10
+        )
+        binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, _OPEN_KERNEL)
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        filtered = [cnt for cnt in contours if cv2.contourArea(cnt) > MIN_CONTOUR_AREA]
+        if not filtered:
+            continue
+        points = np.concatenate([cnt.reshape(-1, 2) for cnt in filtered])
+        closest_pt = nearest_point(points, cell_center)
+        positions.append((top + y1 + closest_pt[1], left + x1 + closest_pt[0]))
+    return positions
+
+
+def find_checkpoints(image, cell_indices, roi):
+    """``extract_checkpoints`` through the per-layout cache."""
+    top, bottom, left, right = roi
+    signature = average_hash(image[top:bottom, left:right])
+    key = (tuple(cell_indices), tuple(roi))
+
+    with _lock:
+        for known, positions in _layouts.get(key, []):
+            if hash_distance(known, signature) <= MAX_HASH_DISTANCE:
+                return list(positions)
+
+    positions = extract_checkpoints(image, cell_indices, roi)
+    with _lock:
+        layouts = _layouts.setdefault(key, [])
+        layouts.insert(0, (signature, tuple(positions)))
+        del layouts[MAX_LAYOUTS:]
+    return list(positions)
+
+
+def clear_cache():
+    with _lock:
+        _layouts.clear()
@@ -0,0 +1,70 @@
+"""Fog-of-war overlay with incremental reveal bookkeeping."""
+
+import cv2
+import numpy as np
+
+
+class FogOfWar:
+    """Map hidden under fog that the robot uncovers as it drives.
+
+    ``reveal`` stamps a disc into the revealed mask and counts only the
+    pixels of that disc that were still fogged, so the revealed total never
+    needs a full-mask ``countNonZero``. The fog mask (its complement) is
+    kept up to date alongside instead of being rebuilt with ``bitwise_not``
+    every frame. ``apply`` darkens the fogged part of the map through a
+    lookup table into a reused buffer and copies it back under the fog mask,
+    with no per-frame allocation or float conversion.
+
+    Only columns left of ``map_width`` belong to the map (the right side of
+    the camera frame is a debug panel).
+    """
+
+    def __init__(self, map_width, radius, factor=0.1):
+        self.map_width = map_width
+        self.radius = radius
+        # same values as (pixel * factor).astype(np.uint8)
+        self.lut = (np.arange(256) * factor).astype(np.uint8)
+        self.revealed = None
+        self.fog = None
+        self.revealed_pixels = 0
+        self._buffer = None
+
+    def _allocate(self, shape):
+        self.revealed = np.zeros(shape[:2], dtype=np.uint8)
+        self.fog = np.full(shape[:2], 255, dtype=np.uint8)
+        self.revealed_pixels = 0
+        self._buffer = None
+
+    def _ensure(self, shape):
+        if self.revealed is None or self.revealed.shape != shape[:2]:
+            self._allocate(shape)
+
+    def reveal(self, image_shape, center):
+        """Uncover the disc around ``center`` (x, y px); returns newly revealed pixels."""
+        self._ensure(image_shape)
+        x, y = int(center[0]), int(center[1])
+        r = self.radius
+        h, w = self.revealed.shape
+        x0, x1 = max(0, x - r), min(w, self.map_width, x + r + 1)
+        y0, y1 = max(0, y - r), min(h, y + r + 1)
+        counted = x0 < x1 and y0 < y1
+        if counted:
+            before = cv2.countNonZero(self.revealed[y0:y1, x0:x1])
+        cv2.circle(self.revealed, (x, y), r, 255, -1)
+        cv2.circle(self.fog, (x, y), r, 0, -1)
+        if not counted:
+            return 0
+        added = cv2.countNonZero(self.revealed[y0:y1, x0:x1]) - before
+        self.revealed_pixels += added
+        return added
+
+    def apply(self, image):
+        """Darken the fogged part of the map in ``image`` in place."""
+        self._ensure(image.shape)
+        width = min(self.map_width, image.shape[1])
+        map_area = image[:, :width]
+        if self._buffer is None or self._buffer.shape != map_area.shape:
+            self._buffer = np.empty_like(map_area)
+        cv2.LUT(map_area, self.lut, dst=self._buffer)
+        cv2.copyTo(self._buffer, self.fog[:, :width], map_area)
+        return image
@@ -0,0 +1,53 @@
+"""What a checker needs from the camera frame.
+
+Every task declares one of four needs in its module, next to
+``target_points``::
+
+    frame_needs = {
+        'telemetry_heartbeat_health': NONE,
+        'docking':                    POSE,
+        'line_sensor_leds':           ROI,
+    }
+
+    def get_frame_needs(task):
+        return frame_needs.get(task, FULL)
+
+* ``NONE``: messages and code only. The runner does not need the frame at
+  all: it can skip decoding it, and call the checker less often, since
+  messages wait in the inbox between calls.
+* ``POSE``: the robot pose, which the tracker still reads from the frame,
+  but no pixels. The runner skips the checker's frame copy, its overlay and
+  re-encoding the annotated frame.
+* ``ROI``: pixels around the robot (LED detection). The frame is passed.
+* ``FULL``: the whole frame, or an overlay the learner needs to see
+  (targets, zones, trails). The default for tasks that declare nothing.
+
+Checkers of ``NONE`` and ``POSE`` tasks accept ``image=None``: they draw
+nothing and return None as the image. ``draw_info`` and ``hud.put_text``
+pass None through, so the usual drawing lines need no guard.
+"""
+
+import sys
+
+
+NONE = "none"
+POSE = "pose"
+ROI = "roi"
+FULL = "full"
+
+
+def needs_pixels(need):
+    """True when the checker must be given the frame."""
+    return need in (ROI, FULL)
+
+
+def task_need(task):
+    """Frame need of the checker function ``task`` (``FULL`` when undeclared)."""
+    module = sys.modules.get(task.__module__)
+    get_frame_needs = getattr(module, "get_frame_needs", None)
+    return FULL if get_frame_needs is None else get_frame_needs(task.__name__)
+
+
+def draw_info(robot, image):
+    """``robot.draw_info(image)``, or None when the runner passed no frame."""
+    return None if image is None else robot.draw_info(image)
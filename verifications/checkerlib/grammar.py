@@ -0,0 +1,164 @@
+"""Message shapes declared once per task and parsed into typed records.
+
+A checker lists the lines it understands, each with a name, a pattern with
+named groups and a type for the groups that are not text::
+
+    SCAN_MESSAGES = Grammar([
+        Shape("scan", r"Scan - R:(?P<r>\\d+) G:(?P<g>\\d+) B:(?P<b>\\d+)",
+              r=int, g=int, b=int),
+    ])
+
+    for record in SCAN_MESSAGES.parse_timed(td["inbox"].poll_timed(robot)):
+        r, g, b = record["r"], record["g"], record["b"]
+
+Patterns are compiled when the module is imported. Every shape has a
+``key``, a literal a matching line must contain (by default the literal
+text its pattern starts with): lines are tested for it with ``in``, or
+``startswith`` for shapes anchored at the start of the line, before any
+regular expression runs, so chatter never reaches the regex engine.
+
+A shape is found anywhere in the line, like ``re.search``, unless
+``at_start`` is set. A line whose fields do not convert (``float("abc")``)
+does not match that shape.
+"""
+
+import re
+
+
+_META = set(".^$*+?{}[]\\|()")
+_QUANTIFIERS = set("*+?{")
+_FLAGS = re.compile(r"\(\?([aiLmsux]+)\)")
+# flags under which the pattern's text is not matched character for character
+_LOOSE_FLAGS = set("ix")
+
+
+def _alternates(pattern):
+    """True when ``pattern`` has a ``|`` outside any group or class."""
+    depth, in_class, i = 0, False, 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            i += 1
+        elif in_class:
+            in_class = c != "]"
+        elif c == "[":
+            in_class = True
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            return True
+        i += 1
+    return False
+
+
+def literal_prefix(pattern):
+    """The literal text every match of ``pattern`` starts with ("" if none).
+
+    Patterns with ``(?i)`` or ``(?x)`` get "": a case-insensitive or verbose
+    pattern matches lines that do not contain its text as written.
+    """
+    if _alternates(pattern):
+        return ""
+    i = 0
+    flags = _FLAGS.match(pattern)
+    if flags:
+        if _LOOSE_FLAGS & set(flags.group(1)):
+            return ""
+        i = flags.end()
+    chars = []
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\" and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            c, step = pattern[i + 1], 2
+        elif c in _META:
+            break
+        else:
+            step = 1
+        following = pattern[i + step:i + step + 1]
+        if following and following in _QUANTIFIERS:
+            break  # the quantifier applies to this character: it is optional
+        chars.append(c)
+        i += step
+    return "".join(chars)
+
+
+class Record:
+    """One parsed message: shape ``name``, converted ``fields``, arrival ``timestamp``."""
+
+    __slots__ = ("name", "fields", "timestamp", "text")
+
+    def __init__(self, name, fields, timestamp=None, text=""):
+        self.name = name
+        self.fields = fields
+        self.timestamp = timestamp
+        self.text = text
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    def __repr__(self):
+        return f"Record({self.name!r}, {self.fields!r})"
+
+
+class Shape:
+    """A message shape: named groups of ``pattern`` become the record's fields.
+
+    Keyword arguments give the type of a field (any one-argument callable,
+    e.g. ``int`` or ``float``); other fields stay strings.
+    """
+
+    def __init__(self, name, pattern, key=None, at_start=False, **types):
+        self.name = name
+        self.regex = re.compile(pattern)
+        self.key = literal_prefix(pattern) if key is None else key
+        self.at_start = at_start
+        self.types = types
+        self._find = self.regex.match if at_start else self.regex.search
+
+    def admits(self, text):
+        """Cheap test: can ``text`` be this shape at all?"""
+        if self.at_start:
+            return text.startswith(self.key)
+        return self.key in text
+
+    def parse(self, text, timestamp=None):
+        """``Record`` for ``text``, or None when it is not this shape."""
+        if not self.admits(text):
+            return None
+        match = self._find(text)
+        if match is None:
+            return None
+        fields = match.groupdict()
+        try:
+            for field, convert in self.types.items():
+                fields[field] = convert(fields[field])
+        except (TypeError, ValueError):
+            return None
+        return Record(self.name, fields, timestamp, text)
+
+
+class Grammar:
+    """The message shapes of one task, tried in order."""
+
+    def __init__(self, shapes):
+        self.shapes = list(shapes)
+
+    def parse(self, text, timestamp=None):
+        """Record of the first shape ``text`` matches, or None."""
+        for shape in self.shapes:
+            record = shape.parse(text, timestamp)
+            if record is not None:
+                return record
+        return None
+
+    def parse_all(self, messages):
+        """Records of ``messages`` that match a shape, in order; the rest are dropped."""
+        records = (self.parse(text) for text in messages)
+        return [record for record in records if record is not None]
+
+    def parse_timed(self, entries):
+        """Like ``parse_all`` for ``(timestamp, message)`` pairs (``MessageInbox.poll_timed``)."""
+        records = (self.parse(text, stamp) for stamp, text in entries)
+        return [record for record in records if record is not None]
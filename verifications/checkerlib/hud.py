@@ -0,0 +1,86 @@
+"""Cached text rendering for the labels checkers draw every frame.
+
+Most overlay text is the same from one frame to the next (zone names,
+"LED: ON", status rows). ``put_text`` rasterises a string once per
+(text, font, scale, color, thickness, line type) into a small sprite and a
+mask, keeps it in a process-wide LRU cache and afterwards only copies it
+onto the frame. Strings that change (timers, percentages) miss the cache
+and are rendered once per new value.
+
+Hard-edged text (``cv2.LINE_8`` on OpenCV 4) comes out as ``cv2.putText``
+draws it, except for the odd pixel where OpenCV clips a stroke at the frame
+border. Smoothed text (``cv2.LINE_AA``, or any text on builds that always
+anti-alias) keeps its coverage and is blended onto the frame with two
+saturating OpenCV operations; ``cv2.putText`` blends overlapping strokes
+twice, so those few pixels can differ by a few grey levels.
+"""
+
+import cv2
+import numpy as np
+
+from .cache import LRUCache
+from .sprites import clip
+
+
+MAX_ENTRIES = 256
+
+_cache = LRUCache(MAX_ENTRIES)
+
+
+class TextSprite:
+    """One rasterised string, placed relative to its ``cv2.putText`` origin."""
+
+    def __init__(self, text, font, scale, color, thickness, line_type):
+        (w, h), baseline = cv2.getTextSize(text, font, scale, thickness)
+        # glyph strokes reach up to ~thickness past the box getTextSize reports
+        pad = thickness + 4
+        self.origin = (pad, pad + h)  # where putText's org lands in the sprite
+        coverage = np.zeros((h + baseline + 2 * pad, w + 2 * pad), dtype=np.uint8)
+        cv2.putText(coverage, text, self.origin, font, scale, 255, thickness, line_type)
+        self.shape = coverage.shape
+        color = np.array(color[:3] if len(color) >= 3 else color * 3, dtype=np.float64)
+        # decided from the raster, not line_type: some OpenCV builds smooth every font
+        self.antialiased = bool(np.any((coverage > 0) & (coverage < 255)))
+        if self.antialiased:
+            # frame * (255 - a) / 255 + color * a / 255, both halves rounded like OpenCV
+            self.keep = cv2.merge([255 - coverage] * 3)
+            self.paint = np.rint(coverage[..., None] * color / 255).astype(np.uint8)
+        else:
+            self.mask = coverage
+            self.paint = np.empty(coverage.shape + (3,), dtype=np.uint8)
+            self.paint[:] = color
+
+    def draw(self, image, org):
+        top_left = (int(org[0]) - self.origin[0], int(org[1]) - self.origin[1])
+        overlap = clip(image.shape, self.shape, top_left)
+        if overlap is None:
+            return image
+        dst, src = overlap
+        roi = image[dst]
+        if self.antialiased:
+            cv2.add(cv2.multiply(roi, self.keep[src], scale=1 / 255), self.paint[src], dst=roi)
+        else:
+            cv2.copyTo(self.paint[src], self.mask[src], roi)
+        return image
+
+
+def text_sprite(text, font, scale, color, thickness=1, line_type=cv2.LINE_8):
+    """Process-wide ``TextSprite`` for these arguments."""
+    color = tuple(int(c) for c in color) if np.ndim(color) else (int(color),)
+    key = (text, font, float(scale), color, thickness, line_type)
+    return _cache.get_or_build(
+        key, lambda: TextSprite(text, font, scale, color, thickness, line_type))
+
+
+def put_text(image, text, org, font, scale, color, thickness=1, line_type=cv2.LINE_8):
+    """Drop-in for ``cv2.putText`` on 3-channel frames, through the sprite cache.
+
+    Without a frame (``image`` None, see ``checkerlib.frames``) nothing is drawn.
+    """
+    if image is None:
+        return None
+    return text_sprite(text, font, scale, color, thickness, line_type).draw(image, org)
+
+
+def clear_cache():
+    _cache.clear()
@@ -0,0 +1,139 @@
+"""LED on/off detection next to the robot marker."""
+
+import math
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+_KERNEL_3 = np.ones((3, 3), np.uint8)
+
+
+class LedDetector:
+    """Debounced LED state from the bright pixels in a window by the robot.
+
+    The window is ``size`` (w, h) pixels at ``offset`` from ``position_px``,
+    clamped into the frame (80x180 right of the marker by default, where the
+    robot's LED shows up). Pixels at least ``lower`` on every channel are
+    lit; the lit mask and its integral image live in reused buffers.
+
+    Two tests:
+
+    * share (default): ``level`` is the lit share of the window in percent.
+      The LED turns on above ``on_percent`` and off again at or below
+      ``off_percent`` (hysteresis; equal by default).
+    * blob (``min_area``): the LED is on when, after a 5x5 blur and a 3x3
+      open/close, some lit blob has a contour area above ``min_area``.
+      Contours are only extracted when the integral image cannot decide:
+      too few lit pixels means off, and a completely lit square big enough
+      to survive the blur and morphology as such a blob means on.
+
+    ``state`` is the majority of the last ``smoothing`` readings (the
+    latest reading alone until there are two).
+    """
+
+    def __init__(self, lower=245, on_percent=2.0, off_percent=None, min_area=None,
+                 offset=(80, -90), size=(80, 180), smoothing=3):
+        self.lower = np.array([lower] * 3)
+        self.upper = np.array([255, 255, 255])
+        self.on_percent = on_percent
+        self.off_percent = on_percent if off_percent is None else off_percent
+        self.min_area = min_area
+        if min_area is not None:
+            # contourArea of an n x n pixel square is (n - 1) ** 2; the blur eats 2 px per side
+            self._solid = int(math.isqrt(min_area)) + 2 + 4
+        self.offset = offset
+        self.size = size
+        self.history = deque(maxlen=smoothing)
+        self.raw = False
+        self.state = False
+        self.level = 0.0
+        self.roi = None  # x, y, w, h of the last window
+        self._crop = None
+        self._contours = None  # blobs of the last window, once extracted
+        self._mask = None
+        self._integral = None
+
+    def _window(self, image, position_px):
+        w, h = self.size
+        img_h, img_w = image.shape[:2]
+        x = int(max(0, min(position_px[0] + self.offset[0], img_w - w)))
+        y = int(max(0, min(position_px[1] + self.offset[1], img_h - h)))
+        return x, y, w, h
+
+    def _lit_mask(self, crop):
+        shape = crop.shape[:2]
+        if self._mask is None or self._mask.shape != shape:
+            self._mask = np.empty(shape, dtype=np.uint8)
+            self._integral = np.empty((shape[0] + 1, shape[1] + 1), dtype=np.int32)
+        cv2.inRange(crop, self.lower, self.upper, dst=self._mask)
+        cv2.integral(self._mask, self._integral, sdepth=cv2.CV_32S)
+        return self._mask
+
+    def _too_dim(self):
+        # a blob of min_area needs at least a quarter of that many lit pixels
+        return int(self._integral[-1, -1]) // 255 * 4 < self.min_area
+
+    def _blobs(self, crop):
+        """Lit blobs of ``crop`` above ``min_area``, after blur and open/close."""
+        blurred = cv2.GaussianBlur(crop, (5, 5), 0)
+        mask = cv2.inRange(blurred, self.lower, self.upper)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, _KERNEL_3)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, _KERNEL_3)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return [c for c in contours if cv2.contourArea(c) > self.min_area]
+
+    def _has_blob(self, crop):
+        if self._too_dim():
+            self._contours = []
+            return False
+        b = self._solid
+        if crop.shape[0] >= b and crop.shape[1] >= b:
+            s = self._integral
+            sums = s[b:, b:] - s[:-b, b:] - s[b:, :-b] + s[:-b, :-b]
+            if sums.max() == 255 * b * b:
+                return True
+        self._contours = self._blobs(crop)
+        return bool(self._contours)
+
+    def update(self, image, position_px):
+        """Read the LED for this frame and return the debounced state."""
+        x, y, w, h = self.roi = self._window(image, position_px)
+        crop = self._crop = image[y:y + h, x:x + w]
+        self._contours = None
+        mask = self._lit_mask(crop)
+        self.level = int(self._integral[-1, -1]) // 255 / (mask.shape[0] * mask.shape[1]) * 100
+        if self.min_area is not None:
+            self.raw = self._has_blob(crop)
+        else:
+            threshold = self.off_percent if self.raw else self.on_percent
+            self.raw = self.level > threshold
+        self.history.append(self.raw)
+        if len(self.history) >= 2:
+            self.state = sum(self.history) > len(self.history) / 2
+        else:
+            self.state = self.raw
+        return self.state
+
+    def draw(self, image, color=(0, 255, 0), thickness=2):
+        """Outline what the last reading saw, clipped to its window.
+
+        Share test: the contours of every lit region. Blob test: the blobs
+        above ``min_area``. Call it right after ``update`` on the same frame.
+        """
+        if self.roi is None:
+            return image
+        if self.min_area is None:
+            if not self._integral[-1, -1]:
+                return image
+            contours, _ = cv2.findContours(self._mask, cv2.RETR_EXTERNAL,
+                                           cv2.CHAIN_APPROX_SIMPLE)
+        else:
+            if self._contours is None:
+                self._contours = self._blobs(self._crop)
+            contours = self._contours
+        if contours:
+            x, y, w, h = self.roi
+            cv2.drawContours(image[y:y + h, x:x + w], contours, -1, color, thickness)
+        return image
@@ -0,0 +1,64 @@
+"""Batch ingestion of robot messages."""
+
+import time
+from collections import deque
+from itertools import islice
+
+
+class MessageInbox:
+    """Timestamped ring buffer of the messages received during one run.
+
+    ``robot.get_msg()`` hands out one queued message per call. ``drain`` pulls
+    everything that is queued in one go, so a burst is handled in the frame it
+    arrives in rather than over the next few seconds of frames. Keep one inbox
+    in ``td`` and read it with ``poll``::
+
+        for msg in td["inbox"].poll(robot):
+            ...
+
+    ``max_drain`` caps the pull per frame; whatever is left stays queued on
+    the robot for the next frame.
+    """
+
+    def __init__(self, maxlen=512, max_drain=256):
+        self.entries = deque(maxlen=maxlen)  # (seq, timestamp, message)
+        self.max_drain = max_drain
+        self.received = 0
+        self._cursor = 0
+
+    def drain(self, robot, now=None):
+        """Move every queued message into the buffer; returns how many arrived."""
+        now = time.time() if now is None else now
+        count = 0
+        while count < self.max_drain:
+            msg = robot.get_msg()
+            if msg is None:
+                break
+            self.entries.append((self.received, now, msg))
+            self.received += 1
+            count += 1
+        return count
+
+    def new_entries(self):
+        """``(timestamp, message)`` pairs added since the previous call."""
+        if self._cursor >= self.received:
+            return []
+        # entries that already fell out of the ring are skipped
+        skip = max(0, len(self.entries) - (self.received - self._cursor))
+        fresh = [(stamp, msg) for _, stamp, msg in islice(self.entries, skip, None)]
+        self._cursor = self.received
+        return fresh
+
+    def poll(self, robot, now=None):
+        """Drain the robot and return the new messages, oldest first."""
+        self.drain(robot, now)
+        return [msg for _, msg in self.new_entries()]
+
+    def poll_timed(self, robot, now=None):
+        """Like ``poll`` but yields ``(timestamp, message)`` pairs."""
+        self.drain(robot, now)
+        return self.new_entries()
+
+    def last(self):
+        """Most recent message of the run, or None."""
+        return self.entries[-1][2] if self.entries else None
@@ -0,0 +1,117 @@
+"""Smoothed robot pose shared by the motion checks of a run."""
+
+import math
+import time
+
+from .rotation import RotationTracker
+
+
+class PoseTracker:
+    """Alpha-beta filter over the marker position and heading.
+
+    Call ``update(robot)`` once per frame, then read:
+
+    * ``position`` / ``velocity`` / ``speed``: filtered position (cm),
+      velocity (cm/s) and its magnitude;
+    * ``heading`` (degrees, as ``compute_angle_x``) and ``angular_rate``
+      (deg/s);
+    * ``distance``: path length of the filtered position, so detection
+      jitter on a standing robot adds next to nothing;
+    * ``rotation``: signed sum of heading changes, from the ``turns``
+      ``RotationTracker``;
+    * ``displacement`` / ``max_displacement``: from the first position seen;
+    * ``moving``: True once ``speed`` stayed above ``move_speed`` for
+      ``settle`` frames, False again once it stayed below ``stop_speed`` for
+      ``settle`` frames. ``changed_at`` is the time of the first frame of the
+      run that flipped it, so durations are not shortened by the debounce.
+
+    Frames without a marker leave the estimate alone. After a gap longer than
+    ``max_gap`` seconds the filter restarts from the next measurement.
+    """
+
+    def __init__(self, alpha=0.5, beta=0.2, move_speed=3.0, stop_speed=1.5,
+                 settle=3, max_gap=1.0):
+        self.alpha = alpha
+        self.beta = beta
+        self.move_speed = move_speed
+        self.stop_speed = stop_speed
+        self.settle = settle
+        self.max_gap = max_gap
+
+        self.start = None
+        self.raw_position = None
+        self.position = None
+        self.velocity = (0.0, 0.0)
+        self.speed = 0.0
+        self.turns = RotationTracker()
+        self.angular_rate = 0.0
+        self.distance = 0.0
+        self.max_displacement = 0.0
+        self.moving = False
+        self.changed_at = None
+        self.updated_at = None
+        self._streak = 0
+        self._streak_start = None
+
+    @property
+    def displacement(self):
+        if self.position is None:
+            return 0.0
+        return math.hypot(self.position[0] - self.start[0], self.position[1] - self.start[1])
+
+    @property
+    def heading(self):
+        return self.turns.heading
+
+    @property
+    def rotation(self):
+        return self.turns.total
+
+    def _update_heading(self, angle, dt):
+        delta = self.turns.update(angle)
+        if angle is not None and dt:
+            self.angular_rate += self.alpha * (delta / dt - self.angular_rate)
+
+    def _update_state(self, now):
+        flipping = self.speed < self.stop_speed if self.moving else self.speed > self.move_speed
+        if not flipping:
+            self._streak = 0
+            return
+        if self._streak == 0:
+            self._streak_start = now
+        self._streak += 1
+        if self._streak >= self.settle:
+            self.moving = not self.moving
+            self.changed_at = self._streak_start
+            self._streak = 0
+
+    def update(self, robot, now=None):
+        """Fold this frame's detection in; returns ``self``."""
+        now = time.time() if now is None else now
+        pos = robot.position
+        if pos is None:
+            return self
+        dt = None if self.updated_at is None else now - self.updated_at
+        self.raw_position = (pos[0], pos[1])
+
+        if dt is None or dt <= 0 or dt > self.max_gap:
+            if self.start is None:
+                self.start = self.raw_position
+            self.position = self.raw_position
+            self.velocity = (0.0, 0.0)
+        else:
+            px = self.position[0] + self.velocity[0] * dt
+            py = self.position[1] + self.velocity[1] * dt
+            rx, ry = pos[0] - px, pos[1] - py
+            new = (px + self.alpha * rx, py + self.alpha * ry)
+            self.velocity = (self.velocity[0] + self.beta * rx / dt,
+                             self.velocity[1] + self.beta * ry / dt)
+            self.distance += math.hypot(new[0] - self.position[0], new[1] - self.position[1])
+            self.position = new
+        self.speed = math.hypot(*self.velocity)
+        self.max_displacement = max(self.max_displacement, self.displacement)
+
+        self._update_heading(robot.compute_angle_x(), dt if dt is not None and dt <= self.max_gap else None)
+        self._update_state(now)
+        self.updated_at = now
+        return self
@@ -0,0 +1,56 @@
+"""Static checks of a submission, run before a robot is booked for it.
+
+Every module exports ``preflight(task, user_code)``. It runs the same code
+checks the live checker does on its first frame, with no robot, camera or
+clock involved, and returns a ``Preflight``:
+
+* ``missing``: the list the live checker reports (missing elements, banned
+  functions found, bugs left), empty when the code passes;
+* ``result``: the final result the live checker gives because of the code
+  alone, when no run can change it (``None`` otherwise). The live checker
+  ends the run with this very dict, so a rejected submission gets exactly
+  the verdict it would have got on the track. Where a checker names a
+  failed drive ahead of a code problem, a run could only have reported a
+  different reason for the same score of 0.
+
+``dispatch`` is False when queuing a robot would be pointless. Tasks
+without static checks pass with an empty ``Preflight``.
+"""
+
+
+class Preflight:
+    """Outcome of one task's static checks on one submission."""
+
+    def __init__(self, missing=(), result=None, **details):
+        self.missing = list(missing)
+        self.result = result
+        self.details = details  # extra values the live checker keeps in td
+
+    @property
+    def ok(self):
+        return not self.missing
+
+    @property
+    def dispatch(self):
+        return self.result is None
+
+    def as_dict(self):
+        return {"dispatch": self.dispatch, "missing": self.missing, "result": self.result}
+
+
+def code_failure(description, score=0):
+    """The result dict of a run failed for its code."""
+    return {"success": False, "description": description, "score": score}
+
+
+def from_missing(missing, description):
+    """Failing ``Preflight`` for a non-empty ``missing``; ``{}`` in ``description`` lists it."""
+    if not missing:
+        return Preflight()
+    return Preflight(missing, code_failure(description.format(", ".join(missing))))
+
+
+def run_preflight(checks, task, user_code):
+    """``checks[task](user_code)``, or a passing ``Preflight`` for unchecked tasks."""
+    check = checks.get(task)
+    return Preflight() if check is None else check(user_code or "")
@@ -0,0 +1,217 @@
+"""Per-phase timing of checkers into a ring buffer, off unless asked for.
+
+A checker marks its phases either with ``span`` blocks::
+
+    with span("module_9.fog_of_war_survey.reveal"):
+        td["fog"].reveal(image.shape, (robot_x, robot_y))
+
+or, for the usual straight-line sequence of phases, with a lap timer that
+records the time since the previous mark, so the checker body needs no
+re-indenting::
+
+    lap = laps("module_9.fog_of_war_survey")
+    image = robot.draw_info(image)
+    lap("overlay")
+    ...
+    lap("verdict")
+
+While profiling is disabled (the default) ``span`` hands back one shared
+no-op context and ``laps`` one shared no-op timer: a global lookup and a
+call per mark. Enabled, every record is a phase id, a start and a duration
+written into preallocated NumPy arrays; once ``capacity`` records are
+written the oldest are overwritten.
+
+Set ``CHECKER_PROFILE=1`` to enable it for the process, or
+``CHECKER_PROFILE=path.json`` / ``path.csv`` to also write the records
+there at exit. ``python -m checkerlib.replay ... --profile path.json`` does
+the same for one replay.
+"""
+
+import atexit
+import csv
+import itertools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+
+ENV_VAR = "CHECKER_PROFILE"
+CAPACITY = 1 << 16
+
+
+class SpanLog:
+    """Ring buffer of ``(phase, start, duration)`` records, times in seconds."""
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self._phase = np.zeros(capacity, dtype=np.int32)
+        self._start = np.zeros(capacity, dtype=np.float64)
+        self._duration = np.zeros(capacity, dtype=np.float64)
+        self._names = []
+        self._ids = {}
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self.written = 0
+
+    def _phase_id(self, name):
+        phase = self._ids.get(name)
+        if phase is None:
+            with self._lock:
+                phase = self._ids.get(name)
+                if phase is None:
+                    phase = self._ids[name] = len(self._names)
+                    self._names.append(name)
+        return phase
+
+    def record(self, name, start, duration):
+        # next() on a count is atomic, so checker threads never share a slot
+        n = next(self._counter)
+        i = n % self.capacity
+        self._phase[i] = self._phase_id(name)
+        self._start[i] = start
+        self._duration[i] = duration
+        self.written = max(self.written, n + 1)
+
+    def _order(self):
+        if self.written <= self.capacity:
+            return np.arange(self.written)
+        first = self.written % self.capacity
+        return np.roll(np.arange(self.capacity), -first)
+
+    def records(self):
+        """Kept records, oldest first, as dicts."""
+        order = self._order()
+        return [{"phase": self._names[p], "start": float(s), "duration": float(d)}
+                for p, s, d in zip(self._phase[order], self._start[order],
+                                   self._duration[order])]
+
+    def summary(self):
+        """Per phase: count, total, mean, p50, p95 and max, in milliseconds."""
+        order = self._order()
+        phases = self._phase[order]
+        durations = self._duration[order] * 1000.0
+        out = {}
+        for phase, name in enumerate(self._names):
+            ms = durations[phases == phase]
+            if not len(ms):
+                continue
+            p50, p95 = np.percentile(ms, [50, 95])
+            out[name] = {
+                "count": int(len(ms)),
+                "total_ms": round(float(ms.sum()), 3),
+                "mean_ms": round(float(ms.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "max_ms": round(float(ms.max()), 3),
+            }
+        return out
+
+    def export(self, path):
+        """Write the records to ``path``: CSV for ``.csv``, else JSON with a summary."""
+        if path.endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=["phase", "start", "duration"])
+                writer.writeheader()
+                writer.writerows(self.records())
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"dropped": max(0, self.written - self.capacity),
+                           "summary": self.summary(),
+                           "records": self.records()}, f, indent=1)
+
+    def clear(self):
+        self._counter = itertools.count()
+        self.written = 0
+
+
+class _Span:
+    __slots__ = ("log", "name", "start")
+
+    def __init__(self, log, name):
+        self.log = log
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.log.record(self.name, self.start, time.perf_counter() - self.start)
+        return False
+
+
+class _Laps:
+    __slots__ = ("log", "prefix", "last")
+
+    def __init__(self, log, prefix):
+        self.log = log
+        self.prefix = prefix
+        self.last = time.perf_counter()
+
+    def __call__(self, phase):
+        now = time.perf_counter()
+        self.log.record(f"{self.prefix}.{phase}", self.last, now - self.last)
+        self.last = now
+
+
+class _Null:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __call__(self, phase):
+        pass
+
+
+_NULL = _Null()
+_log = None
+
+
+def enable(capacity=CAPACITY):
+    """Start recording into a fresh ``SpanLog``; returns it."""
+    global _log
+    _log = SpanLog(capacity)
+    return _log
+
+
+def disable():
+    """Stop recording; returns the log that was being written, if any."""
+    global _log
+    log, _log = _log, None
+    return log
+
+
+def current():
+    """The ``SpanLog`` being written, None while disabled."""
+    return _log
+
+
+def span(name):
+    """Context manager timing its block as phase ``name``."""
+    log = _log
+    return _NULL if log is None else _Span(log, name)
+
+
+def laps(prefix):
+    """Lap timer: ``lap(phase)`` records ``prefix.phase`` since the previous mark."""
+    log = _log
+    return _NULL if log is None else _Laps(log, prefix)
+
+
+def _from_environment():
+    setting = os.environ.get(ENV_VAR, "")
+    if setting in ("", "0"):
+        return
+    log = enable()
+    if setting != "1":
+        atexit.register(log.export, setting)
+
+
+_from_environment()
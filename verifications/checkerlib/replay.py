@@ -0,0 +1,343 @@
+"""Offline replay of recorded runs through a checker.
+
+Feeds a recorded video (or a directory of frames), a pose log and a message
+log through ``ReplayRobot``, a stand-in for the worker's robot object, and
+calls a checker frame by frame exactly like the worker does: the run stops
+when ``result["success"]`` turns False or the clock passes
+``td["end_time"]``.
+
+Logs are JSON lines with a ``t`` field in seconds from the first frame::
+
+    {"t": 0.00, "position": [30.0, 45.0], "position_px": [300, 450], "angle": 90.0}
+    {"t": 0.07, "position": null}
+    {"t": 1.25, "msg": "Scan - R:10 G:20 B:30"}
+
+By default time is simulated: frame ``i`` happens at ``i / fps`` and the
+checker's module sees a ``ReplayClock`` in place of ``time``, so a run
+replays identically however fast the machine is. ``realtime=True`` keeps the
+wall clock instead.
+
+Command line, from the ``verifications`` folder::
+
+    python -m checkerlib.replay module_9.fog_of_war_survey --frames run.mp4 \\
+        --poses poses.jsonl --messages msgs.jsonl --code solution.py
+"""
+
+import argparse
+import bisect
+import importlib
+import json
+import math
+import os
+import sys
+import time
+
+import cv2
+
+from . import messages as _messages
+from . import pose as _pose
+from . import profiling
+from . import series as _series
+from .frames import needs_pixels, task_need
+from . import verdict as _verdict
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def load_jsonl(path):
+    """Records of a JSON-lines log, sorted by ``t``."""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    records.sort(key=lambda r: r["t"])
+    return records
+
+
+def iter_frames(source, decode=True):
+    """Yield BGR frames from a video file or a directory of images.
+
+    With ``decode=False`` every frame is skipped over and yields None.
+    """
+    if os.path.isdir(source):
+        names = sorted(n for n in os.listdir(source) if n.lower().endswith(IMAGE_EXTENSIONS))
+        for name in names:
+            if not decode:
+                yield None
+                continue
+            frame = cv2.imread(os.path.join(source, name))
+            if frame is not None:
+                yield frame
+        return
+    capture = cv2.VideoCapture(source)
+    try:
+        while True:
+            if decode:
+                ok, frame = capture.read()
+            else:
+                ok, frame = capture.grab(), None
+            if not ok:
+                break
+            yield frame
+    finally:
+        capture.release()
+
+
+def video_fps(source, default=15.0):
+    if os.path.isdir(source):
+        return default
+    capture = cv2.VideoCapture(source)
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    capture.release()
+    return fps if fps and fps > 0 else default
+
+
+class ReplayClock:
+    """Drop-in for the ``time`` module whose ``time()`` is set by the replay."""
+
+    def __init__(self, start=None):
+        self.start = time.time() if start is None else start
+        self.now = self.start
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class ReplayRobot:
+    """Stand-in for the worker's robot, driven by pose and message logs.
+
+    ``advance(elapsed)`` moves the robot to the latest pose recorded at or
+    before ``elapsed`` seconds and releases the messages logged up to then;
+    ``get_msg`` hands them out one per call like the real robot. A pose
+    without ``angle`` keeps the previous heading.
+    """
+
+    def __init__(self, poses=(), messages=(), px_per_cm=10.0):
+        self.px_per_cm = px_per_cm
+        self._poses = list(poses)
+        self._pose_times = [p["t"] for p in self._poses]
+        self._messages = list(messages)
+        self._msg_index = 0
+        self._queue = []
+        self.position = None
+        self.position_px = None
+        self.angle = None
+
+    def advance(self, elapsed):
+        i = bisect.bisect_right(self._pose_times, elapsed) - 1
+        pose = self._poses[i] if i >= 0 else {}
+        position = pose.get("position")
+        position_px = pose.get("position_px")
+        if position is not None and position_px is None:
+            position_px = [self.cm_to_pixel(v) for v in position]
+        elif position_px is not None and position is None:
+            position = [self.pixels_to_cm(v) for v in position_px]
+        self.position = tuple(position) if position is not None else None
+        self.position_px = tuple(int(v) for v in position_px) if position_px is not None else None
+        if pose.get("angle") is not None:
+            # like the real robot, the heading survives a lost marker
+            self.angle = pose["angle"]
+
+        while (self._msg_index < len(self._messages)
+               and self._messages[self._msg_index]["t"] <= elapsed):
+            self._queue.append(self._messages[self._msg_index]["msg"])
+            self._msg_index += 1
+
+    # -- robot interface ----------------------------------------------------
+
+    def get_msg(self):
+        return self._queue.pop(0) if self._queue else None
+
+    def get_info(self):
+        return {"position": self.position, "position_px": self.position_px}
+
+    def draw_info(self, image):
+        if self.position_px is not None:
+            cv2.circle(image, self.position_px, 6, (0, 0, 255), -1)
+            if self.angle is not None:
+                a = math.radians(self.angle)
+                tip = (int(self.position_px[0] + 20 * math.cos(a)),
+                       int(self.position_px[1] + 20 * math.sin(a)))
+                cv2.line(image, self.position_px, tip, (0, 0, 255), 2)
+        return image
+
+    def compute_angle_x(self):
+        return None if self.angle is None else self.angle % 360
+
+    def compute_angle_robot_point(self, point):
+        """Angle from the robot heading to ``point`` (cm), in [0, 360)."""
+        if self.position is None or self.angle is None:
+            return None
+        to_point = math.degrees(math.atan2(point[1] - self.position[1],
+                                           point[0] - self.position[0]))
+        return (to_point - self.angle) % 360
+
+    def pixels_to_cm(self, value):
+        return value / self.px_per_cm
+
+    def cm_to_pixel(self, value):
+        return int(value * self.px_per_cm)
+
+    @staticmethod
+    def delta_points(point_0, point_1):
+        return math.sqrt((point_0[0] - point_1[0]) ** 2 + (point_0[1] - point_1[1]) ** 2)
+
+    def stop(self):
+        pass
+
+
+class ReplayResult:
+    """Outcome of ``replay``: last checker output plus per-frame timings."""
+
+    def __init__(self):
+        self.frames = 0
+        self.image = None
+        self.td = None
+        self.text = None
+        self.result = None
+        self.frame_times = []  # seconds spent inside the checker, per frame
+
+
+def _time_users(task):
+    """Modules whose ``time`` attribute must follow the replay clock."""
+    users = [sys.modules[task.__module__], _messages, _pose, _series, _verdict]
+    return [m for m in users if getattr(m, "time", None) is not None]
+
+
+def replay(task, frames, poses=(), messages=(), user_code="", fps=15.0,
+           realtime=False, px_per_cm=10.0, max_frames=None, on_frame=None,
+           stop_on_verdict=True, frame_needs=False):
+    """Run ``task`` over ``frames`` the way the worker would.
+
+    ``frames`` is any iterable of BGR images. ``on_frame(image, text, result)``
+    is called after every frame, e.g. to write the annotated video. With
+    ``stop_on_verdict=False`` every frame is played even after the run would
+    have ended (benchmarks want a fixed frame count). With
+    ``frame_needs=True`` a task that needs no pixels (``checkerlib.frames``)
+    is called with ``image=None``, as a runner honouring the need would.
+    """
+    robot = ReplayRobot(poses, messages, px_per_cm)
+    clock = ReplayClock()
+    patched = {} if realtime else {m: m.time for m in _time_users(task)}
+    out = ReplayResult()
+    td = None
+    phase = f"{task.__module__}.{task.__name__}"
+    pixels = not frame_needs or needs_pixels(task_need(task))
+    try:
+        for m in patched:
+            m.time = clock
+        for i, frame in enumerate(frames):
+            if max_frames is not None and i >= max_frames:
+                break
+            if realtime:
+                # frames arrive at the recorded rate, not as fast as they decode
+                time.sleep(max(0.0, clock.start + i / fps - time.time()))
+                elapsed = time.time() - clock.start
+            else:
+                clock.now = clock.start + i / fps
+                elapsed = i / fps
+            robot.advance(elapsed)
+
+            started = time.perf_counter()
+            with profiling.span(phase):
+                image, td, text, result = task(robot, frame if pixels else None, td, user_code)
+            out.frame_times.append(time.perf_counter() - started)
+            out.frames += 1
+            out.image, out.td, out.text, out.result = image, td, text, result
+            if on_frame is not None:
+                on_frame(image, text, result)
+
+            now = time.time() if realtime else clock.now
+            if stop_on_verdict and (not result["success"] or now > td["end_time"]):
+                break
+    finally:
+        for m, original in patched.items():
+            m.time = original
+    return out
+
+
+def load_task(spec):
+    """``"module_9.fog_of_war_survey"`` -> the checker function."""
+    module_name, _, func_name = spec.rpartition(".")
+    verifications_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if verifications_dir not in sys.path:
+        sys.path.insert(0, verifications_dir)
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded run through a checker.")
+    parser.add_argument("task", help="module.function, e.g. module_9.fog_of_war_survey")
+    parser.add_argument("--frames", required=True, help="video file or directory of images")
+    parser.add_argument("--poses", help="JSON-lines pose log")
+    parser.add_argument("--messages", help="JSON-lines message log")
+    parser.add_argument("--code", help="file with the learner's code")
+    parser.add_argument("--fps", type=float, help="frame rate (default: from the video, else 15)")
+    parser.add_argument("--px-per-cm", type=float, default=10.0)
+    parser.add_argument("--realtime", action="store_true", help="use the wall clock")
+    parser.add_argument("--max-frames", type=int)
+    parser.add_argument("--out", help="write the annotated frames to this video")
+    parser.add_argument("--profile", help="record checker phases to this .json or .csv file")
+    parser.add_argument("--frame-needs", action="store_true",
+                        help="skip decoding frames for tasks that need no pixels")
+    args = parser.parse_args(argv)
+    if args.profile:
+        profiling.enable()
+
+    task = load_task(args.task)
+    fps = args.fps or video_fps(args.frames)
+    user_code = ""
+    if args.code:
+        with open(args.code, encoding="utf-8") as f:
+            user_code = f.read()
+
+    writer = []
+
+    def on_frame(image, text, result):
+        if args.out is None or image is None:
+            return
+        if not writer:
+            h, w = image.shape[:2]
+            writer.append(cv2.VideoWriter(args.out, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h)))
+        writer[0].write(image)
+
+    decode = not args.frame_needs or needs_pixels(task_need(task))
+    out = replay(
+        task,
+        iter_frames(args.frames, decode),
+        poses=load_jsonl(args.poses) if args.poses else (),
+        messages=load_jsonl(args.messages) if args.messages else (),
+        user_code=user_code,
+        fps=fps,
+        realtime=args.realtime,
+        px_per_cm=args.px_per_cm,
+        max_frames=args.max_frames,
+        on_frame=on_frame,
+        frame_needs=args.frame_needs,
+    )
+    if writer:
+        writer[0].release()
+    if args.profile:
+        profiling.current().export(args.profile)
+
+    times = sorted(out.frame_times)
+    print(f"frames: {out.frames}")
+    if times:
+        print(f"frame time: mean {1000 * sum(times) / len(times):.2f} ms, "
+              f"max {1000 * times[-1]:.2f} ms")
+    print(f"text: {out.text}")
+    print(f"result: {json.dumps(out.result)}")
+    return 0 if out.result and out.result.get("success") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Declarative code requirements checked in one scan.
+
+A checker lists what the learner's code must contain together with the label
+shown when it is missing::
+
+    REQUIREMENTS = RequirementTable([
+        Require("while True", "while True loop"),
+        AnyOf(("kp", "Kp", "KP"), "kp variable"),
+        AllOf(("r_ratio", "g_ratio", "b_ratio"), "r_ratio / g_ratio / b_ratio normalization"),
+        AtLeast("time.time()", 2, "time.time() timer (used at least twice)"),
+    ])
+
+    report = REQUIREMENTS.check(active_code)
+    code_valid, missing = report.ok, report.missing
+
+All fragments of a table are compiled into a single regular expression, so
+the code is scanned once however many requirements there are.
+"""
+
+import re
+
+
+class Require:
+    """``pattern`` must appear in the code."""
+
+    def __init__(self, pattern, label=None):
+        self.patterns = (pattern,)
+        self.label = label or pattern
+
+    def satisfied(self, counts):
+        return counts.get(self.patterns[0], 0) > 0
+
+
+class AnyOf(Require):
+    """At least one of ``patterns`` must appear."""
+
+    def __init__(self, patterns, label):
+        self.patterns = tuple(patterns)
+        self.label = label
+
+    def satisfied(self, counts):
+        return any(counts.get(p, 0) > 0 for p in self.patterns)
+
+
+class AllOf(AnyOf):
+    """Every one of ``patterns`` must appear."""
+
+    def satisfied(self, counts):
+        return all(counts.get(p, 0) > 0 for p in self.patterns)
+
+
+class AtLeast(Require):
+    """``pattern`` must appear at least ``times`` times (``str.count`` semantics)."""
+
+    def __init__(self, pattern, times, label=None):
+        super().__init__(pattern, label)
+        self.times = times
+
+    def satisfied(self, counts):
+        return counts.get(self.patterns[0], 0) >= self.times
+
+
+class Report:
+    """Outcome of ``RequirementTable.check``."""
+
+    def __init__(self, hits, counts):
+        self.hits = hits      # label -> bool, in declaration order
+        self.counts = counts  # fragment -> non-overlapping occurrences
+
+    @property
+    def ok(self):
+        return all(self.hits.values())
+
+    @property
+    def missing(self):
+        return [label for label, hit in self.hits.items() if not hit]
+
+
+class RequirementTable:
+    """Requirements of one task, compiled into a single matcher."""
+
+    def __init__(self, requirements):
+        self.requirements = list(requirements)
+        fragments = sorted({p for req in self.requirements for p in req.patterns},
+                           key=lambda p: (-len(p), p))
+        self.fragments = fragments
+        # The lookahead tests every start position and reports the longest
+        # fragment found there; shorter fragments that are a prefix of it are
+        # credited through ``_prefixes``.
+        self._regex = re.compile("(?=(%s))" % "|".join(map(re.escape, fragments))) \
+            if fragments else None
+        self._prefixes = {f: [p for p in fragments if f.startswith(p)] for f in fragments}
+
+    def counts(self, code):
+        """Non-overlapping occurrence count of every fragment in ``code``."""
+        starts = {f: [] for f in self.fragments}
+        if self._regex is not None:
+            for match in self._regex.finditer(code):
+                for fragment in self._prefixes[match.group(1)]:
+                    starts[fragment].append(match.start())
+        counts = {}
+        for fragment, positions in starts.items():
+            n, free_from = 0, 0
+            for pos in positions:
+                if pos >= free_from:
+                    n += 1
+                    free_from = pos + len(fragment)
+            counts[fragment] = n
+        return counts
+
+    def check(self, code):
+        counts = self.counts(code or "")
+        hits = {req.label: req.satisfied(counts) for req in self.requirements}
+        return Report(hits, counts)
@@ -0,0 +1,107 @@
+"""Cumulative robot rotation and turn-by-turn verification."""
+
+
+def wrap_angle(delta):
+    """``delta`` degrees folded into (-180, 180]."""
+    delta = (delta + 180.0) % 360.0 - 180.0
+    return 180.0 if delta == -180.0 else delta
+
+
+class RotationTracker:
+    """Unwrapped heading from ``robot.compute_angle_x()`` readings.
+
+    Each reading is compared with the last one that was detected and the
+    difference is folded into (-180, 180], so crossing 0/360 in either
+    direction is a small step rather than a jump, and frames without a
+    marker (``None``) are skipped instead of breaking the chain. The robot
+    has to turn less than 180 degrees between two detected frames, which at
+    camera rates is several turns per second.
+
+    ``total`` is the signed cumulative rotation (positive = left, as
+    ``compute_angle_x`` grows counter-clockwise), ``turned`` the unsigned
+    sum of all steps.
+    """
+
+    def __init__(self):
+        self.heading = None
+        self.total = 0.0
+        self.turned = 0.0
+        self.missed = 0  # frames without a reading since the last one
+
+    def update(self, angle):
+        """Fold one reading in; returns the signed step since the last one."""
+        if angle is None:
+            self.missed += 1
+            return 0.0
+        self.missed = 0
+        if self.heading is None:
+            self.heading = angle
+            return 0.0
+        delta = wrap_angle(angle - self.heading)
+        self.heading = angle
+        self.total += delta
+        self.turned += abs(delta)
+        return delta
+
+
+class TurnQueue:
+    """A sequence of turns the robot has to make, checked as it rotates.
+
+    ``turns`` are ``(direction, degrees)`` pairs in the order they are to be
+    made, direction ``"left"`` or ``"right"``. Every step from
+    ``RotationTracker.update`` is taken off the current turn: left steps off
+    its ``left`` remainder and right steps off its ``right`` one, so turning
+    the wrong way drives the other remainder negative. A turn is done when
+    both remainders are under ``switch`` degrees and the next one starts
+    with the following step; the last turn stays current, so turning on
+    after the sequence still counts as overshooting it.
+
+    ``overshoot`` is set once a remainder of the current turn goes below
+    ``-tolerance``; ``complete`` once the last turn is within ``tolerance``.
+    """
+
+    def __init__(self, turns, switch=10, tolerance=15):
+        self.turns = [{"left": degrees if direction == "left" else 0,
+                       "right": degrees if direction == "right" else 0}
+                      for direction, degrees in turns]
+        self.switch = switch
+        self.tolerance = tolerance
+        self.index = 0
+
+    @property
+    def current(self):
+        return self.turns[self.index]
+
+    @property
+    def done_count(self):
+        """Turns finished so far."""
+        last = self.current
+        finished = last["left"] < self.switch and last["right"] < self.switch
+        return self.index + (1 if finished else 0)
+
+    @property
+    def overshoot(self):
+        current = self.current
+        return current["left"] < -self.tolerance or current["right"] < -self.tolerance
+
+    @property
+    def complete(self):
+        last = self.turns[-1]
+        return (self.index == len(self.turns) - 1 and
+                last["left"] <= self.tolerance and last["right"] <= self.tolerance)
+
+    def pending(self):
+        """Remainders of the current and later turns, in order."""
+        return self.turns[self.index:]
+
+    def update(self, delta):
+        """Apply one signed rotation step (degrees, positive = left)."""
+        current = self.current
+        if delta < 0:
+            current["right"] += delta
+        else:
+            current["left"] -= delta
+        if (current["left"] < self.switch and current["right"] < self.switch and
+                self.index < len(self.turns) - 1):
+            self.index += 1
+        return self
@@ -0,0 +1,141 @@
+"""Routes of drive/turn steps compiled to waypoints, and progress along them."""
+
+import math
+
+import numpy as np
+
+from .cache import LRUCache
+
+
+MAX_ENTRIES = 64
+
+_cache = LRUCache(MAX_ENTRIES)
+
+
+def _normalize(route):
+    """``route`` as ``((turn, move), ...)``: degrees left, then cm forward.
+
+    A step is a dict with any of ``forward``/``backward`` (cm) and
+    ``left``/``right`` (degrees), turn applied first, or such a dict wrapped
+    in a one-element list, the form the lessons write turns in.
+    """
+    steps = []
+    for step in route:
+        if isinstance(step, (list, tuple)):
+            step = step[0]
+        turn = step.get("left", 0) - step.get("right", 0)
+        move = step.get("forward", 0) - step.get("backward", 0)
+        steps.append((turn, move))
+    return tuple(steps)
+
+
+class Route:
+    """Waypoints of one route from one start pose, in cm.
+
+    ``points`` (N, 2) is where the robot is after each drive step,
+    ``tolerances`` how close it has to come to each (``tolerance`` for the
+    first, ``tolerance_step`` more for every later one, so errors can pile
+    up along the route) and ``headings`` the ``compute_angle_x`` direction
+    it drives in to get there. ``turns`` are the ``(direction, degrees)``
+    turns of the route in order, for ``rotation.TurnQueue``. The arrays are
+    read-only: routes are shared through the cache.
+    """
+
+    def __init__(self, start, heading, steps, tolerance=4.0, tolerance_step=1.3):
+        x, y = start
+        direction = heading
+        points, headings, turns = [], [], []
+        for turn, move in steps:
+            if turn:
+                direction += turn
+                turns.append(("left" if turn > 0 else "right", abs(turn)))
+            if move:
+                # image y grows downwards, so a left-hand heading moves up
+                x += move * math.cos(math.radians(direction))
+                y -= move * math.sin(math.radians(direction))
+                points.append((x, y))
+                headings.append(direction % 360)
+        self.points = np.array(points, dtype=np.float64).reshape(-1, 2)
+        self.tolerances = tolerance + tolerance_step * np.arange(len(points), dtype=np.float64)
+        self.headings = np.array(headings, dtype=np.float64)
+        self.turns = turns
+        for array in (self.points, self.tolerances, self.headings):
+            array.flags.writeable = False
+
+    def __len__(self):
+        return len(self.points)
+
+
+def compile_route(start, heading, route, tolerance=4.0, tolerance_step=1.3):
+    """Process-wide ``Route`` for ``route`` driven from ``start`` facing ``heading``."""
+    steps = _normalize(route)
+    key = (tuple(float(v) for v in start), float(heading), steps,
+           float(tolerance), float(tolerance_step))
+    return _cache.get_or_build(
+        key, lambda: Route(start, heading, steps, tolerance, tolerance_step))
+
+
+def compile_robot_route(robot, route, **kwargs):
+    """``compile_route`` from the robot's current pose; None while it is not detected."""
+    pos = robot.get_info().get("position")
+    heading = robot.compute_angle_x()
+    if pos is None or heading is None:
+        return None
+    return compile_route((pos[0], pos[1]), heading, route, **kwargs)
+
+
+class RouteProgress:
+    """Which waypoint of a ``Route`` the robot is heading for.
+
+    ``update(position)`` measures the distance to the current waypoint only
+    and moves on to the next once it is closer than that waypoint's
+    tolerance. The last waypoint stays current after it is reached, so
+    ``distance`` keeps telling whether the robot is still on it.
+    """
+
+    def __init__(self, route):
+        self.route = route
+        self.reached = 0
+        self.distance = None  # to the waypoint tested on the last update
+
+    @property
+    def index(self):
+        """The waypoint currently aimed at."""
+        return min(self.reached, len(self.route) - 1)
+
+    @property
+    def target(self):
+        return self.route.points[self.index]
+
+    @property
+    def tolerance(self):
+        return self.route.tolerances[self.index]
+
+    @property
+    def heading(self):
+        """Heading the robot is expected to drive in towards ``target``."""
+        return self.route.headings[self.index]
+
+    @property
+    def finished(self):
+        return self.reached == len(self.route)
+
+    @property
+    def on_last(self):
+        return self.index == len(self.route) - 1
+
+    @property
+    def on_target(self):
+        return self.distance is not None and self.distance <= self.tolerance
+
+    def update(self, position):
+        """Returns the waypoint index reached on this frame, or None."""
+        if position is None:
+            return None
+        i = self.index
+        tx, ty = self.route.points[i]
+        self.distance = math.hypot(position[0] - tx, position[1] - ty)
+        if self.distance < self.route.tolerances[i] and self.reached == i:
+            self.reached += 1
+            return i
+        return None
@@ -0,0 +1,175 @@
+"""Several robots on one camera: run their checkers side by side per frame.
+
+Each robot on the track has its own checker, ``td`` and learner code, but
+they all look at the same camera frame. ``MultiRobotScheduler.step(frame)``
+copies the frame into one reused buffer per robot, runs the checkers on a
+thread pool (the OpenCV and NumPy work inside them releases the GIL, and
+robot objects and ``td`` stay in this process, no pickling), then merges
+what every checker drew into one output frame: a pixel a checker changed is
+taken from its copy, later robots winning where overlays overlap.
+
+Checkers of tasks that need no pixels (``checkerlib.frames``: ``NONE`` and
+``POSE``) are called with ``image=None``: no copy of the frame is made for
+them and they add nothing to the overlay, leaving the time to the vision
+checkers sharing the camera.
+
+A run ends like it does in the worker, when ``result["success"]`` turns
+False or the clock passes ``td["end_time"]``; finished runs are no longer
+called and drop out of the overlay.
+
+The shared caches in ``checkerlib`` are thread-safe, so checkers of the same
+lesson share sprites, text and routes. Checkers that patch module globals
+(``checkerlib.replay``'s simulated clock) are not meant to run here.
+
+Benchmark, from the ``verifications`` folder::
+
+    python -m checkerlib.scheduler module_9.fog_of_war_survey --robots 8
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from . import profiling
+from .frames import needs_pixels, task_need
+
+
+_CHANNEL_SUM = np.ones((1, 4), dtype=np.float32)
+
+
+class RobotRun:
+    """One robot's checker and its state across frames."""
+
+    def __init__(self, task, robot, user_code="", stop_on_verdict=True):
+        self.task = task
+        self.robot = robot
+        self.user_code = user_code
+        self.stop_on_verdict = stop_on_verdict
+        self.td = None
+        self.image = None
+        self.text = None
+        self.result = None
+        self.finished = False
+        self._buffer = None
+        self._mask = None
+        self._phase = f"{task.__module__}.{task.__name__}"
+        self.pixels = needs_pixels(task_need(task))
+
+    def step(self, frame):
+        """Run the checker on a private copy of ``frame``; returns the changed-pixel mask."""
+        if not self.pixels:
+            self._call(None)
+            return None
+        if self._buffer is None or self._buffer.shape != frame.shape:
+            self._buffer = np.empty_like(frame)
+            self._mask = np.empty(frame.shape[:2], dtype=np.uint8)
+        np.copyto(self._buffer, frame)
+        image = self._call(self._buffer)
+        if image is None or image.shape != frame.shape:
+            return None
+        diff = cv2.absdiff(image, frame)
+        if diff.ndim == 2:
+            return diff
+        # saturating sum over the channels: non-zero wherever any channel changed
+        return cv2.transform(diff, _CHANNEL_SUM[:, :diff.shape[2]], dst=self._mask)
+
+    def _call(self, image):
+        with profiling.span(self._phase):
+            image, self.td, self.text, self.result = self.task(
+                self.robot, image, self.td, self.user_code)
+        self.image = image
+        if self.stop_on_verdict and (
+                not self.result["success"] or time.time() > self.td["end_time"]):
+            self.finished = True
+        return image
+
+
+class MultiRobotScheduler:
+    """Fan one camera frame out to the checkers of several robots."""
+
+    def __init__(self, runs, max_workers=None):
+        self.runs = list(runs)
+        self.max_workers = max_workers or min(len(self.runs), os.cpu_count() or 1) or 1
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                        thread_name_prefix="checker")
+        self._out = None
+
+    @property
+    def active(self):
+        return [run for run in self.runs if not run.finished]
+
+    def step(self, frame):
+        """Check ``frame`` for every robot still running; returns the merged overlay.
+
+        ``frame`` is only read. The returned image is reused by the next step.
+        """
+        runs = self.active
+        if len(runs) == 1 or self.max_workers == 1:
+            masks = [run.step(frame) for run in runs]
+        else:
+            masks = list(self._pool.map(lambda run: run.step(frame), runs))
+        if self._out is None or self._out.shape != frame.shape:
+            self._out = np.empty_like(frame)
+        np.copyto(self._out, frame)
+        for run, mask in zip(runs, masks):
+            if mask is not None:
+                cv2.copyTo(run.image, mask, self._out)
+        return self._out
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _bench(spec, robots, frames, workers, code):
+    from . import bench
+    from .replay import ReplayRobot, load_task
+
+    task = load_task(spec)
+    module = __import__(task.__module__)
+    start, heading = getattr(module, "target_points", {}).get(task.__name__, ((30, 30), (1, 0)))
+    runs = []
+    for i in range(robots):
+        # spread the robots over the track so their overlays do not coincide
+        offset = ((i % 4) * 25.0, (i // 4) * 25.0)
+        poses = bench.scripted_poses((start[0] + offset[0], start[1] + offset[1]), heading, frames)
+        robot = ReplayRobot(poses, bench.scripted_messages(frames), bench.PX_PER_CM)
+        runs.append(RobotRun(task, robot, code, stop_on_verdict=False))
+    frame = bench.synthetic_frame()
+    frame.flags.writeable = False
+    with MultiRobotScheduler(runs, workers) as scheduler:
+        started = time.perf_counter()
+        for i in range(frames):
+            for run in runs:
+                run.robot.advance(i / bench.FPS)
+            scheduler.step(frame)
+        elapsed = time.perf_counter() - started
+    return frames / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("task", help='"module.function", e.g. module_9.fog_of_war_survey')
+    parser.add_argument("--robots", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="thread pool size (default: one per robot, up to the core count)")
+    parser.add_argument("--code", help="learner code file")
+    args = parser.parse_args(argv)
+    code = open(args.code).read() if args.code else ""
+    serial = _bench(args.task, args.robots, args.frames, 1, code)
+    pooled = _bench(args.task, args.robots, args.frames, args.workers, code)
+    print(f"{args.task} x{args.robots}: {serial:.1f} fps serial, {pooled:.1f} fps pooled")
+
+
+if __name__ == "__main__":
+    main()
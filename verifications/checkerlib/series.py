@@ -0,0 +1,120 @@
+"""Numeric values read during a run, with running statistics.
+
+Checkers used to collect readings (errors printed by the robot, LED on/off
+durations, charging values) in Python lists that grew with every message.
+A ``Series`` keeps the last ``capacity`` values and their arrival times in
+preallocated NumPy arrays, and updates count, min, max, mean and variance
+as values arrive, so appending and every statistic are O(1) and the series
+stays the same size however chatty the learner's program is::
+
+    td["data"]["errors"] = Series(capacity=32)
+    ...
+    td["data"]["errors"].append(record["value"], record.timestamp)
+    if td["data"]["errors"].count >= MIN_ERROR_MESSAGES: ...
+
+The statistics cover every value appended; ``values()`` only the ones still
+kept. NaN is not a reading: ``append`` drops it.
+"""
+
+import math
+import time
+
+import numpy as np
+
+
+CAPACITY = 64
+
+
+class Series:
+    """Ring buffer of ``(timestamp, value)`` with running statistics over all values."""
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self._values = np.zeros(capacity, dtype=np.float64)
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.last = None
+        self.last_time = None
+        self._mean = 0.0
+        self._m2 = 0.0  # sum of squared deviations from the mean (Welford)
+
+    def append(self, value, timestamp=None):
+        """Record ``value``; returns False (and records nothing) for NaN."""
+        value = float(value)
+        if math.isnan(value):
+            return False
+        timestamp = time.time() if timestamp is None else timestamp
+        i = self.count % self.capacity
+        self._values[i] = value
+        self._times[i] = timestamp
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+        self.last = value
+        self.last_time = timestamp
+        return True
+
+    @property
+    def mean(self):
+        """Mean of all values, None while empty."""
+        return self._mean if self.count else None
+
+    @property
+    def variance(self):
+        """Population variance of all values, None while empty."""
+        return self._m2 / self.count if self.count else None
+
+    @property
+    def std(self):
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+    @property
+    def dropped(self):
+        """Values no longer kept in the buffer (still in the statistics)."""
+        return max(0, self.count - self.capacity)
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def __bool__(self):
+        return self.count > 0
+
+    def _order(self):
+        if self.count <= self.capacity:
+            return slice(0, self.count)
+        first = self.count % self.capacity
+        return np.roll(np.arange(self.capacity), -first)
+
+    def values(self):
+        """Kept values, oldest first (a copy)."""
+        return self._values[self._order()].copy()
+
+    def times(self):
+        """Arrival times of the kept values, oldest first (a copy)."""
+        return self._times[self._order()].copy()
+
+    def count_within(self, low, high):
+        """How many kept values lie in ``[low, high]``."""
+        kept = self._values[:len(self)]
+        return int(np.count_nonzero((kept >= low) & (kept <= high)))
+
+    def format(self, template="{}", sep=", ", empty=""):
+        """Kept values as ``template`` text joined by ``sep``, ``"..."`` first when some were dropped."""
+        if not self.count:
+            return empty
+        parts = [template.format(v) for v in self.values().tolist()]
+        if self.dropped:
+            parts.insert(0, "...")
+        return sep.join(parts)
+
+    def as_dict(self):
+        return {"count": self.count, "min": self.min, "max": self.max,
+                "mean": self.mean, "variance": self.variance}
@@ -0,0 +1,161 @@
+"""One-pass analysis of the learner's code.
+
+``analyze_code(user_code)`` returns a ``CodeIndex`` holding everything the
+checkers ask about a submission: the comment-stripped text used for substring
+checks, the parsed AST and the facts extracted from it (calls, imports,
+loops, function definitions, assignments, literals). Indexes are memoized by
+the hash of the code, so a resubmitted program is not analysed again.
+
+By default the AST is built from the comment-stripped text, like the legacy
+``ast.parse(active_code)`` checks; pass ``strip=False`` to parse the code as
+submitted (a ``#`` inside a string literal then survives).
+"""
+
+import ast
+import hashlib
+import io
+import re
+import tokenize
+from collections import Counter
+
+from .cache import LRUCache
+
+
+MAX_ENTRIES = 128
+
+_cache = LRUCache(MAX_ENTRIES)
+
+
+def strip_comments(code):
+    """Drop everything after ``#`` on every line (the checkers' "active code")."""
+    return '\n'.join(line.split('#')[0] for line in code.split('\n'))
+
+
+def dotted_name(node):
+    """``a.b.c`` for a Name/Attribute chain, otherwise None."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return '.'.join(reversed(parts))
+    return None
+
+
+def _parse(code):
+    try:
+        return ast.parse(code), None
+    except SyntaxError as e:
+        return None, e
+
+
+class CodeIndex:
+    """Facts about one submission. Treat instances as read-only."""
+
+    def __init__(self, code, strip=True):
+        self.raw = code
+        self.active = strip_comments(code)
+        self.tree, self.syntax_error = _parse(self.active if strip else code)
+        self.syntax_ok = self.tree is not None
+        self._fn_sources = {}
+
+        self.identifiers = self._tokenize(code)
+        self.calls = Counter()          # "robot.move_forward", "print", ...
+        self.methods = Counter()        # trailing attribute of every call: "on", "off", ...
+        self.imports = set()            # "time", "machine", "machine.Pin", ...
+        self.loops = Counter()          # "for" / "while"
+        self.functions = {}             # name -> ast.FunctionDef (last definition wins)
+        self.function_nodes = []        # every definition, in ast.walk order
+        self.assigned_names = set()     # targets of plain assignments
+        self.literals = set()           # constant values
+        if self.tree is not None:
+            self._index(self.tree)
+
+    @staticmethod
+    def _tokenize(code):
+        try:
+            tokens = tokenize.generate_tokens(io.StringIO(code).readline)
+            return {tok.string for tok in tokens if tok.type == tokenize.NAME}
+        except (tokenize.TokenError, IndentationError, SyntaxError):
+            return set(re.findall(r'[A-Za-z_]\w*', strip_comments(code)))
+
+    def _index(self, tree):
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call):
+                name = dotted_name(node.func)
+                if name is not None:
+                    self.calls[name] += 1
+                if isinstance(node.func, ast.Attribute):
+                    self.methods[node.func.attr] += 1
+                elif isinstance(node.func, ast.Name):
+                    self.methods[node.func.id] += 1
+            elif isinstance(node, ast.Import):
+                self.imports.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module:
+                self.imports.add(node.module)
+                self.imports.update(f"{node.module}.{alias.name}" for alias in node.names)
+            elif isinstance(node, (ast.For, ast.AsyncFor)):
+                self.loops["for"] += 1
+            elif isinstance(node, ast.While):
+                self.loops["while"] += 1
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.functions[node.name] = node
+                self.function_nodes.append(node)
+            elif isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        self.assigned_names.add(target.id)
+            elif isinstance(node, ast.Constant):
+                self.literals.add(node.value)
+
+    # -- text queries -------------------------------------------------------
+
+    def __contains__(self, fragment):
+        return fragment in self.active
+
+    def count(self, fragment):
+        return self.active.count(fragment)
+
+    def search(self, pattern):
+        """``re.search`` over the active code."""
+        return re.search(pattern, self.active)
+
+    # -- AST queries --------------------------------------------------------
+
+    def has_call(self, name):
+        """True when ``name`` is called (``"print"``, ``"time.time"``...)."""
+        return self.calls[name] > 0
+
+    def has_loop(self, kind=None):
+        return self.loops[kind] > 0 if kind else sum(self.loops.values()) > 0
+
+    def _unparse(self, node):
+        if id(node) not in self._fn_sources:
+            self._fn_sources[id(node)] = ast.unparse(node)
+        return self._fn_sources[id(node)]
+
+    def function_source(self, name):
+        """``ast.unparse`` of the function ``name`` (cached), or None."""
+        node = self.functions.get(name)
+        return None if node is None else self._unparse(node)
+
+    def function_sources(self):
+        """``ast.unparse`` of every function definition, nested ones included."""
+        return [self._unparse(node) for node in self.function_nodes]
+
+    def function_contains(self, name, node_type):
+        node = self.functions.get(name)
+        return node is not None and any(isinstance(n, node_type) for n in ast.walk(node))
+
+    @property
+    def constants(self):
+        """Assigned names written in UPPER_CASE."""
+        return {n for n in self.assigned_names if n.isupper()}
+
+
+def analyze_code(user_code, strip=True):
+    """Return the (memoized) ``CodeIndex`` for ``user_code``; None counts as empty."""
+    code = user_code or ""
+    key = (hashlib.sha1(code.encode("utf-8", "surrogatepass")).hexdigest(), strip)
+    return _cache.get_or_build(key, lambda: CodeIndex(code, strip))
@@ -0,0 +1,106 @@
+"""Hit-testing of the robot against checkpoints and zones."""
+
+import math
+
+import numpy as np
+
+
+# from this many targets on, only the grid cells around the robot are tested
+GRID_MIN_TARGETS = 64
+
+
+class TargetIndex:
+    """Circular targets the robot has to drive into.
+
+    ``points`` are target centres (x, y) and ``radius`` is one radius for all
+    of them or one per target, in whatever unit the robot position is given
+    in. A target is entered when the robot is strictly closer than its
+    radius, the same ``sqrt(dx**2 + dy**2) < radius`` test the checkers did
+    one target at a time, here done for every candidate in one array
+    operation. Large sets are bucketed into a grid of ``max(radius)`` cells
+    so only the 3x3 cells around the robot are looked at.
+
+    ``ordered=True`` is a route: only the next target that has not been
+    reached can be entered, so at most one per frame. Otherwise every target
+    the robot is inside gets reached on the same frame.
+
+    ``reached`` is the state bit per target and ``order`` the indices in the
+    order they were reached.
+    """
+
+    def __init__(self, points, radius, ordered=False):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.radii = np.broadcast_to(
+            np.asarray(radius, dtype=np.float64), (len(self.points),)).copy()
+        self.ordered = ordered
+        self.reached = np.zeros(len(self.points), dtype=bool)
+        self.order = []
+        self._grid = None
+        if not ordered and len(self.points) >= GRID_MIN_TARGETS:
+            self._build_grid()
+
+    def __len__(self):
+        return len(self.points)
+
+    def _build_grid(self):
+        self._cell = float(self.radii.max()) or 1.0
+        cells = np.floor(self.points / self._cell).astype(np.int64)
+        grid = {}
+        for i, (cx, cy) in enumerate(cells):
+            grid.setdefault((int(cx), int(cy)), []).append(i)
+        self._grid = {key: np.array(ids) for key, ids in grid.items()}
+
+    def _candidates(self, point):
+        if self._grid is None:
+            return None
+        cx = math.floor(point[0] / self._cell)
+        cy = math.floor(point[1] / self._cell)
+        found = [self._grid[key] for key in
+                 ((cx + dx, cy + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+                 if key in self._grid]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def _inside(self, point, ids=None):
+        points = self.points if ids is None else self.points[ids]
+        radii = self.radii if ids is None else self.radii[ids]
+        dx = point[0] - points[:, 0]
+        dy = point[1] - points[:, 1]
+        return np.sqrt(dx * dx + dy * dy) < radii
+
+    @property
+    def next_index(self):
+        """Index of the first target not reached yet, None when all are."""
+        left = np.flatnonzero(~self.reached)
+        return int(left[0]) if len(left) else None
+
+    @property
+    def count(self):
+        return len(self.order)
+
+    @property
+    def done(self):
+        return len(self.order) == len(self.points)
+
+    def inside(self, point):
+        """Bool per target: is ``point`` within its radius."""
+        return self._inside(point)
+
+    def update(self, point):
+        """Mark the targets entered at ``point``; returns their indices, ascending."""
+        if point is None or self.done:
+            return []
+        if self.ordered:
+            i = self.next_index
+            ids = np.array([i])
+        else:
+            ids = self._candidates(point)
+            if ids is None:
+                ids = np.flatnonzero(~self.reached)
+            else:
+                ids = np.sort(ids[~self.reached[ids]])
+        if not len(ids):
+            return []
+        entered = [int(i) for i in ids[self._inside(point, ids)]]
+        self.reached[entered] = True
+        self.order.extend(entered)
+        return entered
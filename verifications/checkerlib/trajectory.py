@@ -0,0 +1,119 @@
+"""Robot path overlays."""
+
+import math
+
+import cv2
+import numpy as np
+
+
+class TrajectoryLayer:
+    """Persistent overlay of the robot path for one verification run.
+
+    Each new point is rasterised once into a private canvas and mask: a dot,
+    plus a thicker line from the previous point when they are more than 1 px
+    apart. ``draw`` then composites the canvas onto the frame with one masked
+    copy limited to the area touched so far, so the per-frame cost does not
+    grow with the length of the run.
+    """
+
+    def __init__(self, color, width, restore=True):
+        self.color = color
+        self.width = width
+        self.restore = restore
+        self.canvas = None
+        self.mask = None
+        self.last_point = None
+        self.bounds = None  # x0, y0, x1, y1 of everything drawn so far
+        self._pending = []
+
+    def add(self, point):
+        """Queue ``point`` (x, y in pixels); it is rasterised on the next ``draw``."""
+        self._pending.append((int(point[0]), int(point[1])))
+
+    def _allocate(self, shape):
+        # the camera stream keeps a fixed size; a change starts a fresh layer
+        self.canvas = np.zeros(shape, dtype=np.uint8)
+        self.mask = np.zeros(shape[:2], dtype=np.uint8)
+        self.last_point = None
+        self.bounds = None
+
+    def _rasterise(self, point):
+        prev = self.last_point
+        cv2.circle(self.canvas, point, self.width, self.color, -1)
+        cv2.circle(self.mask, point, self.width, 255, -1)
+        reach = self.width
+        if self.restore and prev is not None and math.sqrt(
+                (prev[0] - point[0]) ** 2 + (prev[1] - point[1]) ** 2) > 1:
+            cv2.line(self.canvas, prev, point, self.color, int(self.width * 2))
+            cv2.line(self.mask, prev, point, 255, int(self.width * 2))
+            reach = self.width * 2
+        xs = [point[0]] if prev is None else [point[0], prev[0]]
+        ys = [point[1]] if prev is None else [point[1], prev[1]]
+        box = (min(xs) - reach, min(ys) - reach, max(xs) + reach + 1, max(ys) + reach + 1)
+        if self.bounds is None:
+            self.bounds = box
+        else:
+            self.bounds = (min(self.bounds[0], box[0]), min(self.bounds[1], box[1]),
+                           max(self.bounds[2], box[2]), max(self.bounds[3], box[3]))
+        self.last_point = point
+
+    def draw(self, image):
+        """Rasterise queued points and composite the whole path onto ``image``."""
+        if self.canvas is None or self.canvas.shape != image.shape:
+            self._allocate(image.shape)
+        for point in self._pending:
+            self._rasterise(point)
+        self._pending.clear()
+        if self.bounds is None:
+            return image
+        x0, y0 = max(0, self.bounds[0]), max(0, self.bounds[1])
+        x1, y1 = min(image.shape[1], self.bounds[2]), min(image.shape[0], self.bounds[3])
+        if x0 < x1 and y0 < y1:
+            cv2.copyTo(self.canvas[y0:y1, x0:x1], self.mask[y0:y1, x0:x1], image[y0:y1, x0:x1])
+        return image
+
+
+class TrajectoryStore:
+    """Robot path of one run: its length, and its overlay through a layer.
+
+    ``add`` keeps a point when it is at least ``min_step`` away from the last
+    kept one, like the checkers' own ``MIN_DIST_PX`` filters, and hands kept
+    points to ``layer`` (a ``TrajectoryLayer``) when there is one; ``draw``
+    draws it. The points themselves are not stored: the layer has rasterised
+    them, and the checkers only read ``length``.
+
+    ``length`` is the path length over every sample passed to ``add``, in the
+    units of ``position`` when that is given (cm from ``robot.position``) and
+    otherwise of ``point``.
+    """
+
+    def __init__(self, min_step=0, layer=None):
+        self.min_step = min_step
+        self.layer = layer
+        self.length = 0.0
+        self._last_kept = None
+        self._last_sample = None
+
+    def add(self, point, position=None):
+        """Record a sample (x, y px); returns True when it was kept."""
+        sample = point if position is None else position
+        if self._last_sample is not None:
+            self.length += math.sqrt((sample[0] - self._last_sample[0]) ** 2 +
+                                     (sample[1] - self._last_sample[1]) ** 2)
+        self._last_sample = sample
+
+        point = (int(point[0]), int(point[1]))
+        last = self._last_kept
+        if last is not None and math.sqrt(
+                (point[0] - last[0]) ** 2 + (point[1] - last[1]) ** 2) < self.min_step:
+            return False
+        self._last_kept = point
+        if self.layer is not None:
+            self.layer.add(point)
+        return True
+
+    def draw(self, image):
+        """Draw the path through ``layer``; a no-op without one."""
+        if self.layer is not None:
+            self.layer.draw(image)
+        return image
@@ -0,0 +1,39 @@
+"""Ending a run as soon as its verdict can no longer change.
+
+Checkers give their verdict in a block that fires once ``td["end_time"]``
+is close, and the worker ends the run when ``result["success"]`` turns
+False or the clock passes ``td["end_time"]``. A checker that knows the
+verdict is already fixed (code that fails validation, a pass that later
+frames cannot take away, a limit crossed for good) calls ``settle``
+before its verdict block: the end of the run is moved to now, the
+verdict block fires on this same frame with the result it would have
+given at the end of the window, and the worker stops after it.
+"""
+
+import time
+
+
+# end_time is put this far in the past, so "now > end_time" holds on this
+# frame even with the replay clock, which does not move within a frame
+_PAST = 1e-3
+
+
+def settle(td, reason, now=None):
+    """Mark the run decided for ``reason`` and end it on this frame.
+
+    Returns True the first time, False once the run is already settled.
+    """
+    if td.get("settled"):
+        return False
+    now = time.time() if now is None else now
+    td["end_time"] = min(td["end_time"], now - _PAST)
+    td["settled"] = reason
+    return True
+
+
+def settle_when(td, **conditions):
+    """``settle`` for the first true keyword, e.g. ``invalid_code=not valid``."""
+    for reason, met in conditions.items():
+        if met:
+            return settle(td, reason)
+    return False
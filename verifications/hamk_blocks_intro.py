@@ -1,25 +1,45 @@
 """Verified copies of the first two physical checks from legacy module_1."""
 
-import math
+import os
+import sys
 import time
 
+_VERIFICATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _VERIFICATIONS_DIR not in sys.path:
+    sys.path.insert(0, _VERIFICATIONS_DIR)
+
+from checkerlib.frames import FULL, NONE, POSE, draw_info
+from checkerlib.messages import MessageInbox
+from checkerlib.pose import PoseTracker
+from checkerlib.preflight import Preflight
+
 
 TARGET_POINTS = {
     "hamk_blocks_welcome": [(35, 50), (30, 0)],
     "hamk_blocks_test_drive": [(35, 50), (30, 0)],
 }
 
+FRAME_NEEDS = {
+    "hamk_blocks_welcome": NONE,
+    "hamk_blocks_test_drive": POSE,
+}
+
 
 def get_target_points(task):
     return TARGET_POINTS.get(task, [])
 
 
-def get_block_library_functions(_task):
-    return False
+def get_frame_needs(task):
+    return FRAME_NEEDS.get(task, FULL)
 
 
-def _delta_points(point_0, point_1):
-    return math.sqrt(((point_0[0] - point_1[0]) ** 2) + ((point_0[1] - point_1[1]) ** 2))
+def preflight(task, user_code):
+    """No task here checks the code statically: every submission gets a robot."""
+    return Preflight()
+
+
+def get_block_library_functions(_task):
+    return False
 
 
 def hamk_blocks_welcome(robot, image, td, _user_code=None):
@@ -28,11 +48,12 @@ def hamk_blocks_welcome(robot, image, td, _user_code=None):
         "description": "Connection established! System check complete.",
         "score": 100,
     }
-    image = robot.draw_info(image)
-    msg = robot.get_msg()
+    image = draw_info(robot, image)
 
     if not td:
-        td = {"start_time": time.time(), "end_time": time.time() + 10}
+        td = {"start_time": time.time(), "end_time": time.time() + 10, "inbox": MessageInbox()}
+    new_msgs = td["inbox"].poll(robot)
+    msg = new_msgs[-1] if new_msgs else None
 
     if time.time() > td["end_time"]:
         text = "Link: Stable"
@@ -56,21 +77,22 @@ def hamk_blocks_test_drive(robot, image, td, _user_code=None):
         td = {
             "end_time": time.time() + 10,
             "time_for_task": 3,
-            "prev_robot_center": None,
+            "pose": PoseTracker(),
         }
 
     robot_position = robot.get_info()["position"]
     text = "Not recognized"
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
 
-    if td["prev_robot_center"] is not None and robot_position is not None:
-        delta_pos = _delta_points(robot_position, td["prev_robot_center"])
+    pose = td["pose"].update(robot)
+    if robot_position is not None:
         text = f"Robot position: x: {robot_position[0]:0.1f} y: {robot_position[1]:0.1f}"
-        if "robot_start_move_time" not in td and delta_pos > 0.7:
-            td["robot_start_move_time"] = time.time()
-            td["end_time"] = time.time() + td["time_for_task"] + 3
-        if "robot_start_move_time" in td and "robot_end_move_time" not in td and delta_pos < 0.7:
-            td["robot_end_move_time"] = time.time()
+        # changed_at is back-dated to the first frame of the start / stop
+        if "robot_start_move_time" not in td and pose.moving:
+            td["robot_start_move_time"] = pose.changed_at
+            td["end_time"] = pose.changed_at + td["time_for_task"] + 3
+        if "robot_start_move_time" in td and "robot_end_move_time" not in td and not pose.moving:
+            td["robot_end_move_time"] = pose.changed_at
 
     too_late = "robot_end_move_time" not in td and td["end_time"] - 1 < time.time()
     wrong_duration = (
@@ -90,7 +112,4 @@ def hamk_blocks_test_drive(robot, image, td, _user_code=None):
             result["description"] = "The robot moved more than it should have."
         else:
             result["description"] = "The robot moved less than it should have."
-
-    if robot_position:
-        td["prev_robot_center"] = robot_position
     return image, td, text, result
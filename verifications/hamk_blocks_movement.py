@@ -1,7 +1,16 @@
 """Additive pilot checkers for the HAMK block-course movement module."""
 
+import os
+import sys
 import time
 
+_VERIFICATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _VERIFICATIONS_DIR not in sys.path:
+    sys.path.insert(0, _VERIFICATIONS_DIR)
+
+from checkerlib.frames import FULL
+from checkerlib.preflight import Preflight
+
 
 def get_target_points(task):
     targets = {
@@ -11,6 +20,16 @@ def get_target_points(task):
     return targets[task]
 
 
+def get_frame_needs(task):
+    """The pilots await camera calibration, which will need the whole frame."""
+    return FULL
+
+
+def preflight(task, user_code):
+    """No task here checks the code statically: every submission gets a robot."""
+    return Preflight()
+
+
 def _pending_calibration(_robot, frame, td, _code):
     if td is None:
         td = {"end_time": time.time() + 5, "data": {}}
@@ -1,6 +1,15 @@
-import cv2
-import math
 import time
+import os
+import sys
+
+_VERIFICATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _VERIFICATIONS_DIR not in sys.path:
+    sys.path.insert(0, _VERIFICATIONS_DIR)
+
+from checkerlib.frames import FULL
+from checkerlib.messages import MessageInbox
+from checkerlib.preflight import Preflight
+from checkerlib.trajectory import TrajectoryLayer, TrajectoryStore
 
 
 # start points for the tasks
@@ -16,6 +25,10 @@ block_library_functions = {
     'sandbox': False,
 }
 
+frame_needs = {
+    'sandbox': FULL,
+}
+
 # function to get value from dictionary block_library_functions
 def get_block_library_functions(task):
     global block_library_functions
@@ -28,20 +41,14 @@ def get_target_points(task):
     return target_points[task]
 
 
-def restore_trajectory(image, prev_point, point, color, width):
-    """Function for restoring trajectory if robot was not recognized"""
-    cv2.line(image, prev_point, point, color, width)
+# function to get value from dictionary frame_needs
+def get_frame_needs(task):
+    return frame_needs.get(task, FULL)
 
 
-def draw_trajectory(image, points, color, width, restore):
-    """Function for drawing point trajectory"""
-    prev_point = None
-    for point in points:
-        cv2.circle(image, point, width, color, -1)
-        if restore and prev_point is not None and math.sqrt(
-                (prev_point[0] - point[0]) ** 2 + (prev_point[1] - point[1]) ** 2) > 1:
-            restore_trajectory(image, prev_point, point, color, int(width * 2))
-        prev_point = point
+def preflight(task, user_code):
+    """No task here checks the code statically: every submission gets a robot."""
+    return Preflight()
 
 
 def sandbox(robot, image, td: dict, user_code=None):
@@ -59,7 +66,8 @@ def sandbox(robot, image, td: dict, user_code=None):
     if not td:
         td = {
             "end_time": time.time() + 60,
-            'trajectory': []
+            'trajectory': TrajectoryStore(layer=TrajectoryLayer((255, 0, 0), 3)),
+            'inbox': MessageInbox(),
         }
     image = robot.draw_info(image)
     # get robot position in pixels
@@ -68,15 +76,13 @@ def sandbox(robot, image, td: dict, user_code=None):
     robot_position = info['position']
     # if robot found on the image then add point to trajectory
     if robot_position is not None:
-        td['trajectory'].append(robot_position_px)
+        td['trajectory'].add(robot_position_px)
         text = f'Robot position: x: {robot_position[0]:0.1f} y: {robot_position[1]:0.1f}'
     # draw trajectory
-    if len(td['trajectory'])>0:
-        draw_trajectory(image, td['trajectory'], (255, 0, 0), 3, True)
+    td['trajectory'].draw(image)
     
-    # get message from the robot
-    msg = robot.get_msg()
-    if msg is not None:
+    # get messages from the robot, show the latest one
+    for msg in td['inbox'].poll(robot):
         text = f"Message received: {msg}"
 
     return image, td, text, result
@@ -1,10 +1,22 @@
-import cv2
 import math
 import time
 import os
+import sys
 import numpy as np
 import re
 
+_VERIFICATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _VERIFICATIONS_DIR not in sys.path:
+    sys.path.insert(0, _VERIFICATIONS_DIR)
+
+from checkerlib.assets import luma_sprite
+from checkerlib.frames import FULL, NONE, POSE, draw_info
+from checkerlib.messages import MessageInbox
+from checkerlib.preflight import Preflight, code_failure, run_preflight
+from checkerlib.rotation import RotationTracker, TurnQueue
+from checkerlib.route import compile_robot_route, RouteProgress
+from checkerlib.sprites import blit_many
+
 
 target_points = {
     'welcome': [(35, 50), (30, 0)],
@@ -26,6 +38,16 @@ block_library_functions = {
     'sequential_navigation': False,
 }
 
+frame_needs = {
+    'welcome': NONE,
+    'test_drive': POSE,
+    'license_to_drive': POSE,
+    'directional_movement': POSE,
+    'python_variables_commands': POSE,
+    'maneuvering': POSE,
+    'sequential_navigation': FULL,
+}
+
 def get_block_library_functions(task):
     global block_library_functions
     return block_library_functions[task]
@@ -36,6 +58,15 @@ def get_target_points(task):
     """Retrieve target points for a given task."""
     return target_points.get(task, [])
 
+
+def get_frame_needs(task):
+    """Retrieve what the checker of a task needs from the camera frame."""
+    return frame_needs.get(task, FULL)
+
+def preflight(task, user_code):
+    """Static code checks of ``task`` without a robot (see ``checkerlib.preflight``)."""
+    return run_preflight(preflight_checks, task, user_code)
+
 def delta_points(point_0, point_1):
     return math.sqrt(((point_0[0] - point_1[0]) ** 2) +
                      ((point_0[1] - point_1[1]) ** 2))
@@ -47,11 +78,12 @@ def welcome(robot, image, td: dict, user_code=None):
         "description": "Connection established! System check complete.",
         "score": 100
     }
-    image = robot.draw_info(image)
-    msg = robot.get_msg()
+    image = draw_info(robot, image)
 
     if not td:
-        td = {"start_time": time.time(), "end_time": time.time() + 10}
+        td = {"start_time": time.time(), "end_time": time.time() + 10, "inbox": MessageInbox()}
+    new_msgs = td["inbox"].poll(robot)
+    msg = new_msgs[-1] if new_msgs else None
 
     if time.time() > td["end_time"]:
         text = "Link: Stable"
@@ -85,7 +117,7 @@ def test_drive(robot, image, td: dict, user_code=None):
     robot_position = robot.get_info()["position"]
 
     text = "Not recognized"
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
 
     # check if robot position is not none and previous robot is not none
     if  td["prev_robot_center"] is not None and robot_position is not None:
@@ -143,7 +175,7 @@ def directional_movement(robot, image, td: dict, user_code=None):
         "score": 100
     }
     text = "Not recognized"
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
     # Initialize the dictionary with consistent structure
     if not td:
         td = {
@@ -198,6 +230,21 @@ def directional_movement(robot, image, td: dict, user_code=None):
 
     return image, td, text, result
 
+def _python_variables_commands_code(user_code):
+    # Code style check
+    missing = []
+    if not re.search(r"=\s*\d+\.\d+", user_code):
+        missing.append("float variable")
+    if not re.search(r"=\s*\d+", user_code):
+        missing.append("int variable")
+    if "+" not in user_code:
+        missing.append("'+'")
+    if "print" not in user_code:
+        missing.append("print()")
+    if not missing:
+        return Preflight()
+    return Preflight(missing, code_failure("Task failed. Use variables (int, float), '+' and print()."))
+
 def python_variables_commands(robot, image, td: dict, user_code):
     """Test for Mission 1.5 Python Variables & Commands"""
     
@@ -205,36 +252,34 @@ def python_variables_commands(robot, image, td: dict, user_code):
         td = {
             "end_time": time.time() + 25,
             "prev_robot_center": None,
-            "goal": {"forward": 15, "backward": 20.5}
+            "goal": {"forward": 15, "backward": 20.5},
+            "preflight": _python_variables_commands_code(user_code),
         }
 
     # Physical movement check
     image, td, text, move_result = directional_movement(robot, image, td)
 
-    # Code style check
-    has_float = re.search(r"=\s*\d+\.\d+", user_code)
-    has_int = re.search(r"=\s*\d+", user_code)
-    has_plus = "+" in user_code
-    has_print = "print" in user_code
-    code_is_correct = has_float and has_int and has_plus and has_print
-
     # Final judgment logic
     time_up = time.time() > td["end_time"]
     movement_done = (td['goal']['forward'] <= 3 and td['goal']['backward'] <= 3)
 
     # If physical task is finished or time is out, check the code style
     if movement_done or time_up:
-        if not code_is_correct:
-            move_result.update({
-                "success": False,
-                "score": 0,
-                "description": "Task failed. Use variables (int, float), '+' and print()."
-            })
+        if not td["preflight"].ok:
+            move_result.update(td["preflight"].result)
             # Return current position (text) along with the error
             return image, td, text, move_result
         
     return image, td, text, move_result
 
+def _maneuvering_code(user_code):
+    # Code style check: the 145 degree turn takes a variable, not a number
+    param_match = re.search(r"turn_left_angle\s*\(\s*([^)]+)\s*\)", user_code)
+    if param_match and not re.match(r"^\d+\.?\d*$", param_match.group(1).strip()):
+        return Preflight()
+    return Preflight(["variable for the 145 degree turn"], code_failure(
+        "Task failed. Use a variable for the 145 degree turn. | Score: 0"))
+
 def maneuvering(robot, image, td: dict, user_code): 
     """Test for Mission 1.6 Maneuvering"""
 
@@ -244,72 +289,31 @@ def maneuvering(robot, image, td: dict, user_code):
         "score": 100  
     }
     text = "Not recognized"
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
     # Initialize the task dictionary
     if not td:
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 20,
-            "target_angle": [
-                {"left": 145, "right": 0},
-                {"left": 90, "right": 0},
-                {"left": 0, "right": 90}
-            ]
+            "rotation": RotationTracker(),
+            "turns": TurnQueue([("right", 90), ("left", 90), ("left", 145)],
+                               switch=10, tolerance=15),
+            "preflight": _maneuvering_code(user_code),
         }
 
-    min_for_error = 15
     min_for_change_point = 10
 
     if robot is not None:
-        # ✅ FIX: Removed the extra argument
         ang = robot.compute_angle_x()
+        td["turns"].update(td["rotation"].update(ang))
 
-        if 'ang_0' in td:
-            if td['ang_0'] < 90 and ang > 300:
-                td['ang_0'] = 360 + td['ang_0']
-            elif td['ang_0'] > 300 and ang < 90:
-                td['ang_0'] -= 360
-
-            delta_ang = ang - td['ang_0']
+        if td["turns"].done_count == len(td["turns"].turns) and td["end_time"] - td["start_time"] == 12:
+            td["end_time"] = time.time() + 1
 
-            if delta_ang < 0:
-                td['target_angle'][-1]['right'] += delta_ang
-            else:
-                td['target_angle'][-1]['left'] -= delta_ang
-
-        if (
-            td['target_angle'][-1]['left'] < min_for_change_point and
-            td['target_angle'][-1]['right'] < min_for_change_point
-        ):
-            if len(td['target_angle']) > 1:
-                td['target_angle'].pop()
-            elif td["end_time"] - td["start_time"] == 12:
-                td["end_time"] = time.time() + 1
-
-        text = f"Current angle with x-axis: {ang:0.0f}"
-        td['ang_0'] = ang
-
-    # Code style check
-    style_ok = True
-    param_match = re.search(r"turn_left_angle\s*\(\s*([^)]+)\s*\)", user_code)
-    if param_match:
-        param = param_match.group(1).strip()
-        if re.match(r"^\d+\.?\d*$", param): # If only digits
-            style_ok = False
-    else:
-        style_ok = False
+        if ang is not None:
+            text = f"Current angle with x-axis: {ang:0.0f}"
 
-    if (
-        td['target_angle'][-1]['left'] < -min_for_error or
-        td['target_angle'][-1]['right'] < -min_for_error or
-        (
-            td['end_time'] - time.time() < 2 and
-            (
-                td['target_angle'][0]['right'] > min_for_error or
-                td['target_angle'][0]['left'] > min_for_error
-            )
-        )
-    ):
+    if td["turns"].overshoot or (td['end_time'] - time.time() < 2 and not td["turns"].complete):
         result["success"] = False
         result["score"] = 0 
         result["description"] = (
@@ -317,53 +321,29 @@ def maneuvering(robot, image, td: dict, user_code):
             f"The robot had to turn more: "
         )
 
-        for i in range(len(td['target_angle']) - 1, -1, -1):
-            if abs(td['target_angle'][i]['right']) > min_for_change_point:
+        for turn in td["turns"].pending():
+            if abs(turn['right']) > min_for_change_point:
                 result["description"] += (
-                    f"{int(td['target_angle'][i]['right'])} degrees right; "
+                    f"{int(turn['right'])} degrees right; "
                 )
-            if abs(td['target_angle'][i]['left']) > min_for_change_point:
+            if abs(turn['left']) > min_for_change_point:
                 result["description"] += (
-                    f"{int(td['target_angle'][i]['left'])} degrees left; "
+                    f"{int(turn['left'])} degrees left; "
                 )
 
-    if result["success"] and not style_ok:
-        result["success"] = False
-        result["score"] = 0
-        result["description"] = "Task failed. Use a variable for the 145 degree turn."
+    if result["success"] and not td["preflight"].ok:
+        result.update(td["preflight"].result)
+    else:
+        result["description"] += f' | Score: {result["score"]}'
 
-    result["description"] += f' | Score: {result["score"]}'  
     return image, td, text, result
 
-def calculate_target_point(rb, targets):
-    """Calculate the target points based on the robot's current position and movement directions."""
-    
-    # Get the robot's position properly
-    pos = rb.get_info().get("position")
-    
-    if pos is None:
-        print("Error: Robot position is None")
-        return []
-
-    point = [pos[0], pos[1]]
-    direction = rb.compute_angle_x()
-
-    res = []
-    for target in targets:
-        if isinstance(target, dict):
-            point[0] += target['forward'] * math.cos(math.radians(direction))
-            point[0] -= target['backward'] * math.cos(math.radians(direction))
-            point[1] -= target['forward'] * math.sin(math.radians(direction))
-            point[1] += target['backward'] * math.sin(math.radians(direction))
-            res.append((point[0], point[1]))
-        else:
-            # Handle reversed y-axis
-            direction += target[0]['left']
-            direction -= target[0]['right']
-
-    res.reverse()
-    return res
-
+def _sequential_navigation_code(user_code):
+    # Code style check
+    if user_code.count('#') >= 3:
+        return Preflight()
+    return Preflight(["at least 3 comments (#)"], code_failure(
+        "Task failed. Use at least 3 comments (#) in your code."))
 
 def sequential_navigation(robot, image, td: dict, user_code): 
     """Test for Mission 1.7 Sequential navigation"""
@@ -382,14 +362,14 @@ def sequential_navigation(robot, image, td: dict, user_code):
             "end_time": time.time() + 30,
             "data": {},
             "delta": 4,
-            "reached_point": False
+            "reached_point": False,
+            "rotation": RotationTracker(),
+            "preflight": _sequential_navigation_code(user_code),
         }
 
-    # Code style check
-    comments_count = user_code.count('#')
-    style_ok = comments_count >= 3
-
-    if not td["data"] and robot:
+    # the route is built from the pose: wait until both position and heading are seen
+    if (not td["data"] and robot and robot.get_info().get("position") is not None
+            and robot.compute_angle_x() is not None):
         route = [
             {'forward': 35, 'backward': 0},
             [{'left': 90, 'right': 0}],
@@ -400,70 +380,50 @@ def sequential_navigation(robot, image, td: dict, user_code):
             {'forward': 25, 'backward': 0}
         ]
 
-        td["data"]['targets'] = calculate_target_point(robot, route)
-        td["data"]['delta'] = 4
+        td["route"] = compile_robot_route(robot, route)
+        # turns are reported alongside the checkpoints, the verdict stays on the route
+        td["turns"] = TurnQueue(td["route"].turns)
         td["data"]['reached_point'] = False
 
-        # Load single mineral image
-        basepath = os.path.abspath(os.path.dirname(__file__))
-        filepath = os.path.join(basepath, 'images', 'mineral.png')
-        
-        mineral_img = cv2.imread(filepath)
-        
-        if mineral_img is None:
+        # Load single mineral image, scaled to match original fruit size
+        mineral = luma_sprite("mineral.png", scale=0.2)
+
+        if mineral is None:
             print("Error: Could not load mineral.png")
             td["data"]["mineral"] = None
             td["data"]["mask"] = None
         else:
-            # Resize mineral to match original fruit size
-            original_height = mineral_img.shape[0]
-            original_width = mineral_img.shape[1]
-            new_height = int(original_height * 0.2)
-            new_width = int(original_width * 0.2)
-            mineral_img = cv2.resize(mineral_img, (new_width, new_height))
-            
-            # Create mask: non-black pixels are visible
-            gray = cv2.cvtColor(mineral_img, cv2.COLOR_BGR2GRAY)
-            _, mask = cv2.threshold(gray, 10, 255, cv2.THRESH_BINARY)
-            
-            td["data"]["mineral"] = mineral_img
-            td["data"]["mask"] = mask
-        
-        # Track which checkpoints are still visible
-        td["data"]["checkpoint_visible"] = [True] * 4
+            td["data"]["mineral"], td["data"]["mask"] = mineral
         
+        td["progress"] = RouteProgress(td["route"])
         td["data"]['coordinates'] = [
-            (robot.cm_to_pixel(x), robot.cm_to_pixel(y)) for x, y in td["data"]['targets']
+            (robot.cm_to_pixel(x), robot.cm_to_pixel(y)) for x, y in td["route"].points
         ]
 
     d = None
 
-    if robot:
+    if robot and td["data"]:
+        td["turns"].update(td["rotation"].update(robot.compute_angle_x()))
         robot_position = robot.get_info().get("position")
         if robot_position is not None:
-            d = delta_points(robot_position, td["data"]['targets'][-1])
+            progress = td["progress"]
+            target = progress.target
+            reached = progress.update(robot_position)
+            d = progress.distance
             text = (
-                f'The distance to the next ({td["data"]["targets"][-1][0]:0.0f}, '
-                f'{td["data"]["targets"][-1][1]:0.0f}) point is {d:0.0f}'
+                f'The distance to the next ({target[0]:0.0f}, '
+                f'{target[1]:0.0f}) point is {d:0.0f}, '
+                f'turns: {td["turns"].done_count}/{len(td["turns"].turns)}'
             )
 
-            if d < td["data"]['delta']:
-                if len(td["data"]['targets']) > 1:
-                    # Mark this checkpoint as collected
-                    checkpoint_index = len(td["data"]['targets']) - 1
-                    td["data"]["checkpoint_visible"][checkpoint_index] = False
-                    
-                    td["data"]['delta'] += 1.3
-                    td["data"]['targets'].pop()
-                elif not td["data"]['reached_point']:
-                    # Final checkpoint collected
-                    td["data"]["checkpoint_visible"][0] = False
-                    td["data"]['reached_point'] = True
-                    td["end_time"] = time.time() + 4
+            if reached is not None and progress.finished:
+                # Final checkpoint collected
+                td["data"]['reached_point'] = True
+                td["end_time"] = time.time() + 4
 
     if d is not None and td["end_time"] - time.time() < 2 and (
-            len(td["data"]['targets']) != 1 or d > td["data"]['delta']):
-        if len(td["data"]['targets']) > 1:
+            not td["progress"].on_last or d > td["progress"].tolerance):
+        if not td["progress"].on_last:
             text = "Robot missed several checkpoints"
         else:
             text = (
@@ -477,28 +437,24 @@ def sequential_navigation(robot, image, td: dict, user_code):
     # Final check
     time_up = time.time() > td["end_time"]
     if td["data"].get('reached_point') or time_up:
-        if not style_ok and result["success"]:
-            result.update({"success": False, "score": 0, 
-                           "description": "Task failed. Use at least 3 comments (#) in your code."})
+        if not td["preflight"].ok and result["success"]:
+            result.update(td["preflight"].result)
 
     # Draw minerals at checkpoint locations with masking
     if td["data"] and td["data"]["mineral"] is not None and td["data"]["mask"] is not None:
         mineral = td["data"]["mineral"]
         mask = td["data"]["mask"]
         
-        # Use same positioning as original code
-        ymin = mineral.shape[0] // 2
-        ymax = mineral.shape[0] - ymin
-        xmin = mineral.shape[1] // 2
-        xmax = mineral.shape[1] - xmin
-        
-        for i, (x, y) in enumerate(td["data"]['coordinates']):
-            # Only draw if checkpoint is still visible
-            if i < len(td["data"]["checkpoint_visible"]) and td["data"]["checkpoint_visible"][i]:
-                # Check bounds before drawing
-                if (y - ymin >= 0 and y + ymax <= image.shape[0] and 
-                    x - xmin >= 0 and x + xmax <= image.shape[1]):
-                    # Use cv2.copyTo to apply mask (only non-black pixels)
-                    cv2.copyTo(mineral, mask, image[y - ymin:y + ymax, x - xmin:x + xmax])
+        # Only draw checkpoints not collected yet, clipped at the frame edge
+        coordinates = td["data"]['coordinates']
+        blit_many(image, ((mineral, mask, coordinates[i])
+                          for i in range(len(coordinates) - 1, td["progress"].reached - 1, -1)))
 
     return image, td, text, result
+
+
+preflight_checks = {
+    "python_variables_commands": _python_variables_commands_code,
+    "maneuvering": _maneuvering_code,
+    "sequential_navigation": _sequential_navigation_code,
+}
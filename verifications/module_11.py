@@ -1,11 +1,25 @@
-import cv2
 import math
 import time
 import os
+import sys
 import numpy as np
 import re
 
-import ast
+_VERIFICATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _VERIFICATIONS_DIR not in sys.path:
+    sys.path.insert(0, _VERIFICATIONS_DIR)
+
+from checkerlib.assets import luma_sprite
+from checkerlib.frames import FULL, POSE, draw_info
+from checkerlib.pose import PoseTracker
+from checkerlib.preflight import Preflight, code_failure, from_missing, run_preflight
+from checkerlib.profiling import laps
+from checkerlib.rotation import RotationTracker
+from checkerlib.route import compile_robot_route, RouteProgress
+from checkerlib.source import analyze_code
+from checkerlib.sprites import blit_many
+from checkerlib.trajectory import TrajectoryLayer, TrajectoryStore
+from checkerlib.verdict import settle_when
 
 
 target_points = {
@@ -22,6 +36,13 @@ block_library_functions = {
     'adaptive_racing': False,
 }
 
+frame_needs = {
+    'navigation': FULL,
+    'perimeter': FULL,
+    'visual_telemetry': POSE,
+    'adaptive_racing': POSE,
+}
+
 def get_block_library_functions(task):
     global block_library_functions
     return block_library_functions[task]
@@ -32,58 +53,37 @@ def get_target_points(task):
     """Retrieve target points for a given task."""
     return target_points.get(task, [])
 
+
+def get_frame_needs(task):
+    """Retrieve what the checker of a task needs from the camera frame."""
+    return frame_needs.get(task, FULL)
+
+def preflight(task, user_code):
+    """Static code checks of ``task`` without a robot (see ``checkerlib.preflight``)."""
+    return run_preflight(preflight_checks, task, user_code)
+
 def delta_points(point_0, point_1):
     return math.sqrt(((point_0[0] - point_1[0]) ** 2) +
                      ((point_0[1] - point_1[1]) ** 2))
 
 
-def calculate_target_point(rb, targets):
-    """Calculate the target points based on the robot's current position and movement directions."""
-    
-    # Get the robot's position properly
-    pos = rb.get_info().get("position")
-    
-    if pos is None:
-        print("Error: Robot position is None")
-        return []
-
-    point = [pos[0], pos[1]]
-    direction = rb.compute_angle_x()
-
-    res = []
-    for target in targets:
-        if isinstance(target, dict):
-            point[0] += target['forward'] * math.cos(math.radians(direction))
-            point[0] -= target['backward'] * math.cos(math.radians(direction))
-            point[1] -= target['forward'] * math.sin(math.radians(direction))
-            point[1] += target['backward'] * math.sin(math.radians(direction))
-            res.append((point[0], point[1]))
-        else:
-            # Handle reversed y-axis
-            direction += target[0]['left']
-            direction -= target[0]['right']
-
-    res.reverse()
-    return res
-
-def draw_trajectory(image, points, color, width, restore):
-    """Function for drawing point trajectory"""
-    prev_point = None
-    for point in points:
-        cv2.circle(image, point, width, color, -1)
-        if restore and prev_point is not None and math.sqrt(
-                (prev_point[0] - point[0]) ** 2 + (prev_point[1] - point[1]) ** 2) > 1:
-            restore_trajectory(image, prev_point, point, color, int(width * 2))
-        prev_point = point
-
-def restore_trajectory(image, prev_point, point, color, width):
-    """Function for restoring trajectory if robot was not recognized"""
-    cv2.line(image, prev_point, point, color, width)
-
 # Task 1: Navigation
 
+def _navigation_code(user_code):
+    # Code style check
+    missing = []
+    if user_code.count('#') < 2:
+        missing.append("at least 2 comments (#)")
+    if not re.search(r'\w+\s*=\s*\d+', user_code):
+        missing.append("variables (e.g., dist = 20)")
+    if not missing:
+        return Preflight()
+    return Preflight(missing, code_failure(
+        "Task failed. Use variables (e.g., dist = 20) and at least 2 comments (#) in your code."))
+
 def navigation(robot, image, td: dict, user_code): 
     """Test for task 1 navigation"""
+    lap = laps("module_11.navigation")
 
     result = {
         "success": True,
@@ -92,6 +92,7 @@ def navigation(robot, image, td: dict, user_code):
     }
     text = "Not recognized"
     image = robot.draw_info(image)
+    lap("overlay")
 
     if not td:
         td = {
@@ -99,16 +100,13 @@ def navigation(robot, image, td: dict, user_code):
             "end_time": time.time() + 30,
             "data": {},
             "delta": 4,
-            "reached_point": False
+            "reached_point": False,
+            "preflight": _navigation_code(user_code),
         }
 
-    # Code style check
-    comments_count = user_code.count('#')
-    has_variables = bool(re.search(r'\w+\s*=\s*\d+', user_code))
-
-    style_ok = (comments_count >= 2) and has_variables
-
-    if not td["data"] and robot:
+    # the route is built from the pose: wait until both position and heading are seen
+    if (not td["data"] and robot and robot.get_info().get("position") is not None
+            and robot.compute_angle_x() is not None):
         route = [
             {'forward': 20, 'backward': 0},
             [{'left': 45, 'right': 0}],
@@ -119,70 +117,48 @@ def navigation(robot, image, td: dict, user_code):
             {'forward': 40, 'backward': 0},
         ]
 
-        td["data"]['targets'] = calculate_target_point(robot, route)
-        td["data"]['delta'] = 4
+        td["route"] = compile_robot_route(robot, route)
         td["data"]['reached_point'] = False
 
-        # Load single mineral image
-        basepath = os.path.abspath(os.path.dirname(__file__))
-        filepath = os.path.join(basepath, 'images', 'mineral.png')
-        
-        mineral_img = cv2.imread(filepath)
-        
-        if mineral_img is None:
+        # Load single mineral image, scaled to match original fruit size
+        mineral = luma_sprite("mineral.png", scale=0.2)
+
+        if mineral is None:
             print("Error: Could not load mineral.png")
             td["data"]["mineral"] = None
             td["data"]["mask"] = None
         else:
-            # Resize mineral to match original fruit size
-            original_height = mineral_img.shape[0]
-            original_width = mineral_img.shape[1]
-            new_height = int(original_height * 0.2)
-            new_width = int(original_width * 0.2)
-            mineral_img = cv2.resize(mineral_img, (new_width, new_height))
-            
-            # Create mask: non-black pixels are visible
-            gray = cv2.cvtColor(mineral_img, cv2.COLOR_BGR2GRAY)
-            _, mask = cv2.threshold(gray, 10, 255, cv2.THRESH_BINARY)
-            
-            td["data"]["mineral"] = mineral_img
-            td["data"]["mask"] = mask
-        
-        # Track which checkpoints are still visible
-        td["data"]["checkpoint_visible"] = [True] * 4
+            td["data"]["mineral"], td["data"]["mask"] = mineral
         
+        td["progress"] = RouteProgress(td["route"])
         td["data"]['coordinates'] = [
-            (robot.cm_to_pixel(x), robot.cm_to_pixel(y)) for x, y in td["data"]['targets']
+            (robot.cm_to_pixel(x), robot.cm_to_pixel(y)) for x, y in td["route"].points
         ]
+    lap("init")
 
     d = None
 
-    if robot:
+    if robot and td["data"]:
         robot_position = robot.get_info().get("position")
         if robot_position is not None:
-            d = delta_points(robot_position, td["data"]['targets'][-1])
+            progress = td["progress"]
+            target = progress.target
+            reached = progress.update(robot_position)
+            d = progress.distance
             text = (
-                f'The distance to the next ({td["data"]["targets"][-1][0]:0.0f}, '
-                f'{td["data"]["targets"][-1][1]:0.0f}) point is {d:0.0f}'
+                f'The distance to the next ({target[0]:0.0f}, '
+                f'{target[1]:0.0f}) point is {d:0.0f}'
             )
 
-            if d < td["data"]['delta']:
-                if len(td["data"]['targets']) > 1:
-                    # Mark this checkpoint as collected
-                    checkpoint_index = len(td["data"]['targets']) - 1
-                    td["data"]["checkpoint_visible"][checkpoint_index] = False
-                    
-                    td["data"]['delta'] += 1.3
-                    td["data"]['targets'].pop()
-                elif not td["data"]['reached_point']:
-                    # Final checkpoint collected
-                    td["data"]["checkpoint_visible"][0] = False
-                    td["data"]['reached_point'] = True
-                    td["end_time"] = time.time() + 4
+            if reached is not None and progress.finished:
+                # Final checkpoint collected
+                td["data"]['reached_point'] = True
+                td["end_time"] = time.time() + 4
+    lap("position")
 
     if d is not None and td["end_time"] - time.time() < 2 and (
-            len(td["data"]['targets']) != 1 or d > td["data"]['delta']):
-        if len(td["data"]['targets']) > 1:
+            not td["progress"].on_last or d > td["progress"].tolerance):
+        if not td["progress"].on_last:
             text = "Robot missed several checkpoints"
         else:
             text = (
@@ -196,43 +172,51 @@ def navigation(robot, image, td: dict, user_code):
     # Final check
     time_up = time.time() > td["end_time"]
     if td["data"].get('reached_point') or time_up:
-        if not style_ok and result["success"]:
-            result.update({"success": False, "score": 0, 
-                           "description": "Task failed. Use variables (e.g., dist = 20) and at least 2 comments (#) in your code."})
+        if not td["preflight"].ok and result["success"]:
+            result.update(td["preflight"].result)
+    lap("verdict")
 
     # Draw minerals at checkpoint locations with masking
     if td["data"] and td["data"]["mineral"] is not None and td["data"]["mask"] is not None:
         mineral = td["data"]["mineral"]
         mask = td["data"]["mask"]
         
-        # Use same positioning as original code
-        ymin = mineral.shape[0] // 2
-        ymax = mineral.shape[0] - ymin
-        xmin = mineral.shape[1] // 2
-        xmax = mineral.shape[1] - xmin
-        
-        for i, (x, y) in enumerate(td["data"]['coordinates']):
-            # Only draw if checkpoint is still visible
-            if i < len(td["data"]["checkpoint_visible"]) and td["data"]["checkpoint_visible"][i]:
-                # Check bounds before drawing
-                if (y - ymin >= 0 and y + ymax <= image.shape[0] and 
-                    x - xmin >= 0 and x + xmax <= image.shape[1]):
-                    # Use cv2.copyTo to apply mask (only non-black pixels)
-                    cv2.copyTo(mineral, mask, image[y - ymin:y + ymax, x - xmin:x + xmax])
+        # Only draw checkpoints not collected yet, clipped at the frame edge
+        coordinates = td["data"]['coordinates']
+        blit_many(image, ((mineral, mask, coordinates[i])
+                          for i in range(len(coordinates) - 1, td["progress"].reached - 1, -1)))
+    lap("drawing")
 
     return image, td, text, result
 
 # Task 2: Perimeter
 
 import time
-import ast
+
+def _perimeter_code(user_code):
+    code = analyze_code(user_code)
+
+    syntax_ok = code.syntax_ok
+    has_for_loop = code.loops["for"] > 0
+
+    if not syntax_ok:
+        return Preflight(["valid syntax"], code_failure(
+            "Mission Failed: Syntax or Indentation Error. Check your spaces! | Score: 0"),
+            syntax_ok=False, has_for_loop=has_for_loop)
+    if not has_for_loop:
+        return Preflight(["for loop"], code_failure(
+            "Mission Failed: You must use a 'for' loop to automate the patrol! | Score: 0"),
+            syntax_ok=True, has_for_loop=False)
+    return Preflight(syntax_ok=True, has_for_loop=True)
 
 def perimeter(robot, image, td: dict, user_code=None):
     """Test for task 2 perimeter"""
+    lap = laps("module_11.perimeter")
 
     TASK_DURATION = 30  
     TRAJECTORY_COLOR = (255, 0, 0)
     TRAJECTORY_WIDTH = 3
+    MIN_DIST_PX = 5
 
     result = {
         "success": True,
@@ -242,34 +226,27 @@ def perimeter(robot, image, td: dict, user_code=None):
     text = "Analyzing code..."
 
     image = robot.draw_info(image)
+    lap("overlay")
 
     if not td:
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-        
-        syntax_ok = True
-        has_for_loop = False
-        try:
-            tree = ast.parse(active_code)
-            for node in ast.walk(tree):
-                if isinstance(node, ast.For):
-                    has_for_loop = True
-        except SyntaxError:
-            syntax_ok = False
+        check = _perimeter_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time": time.time() + TASK_DURATION,
+            "preflight": check,
             "data": {
-                "syntax_ok": syntax_ok,
-                "has_for_loop": has_for_loop,
-                "total_distance": 0.0,
-                "last_pos": None,
+                "syntax_ok": check.details["syntax_ok"],
+                "has_for_loop": check.details["has_for_loop"],
                 "completed_verdict": False
             },
-            "trajectory": []
+            # path length is accumulated in cm from robot.position
+            "trajectory": TrajectoryStore(
+                min_step=MIN_DIST_PX, layer=TrajectoryLayer(TRAJECTORY_COLOR, TRAJECTORY_WIDTH)),
+            # reported only: the verdict is on path length
+            "rotation": RotationTracker(),
         }
+    lap("init")
 
     if not td["data"]["syntax_ok"]:
         text = "Syntax/Indentation Error!"
@@ -279,56 +256,35 @@ def perimeter(robot, image, td: dict, user_code=None):
     info = robot.get_info()
     robot_position_px = info["position_px"]
     robot_position = info["position"]
-
-    MIN_DIST_PX = 5
+    td["rotation"].update(robot.compute_angle_x())
 
     if robot_position is not None:
-        if td["data"]["last_pos"] is not None:
-            dx = robot_position[0] - td["data"]["last_pos"][0]
-            dy = robot_position[1] - td["data"]["last_pos"][1]
-            dist = (dx**2 + dy**2)**0.5
-            td["data"]["total_distance"] += dist
-        td["data"]["last_pos"] = robot_position
-
-        if len(td["trajectory"]) == 0:
-            td["trajectory"].append(robot_position_px)
-        else:
-            last = td["trajectory"][-1]
-            dx_px = robot_position_px[0] - last[0]
-            dy_px = robot_position_px[1] - last[1]
-            if (dx_px**2 + dy_px**2) ** 0.5 >= MIN_DIST_PX:
-                td["trajectory"].append(robot_position_px)
+        td["trajectory"].add(robot_position_px, robot_position)
         
         if td["data"]["syntax_ok"] and td["data"]["has_for_loop"]:
-            text = f'Dist: {td["data"]["total_distance"]:0.1f} cm | Pos: x: {robot_position[0]:0.1f} y: {robot_position[1]:0.1f}'
+            text = f'Dist: {td["trajectory"].length:0.1f} cm | Turned: {abs(td["rotation"].total):0.0f} deg | Pos: x: {robot_position[0]:0.1f} y: {robot_position[1]:0.1f}'
+    lap("position")
 
-    if len(td["trajectory"]) > 0:
-        try:
-            draw_trajectory(image, td["trajectory"], TRAJECTORY_COLOR, TRAJECTORY_WIDTH, True)
-        except NameError:
-            pass
+    td["trajectory"].draw(image)
+    lap("drawing")
 
     if td["end_time"] - time.time() < 1 and not td["data"]["completed_verdict"]:
         td["data"]["completed_verdict"] = True
         
-        total_dist = td["data"]["total_distance"]
+        total_dist = td["trajectory"].length
         
         if not td["data"]["syntax_ok"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = "Mission Failed: Syntax or Indentation Error. Check your spaces! | Score: 0"
+            result.update(td["preflight"].result)
             text = "Syntax Error"
             
         elif not td["data"]["has_for_loop"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = "Mission Failed: You must use a 'for' loop to automate the patrol! | Score: 0"
+            result.update(td["preflight"].result)
             text = "Missing loop"
             
         elif total_dist < 100.0:
             result["success"] = False
             result["score"] = 20
-            result["description"] = f"Mission Failed: Perimeter incomplete! Traveled only {total_dist:.1f}cm out of ~120cm. | Score: 20"
+            result["description"] = f"Mission Failed: Perimeter incomplete! Traveled only {total_dist:.1f}cm out of ~120cm (turned {abs(td['rotation'].total):.0f} of 360 degrees). | Score: 20"
             text = "Incomplete perimeter"
             
         else:
@@ -336,11 +292,46 @@ def perimeter(robot, image, td: dict, user_code=None):
             result["score"] = 100
             result["description"] = "You are amazing! Perimeter patrol complete! | Score: 100"
             text = "Task completed!"
+    lap("verdict")
 
     return image, td, text, result
 
 # Task 3: Led
 
+def _visual_telemetry_code(user_code):
+    active_code = analyze_code(user_code).active
+
+    has_while = 'while' in active_code
+    has_break = 'break' in active_code
+    has_pin15 = '15' in active_code and 'Pin' in active_code
+
+    has_on_off = '.on()' in active_code and '.off()' in active_code
+    has_value = '.value(1)' in active_code and '.value(0)' in active_code
+    has_led_toggle = has_on_off or has_value
+
+    has_stop = 'stop(' in active_code or 'speed(0' in active_code
+
+    has_sensor_idx = bool(re.search(r'[\[\(][34][\]\)]', active_code))
+
+    # in the order they are reported, the first one is the fail reason
+    missing = []
+    if not has_pin15:
+        missing.append("LED on Pin 15 is not configured correctly.")
+    if not has_while:
+        missing.append("Missing 'while' loop for active monitoring.")
+    if not has_sensor_idx:
+        missing.append("You must check the central sensors (Index 3 or 4).")
+    if not has_break:
+        missing.append("Missing 'break' statement to exit the loop.")
+    if not has_stop:
+        missing.append("Missing command to stop the motors (e.g., robot.stop()).")
+    if not has_led_toggle:
+        missing.append("LED is not blinking (missing .on()/.off() or .value(1)/.value(0)).")
+
+    if not missing:
+        return Preflight(fail_reason="")
+    return Preflight(missing, code_failure(f'Task failed: {missing[0]}'), fail_reason=missing[0])
+
 def visual_telemetry(robot, image, td: dict, user_code):
     """Test for task 3: visual telemetry"""
 
@@ -354,54 +345,19 @@ def visual_telemetry(robot, image, td: dict, user_code):
     }
     text = "Initializing..." 
     
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
 
     if not td:
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-        
-        has_while = 'while' in active_code
-        has_break = 'break' in active_code
-        has_pin15 = '15' in active_code and 'Pin' in active_code
-        
-        has_on_off = '.on()' in active_code and '.off()' in active_code
-        has_value = '.value(1)' in active_code and '.value(0)' in active_code
-        has_led_toggle = has_on_off or has_value
-        
-        has_stop = 'stop(' in active_code or 'speed(0' in active_code
-        
-        has_sensor_idx = bool(re.search(r'[\[\(][34][\]\)]', active_code))
-        
-        code_valid = (has_while and has_break and has_pin15 and 
-                      has_led_toggle and has_stop and has_sensor_idx)
-
-        fail_reason = ""
-        if not has_pin15:
-            fail_reason = "LED on Pin 15 is not configured correctly."
-        elif not has_while:
-            fail_reason = "Missing 'while' loop for active monitoring."
-        elif not has_sensor_idx:
-            fail_reason = "You must check the central sensors (Index 3 or 4)."
-        elif not has_break:
-            fail_reason = "Missing 'break' statement to exit the loop."
-        elif not has_stop:
-            fail_reason = "Missing command to stop the motors (e.g., robot.stop())."
-        elif not has_led_toggle:
-            fail_reason = "LED is not blinking (missing .on()/.off() or .value(1)/.value(0))."
-
-        info = robot.get_info()
-        start_pos = info["position"] if info["position"] else [0, 0]
+        check = _visual_telemetry_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time": time.time() + TASK_DURATION,
+            "pose": PoseTracker(),
+            "preflight": check,
             "data": {
-                "code_valid": code_valid,
-                "fail_reason": fail_reason,
-                "start_pos": start_pos,
-                "last_pos": start_pos, 
-                "max_dist_moved": 0.0, 
+                "code_valid": check.ok,
+                "fail_reason": check.details["fail_reason"],
                 "has_stopped": False,
                 "was_moving": False
             }
@@ -410,41 +366,29 @@ def visual_telemetry(robot, image, td: dict, user_code):
     if not td["data"]["code_valid"]:
         text = f'Code Error: {td["data"]["fail_reason"]}'
 
-    info = robot.get_info()
-    current_pos = info.get("position")
-
-    if current_pos is not None:
-        dx_start = current_pos[0] - td["data"]["start_pos"][0]
-        dy_start = current_pos[1] - td["data"]["start_pos"][1]
-        dist_moved = math.sqrt(dx_start**2 + dy_start**2)
-
-        if dist_moved > td["data"]["max_dist_moved"]:
-            td["data"]["max_dist_moved"] = dist_moved
-
-        last_pos = td["data"]["last_pos"]
-        dx_frame = current_pos[0] - last_pos[0]
-        dy_frame = current_pos[1] - last_pos[1]
-        dist_frame = math.sqrt(dx_frame**2 + dy_frame**2)
-        
-        td["data"]["last_pos"] = current_pos
+    pose = td["pose"].update(robot)
 
-        if dist_moved > 3.0:
+    if robot.position is not None:
+        if pose.displacement > 3.0:
             td["data"]["was_moving"] = True
             if td["data"]["code_valid"]:
                 text = "Robot is scanning for the crevasse."
         
-        if td["data"]["was_moving"] and dist_frame < 0.05:
+        # debounced: a single still frame while driving is not a stop
+        if td["data"]["was_moving"] and not pose.moving and pose.changed_at is not None:
             td["data"]["has_stopped"] = True
 
+    # both failures below cannot be undone by later frames
+    settle_when(td, invalid_code=not td["data"]["code_valid"],
+                missed_line=td["pose"].max_displacement > MAX_ALLOWED_DISTANCE)
+
     # timeout / final verdict
     if td["end_time"] - time.time() < 1:
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = f'Task failed: {td["data"]["fail_reason"]}'
+            result.update(td["preflight"].result)
             text = "Task failed."
             
-        elif td["data"]["max_dist_moved"] > MAX_ALLOWED_DISTANCE:
+        elif td["pose"].max_displacement > MAX_ALLOWED_DISTANCE:
             result["success"] = False
             result["score"] = 0
             result["description"] = f"Task failed: Robot missed the line!"
@@ -464,6 +408,33 @@ def visual_telemetry(robot, image, td: dict, user_code):
 
     return image, td, text, result
 
+def _adaptive_racing_code(user_code):
+    code = analyze_code(user_code)
+    active_code = code.active
+
+    # Syntax check
+    syntax_ok = code.syntax_ok
+
+    # Regex and keyword checks
+    has_time_import = bool(re.search(r'import\s+time', active_code))
+    has_sensitivity = bool(re.search(r'set_sensitivity\(\s*[^)]+\s*\)', active_code))
+    has_track_line = 'track_line(' in active_code
+    has_good_sleep = bool(re.search(r'time\.sleep\(\s*0?\.[0-9]+\s*\)', active_code))
+
+    # Quest-like bug names
+    missing = []
+    if not syntax_ok:
+        missing.append("The Syntax Bug")
+    if not has_time_import:
+        missing.append("The Import Bug")
+    if not has_sensitivity:
+        missing.append("The Setup Bug")
+    if not has_track_line:
+        missing.append("The Array Bug")
+    if not has_good_sleep:
+        missing.append("The Coma Bug")
+    return from_missing(missing, "Mission Failed. Unresolved issues: {} | Score: 0")
+
 def adaptive_racing(robot, frame, td: dict, user_code):
     """
     Verification for Mission 11.4: Code Clinic (Adaptive Racing)
@@ -486,41 +457,11 @@ def adaptive_racing(robot, frame, td: dict, user_code):
     }
     text = "Analyzing code for bugs..."
 
-    frame = robot.draw_info(frame)
+    frame = draw_info(robot, frame)
 
     # ── First-frame initialization ────────────────────────────────────────────
     if td is None:
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-        
-        # Syntax check
-        syntax_ok = True
-        try:
-            ast.parse(active_code)
-        except SyntaxError:
-            syntax_ok = False
-
-        # Regex and keyword checks
-        has_time_import = bool(re.search(r'import\s+time', active_code))
-        has_sensitivity = bool(re.search(r'set_sensitivity\(\s*[^)]+\s*\)', active_code))
-        has_track_line = 'track_line(' in active_code
-        has_good_sleep = bool(re.search(r'time\.sleep\(\s*0?\.[0-9]+\s*\)', active_code))
-
-        code_valid = syntax_ok and has_time_import and has_sensitivity and has_track_line and has_good_sleep
-
-        # Quest-like bug names
-        missing = []
-        if not syntax_ok:
-            missing.append("The Syntax Bug")
-        if not has_time_import:
-            missing.append("The Import Bug")
-        if not has_sensitivity:
-            missing.append("The Setup Bug")
-        if not has_track_line:
-            missing.append("The Array Bug")
-        if not has_good_sleep:
-            missing.append("The Coma Bug")
+        check = _adaptive_racing_code(user_code)
 
         info = robot.get_info()
         start_pos = info.get("position")
@@ -528,9 +469,10 @@ def adaptive_racing(robot, frame, td: dict, user_code):
         td = {
             "start_time": time.time(),
             "end_time": time.time() + TASK_DURATION,
+            "preflight": check,
             "data": {
-                "code_valid": code_valid,
-                "missing": missing,
+                "code_valid": check.ok,
+                "missing": check.missing,
                 "completed_verdict": False,
                 "start_position": start_pos,
                 "max_distance_moved": 0.0
@@ -561,6 +503,10 @@ def adaptive_racing(robot, frame, td: dict, user_code):
         else:
             text = f"Bugs remaining: {', '.join(td['data']['missing'][:2])}..."
 
+    # ── Early verdict: buggy code always fails, a long enough drive always passes
+    settle_when(td, invalid_code=not td["data"]["code_valid"],
+                passed=td["data"]["max_distance_moved"] >= MIN_MOVEMENT_DISTANCE)
+
     # ── Timeout / Final verdict ───────────────────────────────────────────────
     if td["end_time"] - time.time() < 1 and not td["data"].get("completed_verdict"):
         td["data"]["completed_verdict"] = True
@@ -569,9 +515,7 @@ def adaptive_racing(robot, frame, td: dict, user_code):
         robot_moved = distance_moved >= MIN_MOVEMENT_DISTANCE
         
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = f"Mission Failed. Unresolved issues: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code contains bugs!"
             
         elif not robot_moved:
@@ -587,3 +531,11 @@ def adaptive_racing(robot, frame, td: dict, user_code):
             text = "Exam Complete!"
     
     return frame, td, text, result
+
+
+preflight_checks = {
+    "navigation": _navigation_code,
+    "perimeter": _perimeter_code,
+    "visual_telemetry": _visual_telemetry_code,
+    "adaptive_racing": _adaptive_racing_code,
+}
@@ -2,9 +2,23 @@ import cv2
 import math
 import time
 import os
+import sys
 import numpy as np
 import re
 
+_VERIFICATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _VERIFICATIONS_DIR not in sys.path:
+    sys.path.insert(0, _VERIFICATIONS_DIR)
+
+from checkerlib.assets import CONE_KEY, keyed_sprite
+from checkerlib.frames import FULL, POSE, draw_info
+from checkerlib.grammar import Grammar, Shape
+from checkerlib.messages import MessageInbox
+from checkerlib.preflight import Preflight, code_failure, from_missing, run_preflight
+from checkerlib.source import analyze_code
+from checkerlib.sprites import blit, blit_many, rotation_bank
+from checkerlib.trajectory import TrajectoryLayer, TrajectoryStore
+
 target_points = {
     'electric_motors': [(30, 50), (30, 0)],
     'differential_drive': [(30, 50), (30, 0)],
@@ -23,6 +37,15 @@ block_library_functions = {
     'while_loops': False
 }
 
+frame_needs = {
+    'electric_motors': FULL,
+    'differential_drive': FULL,
+    'defining_functions': POSE,
+    'for_loops': FULL,
+    'encoder_theory': POSE,
+    'while_loops': FULL,
+}
+
 
 # Core Functions
 
@@ -35,6 +58,16 @@ def get_target_points(task):
     """Retrieve target points for a given task."""
     return target_points.get(task, [])
 
+
+def get_frame_needs(task):
+    """Retrieve what the checker of a task needs from the camera frame."""
+    return frame_needs.get(task, FULL)
+
+
+def preflight(task, user_code):
+    """Static code checks of ``task`` without a robot (see ``checkerlib.preflight``)."""
+    return run_preflight(preflight_checks, task, user_code)
+
 def delta_points(point_0, point_1):
     return math.sqrt(((point_0[0] - point_1[0]) ** 2) +
                      ((point_0[1] - point_1[1]) ** 2))
@@ -47,31 +80,47 @@ def closest_node(node, nodes):
     dist_2 = np.sum((nodes - node)**2, axis=1)
     return np.argmin(dist_2)
 
-def rotate_image(image, angle):
-    """Rotate an image by the given angle"""
-    image_center = tuple(np.array(image.shape[1::-1]) / 2)
-    rot_mat = cv2.getRotationMatrix2D(image_center, angle, 1.0)
-    result = cv2.warpAffine(image, rot_mat, image.shape[1::-1], flags=cv2.INTER_LINEAR)
-    return result
+def _placeholder_flag():
+    """Checkered flag drawn when flag_finish.jpg is not deployed"""
+    flag = np.zeros((90, 60, 3), dtype=np.uint8)
+    cv2.rectangle(flag, (5, 10), (8, 85), (180, 120, 60), -1)
+    cv2.rectangle(flag, (8, 10), (55, 40), (0, 0, 220), -1)
+    for row in range(3):
+        for col in range(5):
+            if (row + col) % 2 == 0:
+                cv2.rectangle(flag,
+                            (8 + col*9, 10 + row*10),
+                            (17 + col*9, 20 + row*10),
+                            (255, 255, 255), -1)
+    return flag
+
+
+def _placeholder_cone():
+    """Warning triangle drawn when traffic-sign.jpg is not deployed"""
+    cone = np.ones((100, 100, 3), dtype=np.uint8) * 255
+    pts = np.array([[50, 5], [95, 95], [5, 95]], np.int32)
+    cv2.fillPoly(cone, [pts], (0, 100, 255))
+    cv2.polylines(cone, [pts], True, (0, 0, 0), 2)
+    cv2.line(cone, (27, 65), (73, 65), (255, 255, 255), 6)
+    return cone
 
 
-def restore_trajectory(image, prev_point, point, color, width):
-    """Function for restoring trajectory if robot was not recognized"""
-    cv2.line(image, prev_point, point, color, width)
+# 2.1 electric motors
+
+ELECTRIC_MOTORS_BANNED = ["turn_left", "turn_right", "move_forward_distance",
+                          "move_backward_distance", "move_forward_seconds", "move_backward_seconds"]
 
 
-def draw_trajectory(image, points, color, width, restore):
-    """Function for drawing point trajectory"""
-    prev_point = None
-    for point in points:
-        cv2.circle(image, point, width, color, -1)
-        if restore and prev_point is not None and math.sqrt(
-                (prev_point[0] - point[0]) ** 2 + (prev_point[1] - point[1]) ** 2) > 1:
-            restore_trajectory(image, prev_point, point, color, int(width * 2))
-        prev_point = point
+def _banned_code(banned, user_code):
+    """Preflight of the lessons that forbid the high-level movement helpers."""
+    active_code = analyze_code(user_code).active
+    found_banned = [f for f in banned if f in active_code]
+    return from_missing(found_banned, "Banned functions used: {} | Score: 0")
 
 
-# 2.1 electric motors
+def _electric_motors_code(user_code):
+    return _banned_code(ELECTRIC_MOTORS_BANNED, user_code)
+
 
 def electric_motors(robot, image, td: dict, user_code=None):
     """Test for lesson: Electric Motors — robot must reach the flag using run_motor commands"""
@@ -90,51 +139,28 @@ def electric_motors(robot, image, td: dict, user_code=None):
     image = robot.draw_info(image)
 
     if not td:
-        banned = ["turn_left", "turn_right", "move_forward_distance",
-                  "move_backward_distance", "move_forward_seconds", "move_backward_seconds"]
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-        found_banned = [f for f in banned if f in active_code]
+        check = _electric_motors_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 10,
+            "preflight": check,
             "data": {
                 "reached": False,
-                "code_valid": len(found_banned) == 0,
-                "banned_found": found_banned,
+                "code_valid": check.ok,
+                "banned_found": check.missing,
                 "flag-coords": (FLAG_X, FLAG_Y),
                 "flag-coords-cm": None,  # set lazily once robot is detected
             }
         }
 
         try:
-            basepath = os.path.abspath(os.path.dirname(__file__))
-            filepath = os.path.join(basepath, "auto_tests", "images", "flag_finish.jpg")
-            if not os.path.exists(filepath):
-                filepath = os.path.join(basepath, "images", "flag_finish.jpg")
-
-            flag = cv2.imread(filepath)
-
-            if flag is None:
-                print("Warning: flag_finish.jpg not found, using placeholder")
-                flag = np.zeros((90, 60, 3), dtype=np.uint8)
-                cv2.rectangle(flag, (5, 10), (8, 85), (180, 120, 60), -1)
-                cv2.rectangle(flag, (8, 10), (55, 40), (0, 0, 220), -1)
-                for row in range(3):
-                    for col in range(5):
-                        if (row + col) % 2 == 0:
-                            cv2.rectangle(flag,
-                                        (8 + col*9, 10 + row*10),
-                                        (17 + col*9, 20 + row*10),
-                                        (255, 255, 255), -1)
-
-            flag = cv2.resize(flag, (int(flag.shape[1]/3), int(flag.shape[0]/3)))
-            lower_green = np.array([0, 240, 0])
-            upper_green = np.array([50, 255, 50])
-            td["data"]["flag-mask"] = cv2.bitwise_not(cv2.inRange(flag, lower_green, upper_green))
-            td["data"]["flag"] = flag
+            td["data"]["flag"], td["data"]["flag-mask"] = keyed_sprite(
+                "flag_finish.jpg", scale=1/3, placeholder=_placeholder_flag)
+            # tilted green flag shown once the target is reached
+            td["data"]["flag-reached"] = rotation_bank(
+                "flag_finish.jpg", recolor=((0, 0, 0), (205, 205, 205), (0, 255, 0)),
+                scale=1/3, placeholder=_placeholder_flag).get(45)
 
         except Exception as e:
             print(f"Error loading or processing image: {e}")
@@ -142,29 +168,13 @@ def electric_motors(robot, image, td: dict, user_code=None):
 
     # draw flag
     if not td["data"].get("image_error", False) and "flag" in td["data"]:
-        flag = td["data"]["flag"]
-        x_left = int(flag.shape[0]/2)
-        x_right = flag.shape[0] - x_left
-        y_bottom = int(flag.shape[1]/2)
-        y_up = flag.shape[1] - y_bottom
-        coords = td["data"]["flag-coords"]
-
-        if (0 <= coords[0] - x_left < image.shape[0] and
-            coords[0] + x_right < image.shape[0] and
-            0 <= coords[1] - y_bottom < image.shape[1] and
-            coords[1] + y_up < image.shape[1]):
-
-            if td["data"]["reached"]:
-                result_img = rotate_image(flag, 45)
-                mask = cv2.inRange(result_img, (0, 0, 0), (205, 205, 205))
-                result_img[mask > 0] = (0, 255, 0)
-                cv2.copyTo(result_img, rotate_image(td["data"]["flag-mask"], 45),
-                          image[coords[0] - x_left:x_right + coords[0],
-                                coords[1] - y_bottom:y_up + coords[1]])
-            else:
-                cv2.copyTo(flag, td["data"]["flag-mask"],
-                          image[coords[0] - x_left:x_right + coords[0],
-                                coords[1] - y_bottom:y_up + coords[1]])
+        # flag-coords are (row, col); the flag is clipped at the frame edge
+        row, col = td["data"]["flag-coords"]
+        if td["data"]["reached"]:
+            reached_flag, reached_mask = td["data"]["flag-reached"]
+            blit(image, reached_flag, reached_mask, (col, row))
+        else:
+            blit(image, td["data"]["flag"], td["data"]["flag-mask"], (col, row))
 
     # evaluation — only if code valid
     if td["data"]["code_valid"]:
@@ -186,9 +196,7 @@ def electric_motors(robot, image, td: dict, user_code=None):
     # timeout / final verdict
     if td["end_time"] - time.time() < 1:
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = f"Banned functions used: {', '.join(td['data']['banned_found'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Banned functions detected."
         elif not td["data"]["reached"]:
             result["success"] = False
@@ -206,6 +214,15 @@ def electric_motors(robot, image, td: dict, user_code=None):
 
 # 2.2 differential drive
 
+DIFFERENTIAL_DRIVE_BANNED = ["move_forward_distance", "move_forward_speed_distance",
+                             "move_forward_seconds", "move_backward_distance",
+                             "move_backward_seconds", "turn_left", "turn_right"]
+
+
+def _differential_drive_code(user_code):
+    return _banned_code(DIFFERENTIAL_DRIVE_BANNED, user_code)
+
+
 def differential_drive(robot, image, td, user_code=None):
     """Verification function for driving straight assignment"""
 
@@ -219,19 +236,15 @@ def differential_drive(robot, image, td, user_code=None):
     image = robot.draw_info(image)
 
     if not td:
-        banned = ["move_forward_distance", "move_forward_speed_distance", "move_forward_seconds",
-                  "move_backward_distance", "move_backward_seconds", "turn_left", "turn_right"]
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-        found_banned = [f for f in banned if f in active_code]
+        check = _differential_drive_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 10,
+            "preflight": check,
             "data": {
-                "code_valid": len(found_banned) == 0,
-                "banned_found": found_banned,
+                "code_valid": check.ok,
+                "banned_found": check.missing,
                 "task-failed": "",
                 "failed-cone": {},
                 "direction_0": None,
@@ -246,26 +259,10 @@ def differential_drive(robot, image, td, user_code=None):
         }
 
         try:
-            basepath = os.path.abspath(os.path.dirname(__file__))
-            filepath = os.path.join(basepath, "auto_tests", "images", "traffic-sign.jpg")
-            if not os.path.exists(filepath):
-                filepath = os.path.join(basepath, "images", "traffic-sign.jpg")
-
-            if not os.path.exists(filepath):
-                print("Warning: traffic-sign.jpg not found, using placeholder")
-                cone = np.ones((100, 100, 3), dtype=np.uint8) * 255
-                pts = np.array([[50, 5], [95, 95], [5, 95]], np.int32)
-                cv2.fillPoly(cone, [pts], (0, 100, 255))
-                cv2.polylines(cone, [pts], True, (0, 0, 0), 2)
-                cv2.line(cone, (27, 65), (73, 65), (255, 255, 255), 6)
-            else:
-                cone = cv2.imread(filepath)
-                cone = cv2.resize(cone, (int(cone.shape[1]), int(cone.shape[0])))
-
-            lower_green = np.array([0, 240, 0])
-            upper_green = np.array([35, 255, 35])
-            td["data"]["cone-mask"] = cv2.bitwise_not(cv2.inRange(cone, lower_green, upper_green))
-            td["data"]["cone"] = cone
+            td["data"]["cone"], td["data"]["cone-mask"] = keyed_sprite(
+                "traffic-sign.jpg", key_range=CONE_KEY, placeholder=_placeholder_cone)
+            td["data"]["cone-bank"] = rotation_bank(
+                "traffic-sign.jpg", key_range=CONE_KEY, placeholder=_placeholder_cone)
 
         except Exception as e:
             print(f"Error initializing drive straight test: {e}")
@@ -293,36 +290,18 @@ def differential_drive(robot, image, td, user_code=None):
     # draw cones
     if "cones-coords" in td["data"] and "cone" in td["data"] and len(td["data"]["cones-coords"]) > 0:
         try:
-            cone = td["data"]["cone"]
-            x_left = int(cone.shape[0] / 2)
-            x_right = cone.shape[0] - x_left
-            y_bottom = int(cone.shape[1] / 2)
-            y_up = cone.shape[1] - y_bottom
-
+            cones = []
             for i in range(min(10, len(td["data"]["cones-coords"]))):
-                coords = td["data"]["cones-coords"][i]
-                if (0 <= coords[0] - x_left < image.shape[0] and
-                    coords[0] + x_right < image.shape[0] and
-                    0 <= coords[1] - y_bottom < image.shape[1] and
-                    coords[1] + y_up < image.shape[1]):
-
-                    if i in td["data"]["failed-cone"]:
-                        result_img = rotate_image(cone, td["data"]["failed-cone"][i])
-                        cv2.copyTo(
-                            result_img,
-                            rotate_image(td["data"]["cone-mask"], td["data"]["failed-cone"][i]),
-                            image[coords[0] - x_left:x_right + coords[0],
-                                 coords[1] - y_bottom:y_up + coords[1]]
-                        )
-                        if td["data"]["failed-cone"][i] > -89:
-                            td["data"]["failed-cone"][i] -= 45
-                    else:
-                        cv2.copyTo(
-                            cone,
-                            td["data"]["cone-mask"],
-                            image[coords[0] - x_left:x_right + coords[0],
-                                 coords[1] - y_bottom:y_up + coords[1]]
-                        )
+                row, col = td["data"]["cones-coords"][i]
+                if i in td["data"]["failed-cone"]:
+                    fallen_cone, fallen_mask = td["data"]["cone-bank"].get(td["data"]["failed-cone"][i])
+                    cones.append((fallen_cone, fallen_mask, (col, row)))
+                    if td["data"]["failed-cone"][i] > -89:
+                        td["data"]["failed-cone"][i] -= 45
+                else:
+                    cones.append((td["data"]["cone"], td["data"]["cone-mask"], (col, row)))
+            # cones-coords are (row, col); cones past the frame edge are clipped
+            blit_many(image, cones)
         except Exception as e:
             print(f"Error drawing cones: {e}")
 
@@ -381,9 +360,7 @@ def differential_drive(robot, image, td, user_code=None):
     # timeout / final verdict
     if td["end_time"] - time.time() < 1:
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = f"Banned functions used: {', '.join(td['data']['banned_found'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Banned functions detected."
         elif td["data"]["task-failed"]:
             result["success"] = False
@@ -417,6 +394,10 @@ def differential_drive(robot, image, td, user_code=None):
 
 # 2.3 defining functions
 
+def _defining_functions_code(user_code):
+    return _banned_code(ELECTRIC_MOTORS_BANNED, user_code)
+
+
 def defining_functions(robot, image, td: dict, user_code=None):
     """Test: Robot must turn 180 degrees using a defined function."""
 
@@ -427,23 +408,19 @@ def defining_functions(robot, image, td: dict, user_code=None):
     }
     text = "Waiting..."
 
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
 
     if not td:
-        banned = ["turn_left", "turn_right", "move_forward_distance",
-                  "move_backward_distance", "move_forward_seconds", "move_backward_seconds"]
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-        found_banned = [f for f in banned if f in active_code]
+        check = _defining_functions_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 10,
             "target_ang": None,  # set lazily once robot is detected
+            "preflight": check,
             "data": {
-                "code_valid": len(found_banned) == 0,
-                "banned_found": found_banned,
+                "code_valid": check.ok,
+                "banned_found": check.missing,
             }
         }
 
@@ -476,9 +453,7 @@ def defining_functions(robot, image, td: dict, user_code=None):
     # timeout / final verdict
     if (td["end_time"] - time.time()) < 1:
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = f"Banned functions used: {', '.join(td['data']['banned_found'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Banned functions detected."
         elif delta_ang is None:
             result["success"] = False
@@ -501,12 +476,19 @@ def defining_functions(robot, image, td: dict, user_code=None):
 
 # 2.4 for loops
 
+def _for_loops_code(user_code):
+    if 'for' in analyze_code(user_code).active:
+        return Preflight()
+    return Preflight(["for loop"], code_failure("No for loop found in code | Score: 0"))
+
+
 def for_loops(robot, image, td: dict, user_code=None):
     """Verification for lesson: For Loops / Drawing trajectory"""
 
     TASK_DURATION = 60
     TRAJECTORY_COLOR = (255, 0, 0)
     TRAJECTORY_WIDTH = 3
+    MIN_DIST_PX = 5   # only record a new point if robot moved at least this many pixels
 
     result = {
         "success": True,
@@ -518,18 +500,18 @@ def for_loops(robot, image, td: dict, user_code=None):
     image = robot.draw_info(image)
 
     if not td:
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-        code_valid = 'for' in active_code
+        check = _for_loops_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 60,
+            "preflight": check,
             "data": {
-                "code_valid": code_valid,
+                "code_valid": check.ok,
             },
-            "trajectory": []
+            "trajectory": TrajectoryStore(
+                min_step=MIN_DIST_PX, layer=TrajectoryLayer(TRAJECTORY_COLOR, TRAJECTORY_WIDTH)),
+            "inbox": MessageInbox(),
         }
 
     if not td["data"]["code_valid"]:
@@ -540,32 +522,19 @@ def for_loops(robot, image, td: dict, user_code=None):
     robot_position_px = info["position_px"]
     robot_position = info["position"]
 
-    MIN_DIST_PX = 5   # only record a new point if robot moved at least this many pixels
-
     if robot_position is not None:
-        if len(td["trajectory"]) == 0:
-            td["trajectory"].append(robot_position_px)
-        else:
-            last = td["trajectory"][-1]
-            dx = robot_position_px[0] - last[0]
-            dy = robot_position_px[1] - last[1]
-            if (dx**2 + dy**2) ** 0.5 >= MIN_DIST_PX:
-                td["trajectory"].append(robot_position_px)
+        td["trajectory"].add(robot_position_px)
         text = f'Robot position: x: {robot_position[0]:0.1f} y: {robot_position[1]:0.1f}'
 
-    if len(td["trajectory"]) > 0:
-        draw_trajectory(image, td["trajectory"], TRAJECTORY_COLOR, TRAJECTORY_WIDTH, True)
+    td["trajectory"].draw(image)
 
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         text = f"Message received: {msg}"
 
     # timeout / final verdict
     if td["end_time"] - time.time() < 1:
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = "No for loop found in code | Score: 0"
+            result.update(td["preflight"].result)
             text = "No for loop detected."
         else:
             result["success"] = True
@@ -578,6 +547,26 @@ def for_loops(robot, image, td: dict, user_code=None):
 
 # 2.5 encoder theory
 
+ENCODER_THEORY_MESSAGES = Grammar([
+    Shape("encoder_left", r"Encoder degrees left:(?P<value>[^:]*)", at_start=True, value=float),
+    Shape("distance", r"Distance in cm:(?P<value>[^:]*)", at_start=True, value=float),
+])
+
+
+def _encoder_theory_code(user_code):
+    active_code = analyze_code(user_code).active
+    missing = []
+    if 'import math' not in active_code and 'from math' not in active_code:
+        missing.append('math library')
+    if 'reset_left_encoder' not in active_code:
+        missing.append('reset_left_encoder()')
+    if 'reset_right_encoder' not in active_code:
+        missing.append('reset_right_encoder()')
+    if 'math.pi' not in active_code:
+        missing.append('math.pi')
+    return from_missing(missing, "Missing required elements: {} | Score: 0")
+
+
 def encoder_theory(robot, frame, td, user_code=None):
     """Verification function for encoder theory task.
     Checks: math import, encoder resets, math.pi, printed encoder value 310-360°,
@@ -614,27 +603,17 @@ def encoder_theory(robot, frame, td, user_code=None):
 
     # ===== 1. FIRST-RUN INITIALIZATION =====
     if not td:
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-
-        missing = []
-        if 'import math' not in active_code and 'from math' not in active_code:
-            missing.append('math library')
-        if 'reset_left_encoder' not in active_code:
-            missing.append('reset_left_encoder()')
-        if 'reset_right_encoder' not in active_code:
-            missing.append('reset_right_encoder()')
-        if 'math.pi' not in active_code:
-            missing.append('math.pi')
+        check = _encoder_theory_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time": time.time() + TASK_DURATION,
+            "inbox": MessageInbox(),
+            "preflight": check,
             "data": {
                 "completed": False,
-                "code_valid": len(missing) == 0,
-                "missing": missing,
+                "code_valid": check.ok,
+                "missing": check.missing,
                 "encoder_left": None,
                 "distance": None,
                 "start_position": None,
@@ -644,11 +623,11 @@ def encoder_theory(robot, frame, td, user_code=None):
 
     # ===== 2. STATE LOCK =====
     if td["data"].get("completed", False):
-        frame = robot.draw_info(frame)
+        frame = draw_info(robot, frame)
         return frame, td, td["data"].get("final_text", text), td["data"].get("final_result", result)
 
     # ===== 3. DRAW OVERLAY =====
-    frame = robot.draw_info(frame)
+    frame = draw_info(robot, frame)
 
     # ===== 4. CODE VALIDATION CHECK =====
     if not td["data"]["code_valid"]:
@@ -666,16 +645,11 @@ def encoder_theory(robot, frame, td, user_code=None):
     # Matches student template print format:
     # print("Encoder degrees left:", left_deg)
     # print("Distance in cm:", distance)
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         text = f"Received: {msg}"
-        try:
-            if msg.startswith("Encoder degrees left:"):
-                td["data"]["encoder_left"] = float(msg.split(":")[1].strip())
-            elif msg.startswith("Distance in cm:"):
-                td["data"]["distance"] = float(msg.split(":")[1].strip())
-        except (ValueError, IndexError):
-            pass
+        reading = ENCODER_THEORY_MESSAGES.parse(msg)
+        if reading is not None:
+            td["data"][reading.name] = reading["value"]
 
     # Show live readings on overlay
     if td["data"]["encoder_left"] is not None:
@@ -688,9 +662,7 @@ def encoder_theory(robot, frame, td, user_code=None):
         td["data"]["completed"] = True
 
         if not td["data"]["code_valid"]:
-            result["success"] = False  # safe — completed=True set above
-            result["score"] = 0
-            result["description"] = f"Missing required elements: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)  # safe — completed=True set above
             text = "Code validation failed."
 
         else:
@@ -769,6 +741,20 @@ def encoder_theory(robot, frame, td, user_code=None):
 
 # 2.6 while loops
 
+# the value after the last colon, whatever the label ("Encoder: 123.4");
+# no literal is common to such lines, so this shape has no key
+WHILE_LOOPS_MESSAGES = Grammar([
+    Shape("last_value", r"(?s)(?:.*:)?(?P<value>[^:]*)", at_start=True, value=float),
+])
+
+WHILE_LOOPS_BANNED = ["move_forward", "move_backward", "move_forward_distance",
+                      "move_backward_distance", "move_forward_seconds", "move_backward_seconds"]
+
+
+def _while_loops_code(user_code):
+    return _banned_code(WHILE_LOOPS_BANNED, user_code)
+
+
 def while_loops(robot, frame, td, user_code=None):
     """
     Verification: Don't Hit the Wall
@@ -784,8 +770,6 @@ def while_loops(robot, frame, td, user_code=None):
     R                  = 3.21  # NEW: Updated wheel radius (was 3.4)
     ENCODER_SANITY_CAP = 2000
     WALL_VISUAL_OFFSET = 150
-    BANNED_FUNCTIONS   = ["move_forward", "move_backward", "move_forward_distance",
-                          "move_backward_distance", "move_forward_seconds", "move_backward_seconds"]
 
     result = {
         "success": True,
@@ -797,20 +781,19 @@ def while_loops(robot, frame, td, user_code=None):
     frame = robot.draw_info(frame)
 
     if td is None:
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-        found_banned = [f for f in BANNED_FUNCTIONS if f in active_code]
+        check = _while_loops_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time": time.time() + TASK_DURATION,
+            "inbox": MessageInbox(),
             "start_position": None,
             "wall_px": None,
+            "preflight": check,
             "data": {
                 "wall_hit": False,
-                "code_valid": len(found_banned) == 0,
-                "banned_found": found_banned,
+                "code_valid": check.ok,
+                "banned_found": check.missing,
                 "encoder_left": None,
                 "peak_displacement": 0.0,
             }
@@ -830,14 +813,10 @@ def while_loops(robot, frame, td, user_code=None):
             td["wall_px"] = int(pos_px[0] + TARGET_DISTANCE_CM * px_per_cm + WALL_VISUAL_OFFSET)
 
     # parse MQTT messages
-    msg = robot.get_msg()
-    if msg is not None:
-        try:
-            val = float(msg.strip().split(":")[-1].strip())
-            if val < ENCODER_SANITY_CAP:
-                td["data"]["encoder_left"] = val
-        except (ValueError, IndexError):
-            pass
+    for msg in td["inbox"].poll(robot):
+        reading = WHILE_LOOPS_MESSAGES.parse(msg)
+        if reading is not None and reading["value"] < ENCODER_SANITY_CAP:
+            td["data"]["encoder_left"] = reading["value"]
 
     # track displacement and wall hit
     if td["start_position"] is not None and pos is not None:
@@ -867,10 +846,7 @@ def while_loops(robot, frame, td, user_code=None):
         enc_dist = (enc / 360) * (2 * math.pi * R) if enc is not None else None
 
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = (f"Banned functions used: "
-                                     f"{', '.join(td['data']['banned_found'])} | Score: 0")
+            result.update(td["preflight"].result)
             text = "Banned functions detected."
         elif enc is None:
             result["success"] = False
@@ -899,4 +875,13 @@ def while_loops(robot, frame, td, user_code=None):
                                      f"Final displacement: {peak_disp:.1f}cm | Score: 100")
             text = "Stopped in the zone!"
 
-    return frame, td, text, result
\ No newline at end of file
+    return frame, td, text, result
+
+preflight_checks = {
+    "electric_motors": _electric_motors_code,
+    "differential_drive": _differential_drive_code,
+    "defining_functions": _defining_functions_code,
+    "for_loops": _for_loops_code,
+    "encoder_theory": _encoder_theory_code,
+    "while_loops": _while_loops_code,
+}
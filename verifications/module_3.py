@@ -2,9 +2,23 @@ import cv2
 import math
 import time
 import os
+import sys
 import numpy as np
 import re
-import ast
+
+_VERIFICATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _VERIFICATIONS_DIR not in sys.path:
+    sys.path.insert(0, _VERIFICATIONS_DIR)
+
+from checkerlib.assets import keyed_sprite, luma_sprite, tinted_sprite
+from checkerlib.frames import FULL, NONE, POSE, draw_info
+from checkerlib.grammar import Grammar, Shape
+from checkerlib.hud import put_text
+from checkerlib.messages import MessageInbox
+from checkerlib.pose import PoseTracker
+from checkerlib.preflight import Preflight, from_missing, run_preflight
+from checkerlib.source import analyze_code
+from checkerlib.sprites import blit
 
 
 target_points = {
@@ -41,6 +55,16 @@ block_library_functions = {
     #'processing_sensor_data': True
 }
 
+frame_needs = {
+    'intro_to_octoliner': NONE,
+    'conditional_logic': POSE,
+    'processing_sensor_data': FULL,
+    'arrays_and_elif': NONE,
+    'led_feedback': NONE,
+    'simple_line_follower': FULL,
+    'logical_operators': FULL,
+}
+
 def get_block_library_functions(task):
     """Retrieve block library status for a given task."""
     return block_library_functions.get(task, False)
@@ -51,6 +75,16 @@ def get_target_points(task):
     return target_points.get(task, [])
 
 
+def get_frame_needs(task):
+    """Retrieve what the checker of a task needs from the camera frame."""
+    return frame_needs.get(task, FULL)
+
+
+def preflight(task, user_code):
+    """Static code checks of ``task`` without a robot (see ``checkerlib.preflight``)."""
+    return run_preflight(preflight_checks, task, user_code)
+
+
 def delta_points(point_0, point_1):
     return math.sqrt(((point_0[0] - point_1[0]) ** 2) +
                      ((point_0[1] - point_1[1]) ** 2))
@@ -58,6 +92,25 @@ def delta_points(point_0, point_1):
 
 ##NEW
 
+def _missing_code(missing):
+    """Preflight of the lessons that list the required code elements not found."""
+    return from_missing(missing, "Code missing: {} | Score: 0")
+
+
+# the first number of a line is the sensor reading; any line may hold one,
+# so this shape has no key
+INTRO_TO_OCTOLINER_MESSAGES = Grammar([
+    Shape("first_number", r"(?P<value>\d+)", value=int),
+])
+
+
+def _intro_to_octoliner_code(user_code):
+    active_code = analyze_code(user_code).active
+    if "analog_read(3)" in active_code or "analog_read(4)" in active_code:
+        return Preflight()
+    return _missing_code(["analog_read(3) or analog_read(4)"])
+
+
 def intro_to_octoliner(robot, image, td, user_code=None):
     """
     Verification for lesson: Introduction to Octoliner
@@ -75,20 +128,19 @@ def intro_to_octoliner(robot, image, td, user_code=None):
     }
     text = "Waiting for sensor readings..."
 
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
 
     if td is None:
         # Check for analog_read(3) or analog_read(4) — filter commented lines
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-        code_valid = "analog_read(3)" in active_code or "analog_read(4)" in active_code
+        check = _intro_to_octoliner_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 10,
+            "inbox": MessageInbox(),
+            "preflight": check,
             "data": {
-                "code_valid": code_valid,
+                "code_valid": check.ok,
                 "sensor_3": None,
                 "sensor_4": None,
             }
@@ -99,22 +151,23 @@ def intro_to_octoliner(robot, image, td, user_code=None):
 
     # draw sensor values on overlay
     if td["data"]["sensor_3"] is not None:
-        cv2.putText(image, f"Sensor 3: {td['data']['sensor_3']}", (20, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 1)
+        put_text(image, f"Sensor 3: {td['data']['sensor_3']}", (20, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 1)
     if td["data"]["sensor_4"] is not None:
-        cv2.putText(image, f"Sensor 4: {td['data']['sensor_4']}", (20, 50),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 1)
+        put_text(image, f"Sensor 4: {td['data']['sensor_4']}", (20, 50),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 1)
 
     # parse MQTT messages — only if code is valid
-    msg = robot.get_msg()
-    if td["data"]["code_valid"] and msg is not None:
+    for msg in td["inbox"].poll(robot):
+        if not td["data"]["code_valid"]:
+            continue
         text = f"Message received: {msg}"
-        numbers = [int(n) for n in re.findall(r'\d+', msg)]
-        if numbers:
+        reading = INTRO_TO_OCTOLINER_MESSAGES.parse(msg)
+        if reading is not None:
             if td["data"]["sensor_3"] is None:
-                td["data"]["sensor_3"] = numbers[0]
+                td["data"]["sensor_3"] = reading["value"]
             elif td["data"]["sensor_4"] is None:
-                td["data"]["sensor_4"] = numbers[0]
+                td["data"]["sensor_4"] = reading["value"]
 
     got_sensor_data = (td["data"]["sensor_3"] is not None or
                        td["data"]["sensor_4"] is not None)
@@ -122,9 +175,7 @@ def intro_to_octoliner(robot, image, td, user_code=None):
     # timeout / final verdict
     if td["end_time"] - time.time() < 1:
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = "Code missing: analog_read(3) or analog_read(4) | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         elif not got_sensor_data:
             result["success"] = False
@@ -143,6 +194,19 @@ def intro_to_octoliner(robot, image, td, user_code=None):
     return image, td, text, result
 
 
+def _conditional_logic_code(user_code):
+    code = analyze_code(user_code)
+    active_code = code.active
+
+    has_sensor = "analog_read(3)" in active_code or "analog_read(4)" in active_code
+    has_if     = "if " in active_code
+
+    missing = []
+    if not has_sensor:
+        missing.append("analog_read(3) or analog_read(4)")
+    if not has_if:
+        missing.append("if statement")
+    return _missing_code(missing)
 
 
 def conditional_logic(robot, image, td, user_code=None):
@@ -169,30 +233,20 @@ def conditional_logic(robot, image, td, user_code=None):
     }
     text = "Waiting for robot to move..."
 
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
 
     if td is None:
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-
-        has_sensor = "analog_read(3)" in active_code or "analog_read(4)" in active_code
-        has_if     = "if " in active_code
-        code_valid = has_sensor and has_if
-
-        missing = []
-        if not has_sensor:
-            missing.append("analog_read(3) or analog_read(4)")
-        if not has_if:
-            missing.append("if statement")
+        check = _conditional_logic_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 20,
+            "inbox": MessageInbox(),
+            "pose": PoseTracker(),
+            "preflight": check,
             "data": {
-                "code_valid": code_valid,
-                "missing": missing,
-                "prev_position": None,
+                "code_valid": check.ok,
+                "missing": check.missing,
                 "peak_displacement": 0.0,   # total movement seen before stop msg
                 "stop_msg_received": False,
                 "stop_msg_time": None,
@@ -203,22 +257,15 @@ def conditional_logic(robot, image, td, user_code=None):
     if not td["data"]["code_valid"]:
         text = f"Code missing: {', '.join(td['data']['missing'])}"
 
-    # track robot position every frame
-    pos = robot.position
-    if pos is not None:
-        prev = td["data"]["prev_position"]
-
-        if prev is not None and not td["data"]["stop_msg_received"]:
-            dx = pos[0] - prev[0]
-            dy = pos[1] - prev[1]
-            td["data"]["peak_displacement"] += math.sqrt(dx**2 + dy**2)
-            text = f"Robot moving... displacement: {td['data']['peak_displacement']:.1f}cm"
-
-        td["data"]["prev_position"] = pos
+    # track robot position every frame (filtered, so marker jitter does not count as movement)
+    pose = td["pose"].update(robot)
+    pos = pose.position if robot.position is not None else None
+    if pos is not None and not td["data"]["stop_msg_received"] and pose.distance > 0:
+        td["data"]["peak_displacement"] = pose.distance
+        text = f"Robot moving... displacement: {td['data']['peak_displacement']:.1f}cm"
 
     # parse MQTT messages
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         text = f"Message: {msg}"
         if not td["data"]["stop_msg_received"] and "Target found" in msg:
             td["data"]["stop_msg_received"] = True
@@ -235,9 +282,7 @@ def conditional_logic(robot, image, td, user_code=None):
     # timeout / final verdict
     if td["end_time"] - time.time() < 1:
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         elif not td["data"]["stop_msg_received"]:
             result["success"] = False
@@ -311,6 +356,7 @@ def processing_sensor_data(robot, image, td, user_code=None):
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 20,
+            "inbox": MessageInbox(),
             "data": {
                 "total_readings": 0,
                 "detections_above_threshold": 0,
@@ -324,26 +370,12 @@ def processing_sensor_data(robot, image, td, user_code=None):
         }
 
         # load mineral icon once at initialization
-        basepath = os.path.abspath(os.path.dirname(__file__))
         try:
-            mineral_img = cv2.imread(
-                os.path.join(basepath, "images", "mineral.png"), cv2.IMREAD_UNCHANGED
-            )
-            if mineral_img is None:
+            mineral = luma_sprite("mineral.png", size=(64, 64), alpha=True)
+            if mineral is None:
                 raise FileNotFoundError("mineral.png not found")
 
-            mineral_img = cv2.resize(mineral_img, (64, 64))
-
-            if mineral_img.shape[2] == 4:
-                bgr = mineral_img[:, :, :3]
-                _, mask = cv2.threshold(mineral_img[:, :, 3], 1, 255, cv2.THRESH_BINARY)
-            else:
-                bgr = mineral_img
-                gray = cv2.cvtColor(mineral_img, cv2.COLOR_BGR2GRAY)
-                _, mask = cv2.threshold(gray, 10, 255, cv2.THRESH_BINARY)
-
-            td["data"]["mineral"] = bgr
-            td["data"]["mineral_mask"] = mask
+            td["data"]["mineral"], td["data"]["mineral_mask"] = mineral
 
         except Exception as e:
             print(f"Warning: Could not load mineral icon ({e}), using placeholder")
@@ -353,8 +385,9 @@ def processing_sensor_data(robot, image, td, user_code=None):
             td["data"]["mineral_mask"] = np.ones((64, 64), dtype=np.uint8) * 255
 
     # parse MQTT messages
-    msg = robot.get_msg()
-    if msg and "Found geological layers" in msg:
+    for msg in td["inbox"].poll(robot):
+        if "Found geological layers" not in msg:
+            continue
         for num_str in re.findall(r"\d+", msg):
             try:
                 value = int(num_str)
@@ -394,11 +427,7 @@ def processing_sensor_data(robot, image, td, user_code=None):
         text = "MINERAL COLLECTED!"
         ix = td["data"]["mineral_icon_x"]
         iy = td["data"]["mineral_icon_y"]
-        icon = td["data"]["mineral"]
-        mask = td["data"]["mineral_mask"]
-        ih, iw = icon.shape[:2]
-        if iy + ih <= image.shape[0] and ix + iw <= image.shape[1]:
-            cv2.copyTo(icon, mask, image[iy:iy + ih, ix:ix + iw])
+        blit(image, td["data"]["mineral"], td["data"]["mineral_mask"], (ix, iy), centered=False)
 
     # timeout / final verdict
     if td["end_time"] - time.time() < 1:
@@ -425,6 +454,26 @@ def processing_sensor_data(robot, image, td, user_code=None):
     return image, td, text, result
 
 
+def _arrays_and_elif_code(user_code):
+    code = analyze_code(user_code)
+    active_code = code.active
+
+    has_read_all  = "analog_read_all()" in active_code
+    has_elif      = "elif" in active_code
+    has_index_1   = "[1]" in active_code
+    has_index_3   = "[3]" in active_code
+    has_index_6   = "[6]" in active_code
+
+    missing = []
+    if not has_read_all:
+        missing.append("analog_read_all()")
+    if not has_elif:
+        missing.append("elif statement")
+    if not (has_index_1 and has_index_3 and has_index_6):
+        missing.append("sensor indices [1], [3], [6]")
+    return _missing_code(missing)
+
+
 def arrays_and_elif(robot, image, td, user_code=None):
     """
     Verification for lesson: Arrays and Spatial Logic
@@ -449,34 +498,19 @@ def arrays_and_elif(robot, image, td, user_code=None):
     }
     text = "Waiting for survey to begin..."
 
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
 
     if td is None:
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-
-        has_read_all  = "analog_read_all()" in active_code
-        has_elif      = "elif" in active_code
-        has_index_1   = "[1]" in active_code
-        has_index_3   = "[3]" in active_code
-        has_index_6   = "[6]" in active_code
-        code_valid    = has_read_all and has_elif and has_index_1 and has_index_3 and has_index_6
-
-        missing = []
-        if not has_read_all:
-            missing.append("analog_read_all()")
-        if not has_elif:
-            missing.append("elif statement")
-        if not (has_index_1 and has_index_3 and has_index_6):
-            missing.append("sensor indices [1], [3], [6]")
+        check = _arrays_and_elif_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 20,
+            "inbox": MessageInbox(),
+            "preflight": check,
             "data": {
-                "code_valid": code_valid,
-                "missing": missing,
+                "code_valid": check.ok,
+                "missing": check.missing,
                 "scan_msgs": [],        # valid scan result messages received
                 "complete_received": False,
             }
@@ -486,8 +520,7 @@ def arrays_and_elif(robot, image, td, user_code=None):
         text = f"Code missing: {', '.join(td['data']['missing'])}"
 
     # parse MQTT messages
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         text = f"Message: {msg}"
         if any(m in msg for m in EXPECTED_MSGS):
             td["data"]["scan_msgs"].append(msg)
@@ -499,9 +532,7 @@ def arrays_and_elif(robot, image, td, user_code=None):
     # timeout / final verdict
     if td["end_time"] - time.time() < 1:
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         elif not td["data"]["complete_received"]:
             result["success"] = False
@@ -525,6 +556,31 @@ def arrays_and_elif(robot, image, td, user_code=None):
 
     return image, td, text, result
 
+
+def _led_feedback_code(user_code):
+    code = analyze_code(user_code)
+    active_code = code.active
+
+    has_pin15    = "Pin(15" in active_code
+    has_elif     = "elif" in active_code
+    has_read_all = "analog_read_all()" in active_code
+
+    # AST check: a defined function must contain both .on() and .off() calls
+    has_led_fn = any(".on()" in fn_src and ".off()" in fn_src
+                     for fn_src in code.function_sources())
+
+    missing = []
+    if not has_pin15:
+        missing.append("machine.Pin(15)")
+    if not has_led_fn:
+        missing.append("LED blink function with .on() and .off()")
+    if not has_elif:
+        missing.append("elif statement")
+    if not has_read_all:
+        missing.append("analog_read_all()")
+    return _missing_code(missing)
+
+
 def led_feedback(robot, image, td, user_code=None):
     """
     Verification for lesson: Visual Telemetry (LEDs)
@@ -549,48 +605,19 @@ def led_feedback(robot, image, td, user_code=None):
     }
     text = "Surveying..."
 
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
 
     if td is None:
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-
-        has_pin15    = "Pin(15" in active_code
-        has_elif     = "elif" in active_code
-        has_read_all = "analog_read_all()" in active_code
-
-        # AST check: a defined function must contain both .on() and .off() calls
-        has_led_fn = False
-        try:
-            tree = ast.parse(active_code)
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    fn_src = ast.unparse(node)
-                    if ".on()" in fn_src and ".off()" in fn_src:
-                        has_led_fn = True
-                        break
-        except SyntaxError:
-            pass
-
-        code_valid = has_pin15 and has_led_fn and has_elif and has_read_all
-
-        missing = []
-        if not has_pin15:
-            missing.append("machine.Pin(15)")
-        if not has_led_fn:
-            missing.append("LED blink function with .on() and .off()")
-        if not has_elif:
-            missing.append("elif statement")
-        if not has_read_all:
-            missing.append("analog_read_all()")
+        check = _led_feedback_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 30,
+            "inbox": MessageInbox(),
+            "preflight": check,
             "data": {
-                "code_valid":    code_valid,
-                "missing":       missing,
+                "code_valid":    check.ok,
+                "missing":       check.missing,
                 "scan_msgs":     [],
                 "complete_received": False,
             }
@@ -600,8 +627,7 @@ def led_feedback(robot, image, td, user_code=None):
         text = f"Code missing: {', '.join(td['data']['missing'])}"
 
     # parse MQTT messages
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         text = f"Message: {msg}"
         if any(m in msg for m in EXPECTED_MSGS):
             td["data"]["scan_msgs"].append(msg)
@@ -612,9 +638,7 @@ def led_feedback(robot, image, td, user_code=None):
 
     if td["end_time"] - time.time() < 1:
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         elif not td["data"]["complete_received"]:
             result["success"] = False
@@ -639,6 +663,28 @@ def led_feedback(robot, image, td, user_code=None):
     return image, td, text, result
 
 
+def _simple_line_follower_code(user_code):
+    code = analyze_code(user_code)
+    active_code = code.active
+
+    has_read_all = "analog_read_all()" in active_code
+    has_elif     = "elif" in active_code
+    has_index_1  = "[1]" in active_code
+    has_index_6  = "[6]" in active_code
+    has_while    = "while True" in active_code
+
+    missing = []
+    if not has_read_all:
+        missing.append("analog_read_all()")
+    if not has_elif:
+        missing.append("elif statement")
+    if not (has_index_1 and has_index_6):
+        missing.append("scout indices [1] and [6]")
+    if not has_while:
+        missing.append("while True loop")
+    return _missing_code(missing)
+
+
 def simple_line_follower(robot, image, td, user_code=None):
     """
     Verification for lesson: Simple Line Follower
@@ -666,33 +712,16 @@ def simple_line_follower(robot, image, td, user_code=None):
     image = robot.draw_info(image)
 
     if td is None:
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-
-        has_read_all = "analog_read_all()" in active_code
-        has_elif     = "elif" in active_code
-        has_index_1  = "[1]" in active_code
-        has_index_6  = "[6]" in active_code
-        has_while    = "while True" in active_code
-        code_valid   = has_read_all and has_elif and has_index_1 and has_index_6 and has_while
-
-        missing = []
-        if not has_read_all:
-            missing.append("analog_read_all()")
-        if not has_elif:
-            missing.append("elif statement")
-        if not (has_index_1 and has_index_6):
-            missing.append("scout indices [1] and [6]")
-        if not has_while:
-            missing.append("while True loop")
+        check = _simple_line_follower_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time":   time.time() + 90,
+            "inbox":      MessageInbox(),
+            "preflight": check,
             "data": {
-                "code_valid":            code_valid,
-                "missing":               missing,
+                "code_valid":            check.ok,
+                "missing":               check.missing,
                 "completed":             False,
                 "completed_verdict":    False,
                 "checkpoints_hit":       [],
@@ -707,27 +736,12 @@ def simple_line_follower(robot, image, td, user_code=None):
 
         # Load flag images
         try:
-            basepath = os.path.abspath(os.path.dirname(__file__))
-            filepath = os.path.join(basepath, "auto_tests", "images", "flag_finish.jpg")
-            if not os.path.exists(filepath):
-                filepath = os.path.join(basepath, "images", "flag_finish.jpg")
-
-            flag = cv2.imread(filepath)
+            flag = keyed_sprite("flag_finish.jpg", scale=1/3)
             if flag is None:
-                raise FileNotFoundError(f"flag_finish.jpg not found at {filepath}")
-
-            flag = cv2.resize(flag, (int(flag.shape[1] / 3), int(flag.shape[0] / 3)))
-            lower_green = np.array([0, 240, 0])
-            upper_green = np.array([50, 255, 50])
-            mask = cv2.bitwise_not(cv2.inRange(flag, lower_green, upper_green))
-            td["data"]["flag"]      = flag
-            td["data"]["flag_mask"] = mask
-
-            # Green "hit" version of the flag
-            flag_green = flag.copy()
-            flag_green[mask > 0] = (0, 200, 0)
-            td["data"]["flag_green"]      = flag_green
-            td["data"]["flag_green_mask"] = mask
+                raise FileNotFoundError("flag_finish.jpg not found")
+            td["data"]["flag"], td["data"]["flag_mask"] = flag
+            td["data"]["flag_green"], td["data"]["flag_green_mask"] = tinted_sprite(
+                "flag_finish.jpg", (0, 200, 0), scale=1/3)
 
         except Exception as e:
             print(f"Flag load error: {e} — falling back to circle markers")
@@ -758,8 +772,7 @@ def simple_line_follower(robot, image, td, user_code=None):
                     td["end_time"] = time.time() + 10.0
                 text = "All checkpoints reached! Finishing..."
 
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         text = f"Message: {msg}"
 
     # draw flag overlays
@@ -785,20 +798,9 @@ def simple_line_follower(robot, image, td, user_code=None):
             cv2.circle(image, cp_px, radius_px, ring_color, 1)
 
             if use_flag:
-                # flag.shape = (height, width, channels)
-                # height → rows → y axis
-                # width  → cols → x axis
+                # centred on the checkpoint, clipped at the frame edge
                 draw_flag = flag_green if hit else flag
-                half_w = int(draw_flag.shape[1] / 2)
-                half_h = int(draw_flag.shape[0] / 2)
-
-                r0 = cp_px_y - half_h
-                r1 = cp_px_y + (draw_flag.shape[0] - half_h)
-                c0 = cp_px_x - half_w
-                c1 = cp_px_x + (draw_flag.shape[1] - half_w)
-
-                if 0 <= r0 and r1 < image.shape[0] and 0 <= c0 and c1 < image.shape[1]:
-                    cv2.copyTo(draw_flag, flag_mask, image[r0:r1, c0:c1])
+                blit(image, draw_flag, flag_mask, cp_px)
             else:
                 color = (0, 200, 0) if hit else (0, 200, 255)
                 cv2.circle(image, cp_px, 5, color, -1)
@@ -810,9 +812,7 @@ def simple_line_follower(robot, image, td, user_code=None):
         total = len(CHECKPOINTS)
 
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"]   = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         elif hit < total:
             result["success"] = False
@@ -829,6 +829,28 @@ def simple_line_follower(robot, image, td, user_code=None):
 
     return image, td, text, result
 
+
+def _logical_operators_code(user_code):
+    code = analyze_code(user_code)
+    active_code = code.active
+
+    has_read_all = "analog_read_all()" in active_code
+    has_elif     = "elif" in active_code
+    has_while    = "while True" in active_code
+    has_or       = " or " in active_code
+
+    missing = []
+    if not has_read_all:
+        missing.append("analog_read_all()")
+    if not has_elif:
+        missing.append("elif statement")
+    if not has_while:
+        missing.append("while True loop")
+    if not has_or:
+        missing.append("or operator")
+    return _missing_code(missing)
+
+
 def logical_operators(robot, image, td, user_code=None):
     """
     Verification for lesson: Simple Line Follower
@@ -856,32 +878,16 @@ def logical_operators(robot, image, td, user_code=None):
     image = robot.draw_info(image)
 
     if td is None:
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-
-        has_read_all = "analog_read_all()" in active_code
-        has_elif     = "elif" in active_code
-        has_while    = "while True" in active_code
-        has_or       = " or " in active_code
-        code_valid   = has_read_all and has_elif and has_while and has_or
-
-        missing = []
-        if not has_read_all:
-            missing.append("analog_read_all()")
-        if not has_elif:
-            missing.append("elif statement")
-        if not has_while:
-            missing.append("while True loop")
-        if not has_or:
-            missing.append("or operator")
+        check = _logical_operators_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time":   time.time() + 90,
+            "inbox":      MessageInbox(),
+            "preflight": check,
             "data": {
-                "code_valid":            code_valid,
-                "missing":               missing,
+                "code_valid":            check.ok,
+                "missing":               check.missing,
                 "checkpoints_hit":       [],
                 "checkpoints_remaining": list(CHECKPOINTS),
                 "flag":                  None,
@@ -894,27 +900,12 @@ def logical_operators(robot, image, td, user_code=None):
 
         # Load flag images
         try:
-            basepath = os.path.abspath(os.path.dirname(__file__))
-            filepath = os.path.join(basepath, "auto_tests", "images", "flag_finish.jpg")
-            if not os.path.exists(filepath):
-                filepath = os.path.join(basepath, "images", "flag_finish.jpg")
-
-            flag = cv2.imread(filepath)
+            flag = keyed_sprite("flag_finish.jpg", scale=1/3)
             if flag is None:
-                raise FileNotFoundError(f"flag_finish.jpg not found at {filepath}")
-
-            flag = cv2.resize(flag, (int(flag.shape[1] / 3), int(flag.shape[0] / 3)))
-            lower_green = np.array([0, 240, 0])
-            upper_green = np.array([50, 255, 50])
-            mask = cv2.bitwise_not(cv2.inRange(flag, lower_green, upper_green))
-            td["data"]["flag"]      = flag
-            td["data"]["flag_mask"] = mask
-
-            # Green "hit" version of the flag
-            flag_green = flag.copy()
-            flag_green[mask > 0] = (0, 200, 0)
-            td["data"]["flag_green"]      = flag_green
-            td["data"]["flag_green_mask"] = mask
+                raise FileNotFoundError("flag_finish.jpg not found")
+            td["data"]["flag"], td["data"]["flag_mask"] = flag
+            td["data"]["flag_green"], td["data"]["flag_green_mask"] = tinted_sprite(
+                "flag_finish.jpg", (0, 200, 0), scale=1/3)
 
         except Exception as e:
             print(f"Flag load error: {e} — falling back to circle markers")
@@ -937,8 +928,7 @@ def logical_operators(robot, image, td, user_code=None):
             td["data"]["checkpoints_remaining"].pop(0)
             text = f"Checkpoint {len(td['data']['checkpoints_hit'])}/{len(CHECKPOINTS)} reached!"
 
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         text = f"Message: {msg}"
 
     # draw flag overlays
@@ -964,20 +954,9 @@ def logical_operators(robot, image, td, user_code=None):
             cv2.circle(image, cp_px, radius_px, ring_color, 1)
 
             if use_flag:
-                # flag.shape = (height, width, channels)
-                # height → rows → y axis
-                # width  → cols → x axis
+                # centred on the checkpoint, clipped at the frame edge
                 draw_flag = flag_green if hit else flag
-                half_w = int(draw_flag.shape[1] / 2)
-                half_h = int(draw_flag.shape[0] / 2)
-
-                r0 = cp_px_y - half_h
-                r1 = cp_px_y + (draw_flag.shape[0] - half_h)
-                c0 = cp_px_x - half_w
-                c1 = cp_px_x + (draw_flag.shape[1] - half_w)
-
-                if 0 <= r0 and r1 < image.shape[0] and 0 <= c0 and c1 < image.shape[1]:
-                    cv2.copyTo(draw_flag, flag_mask, image[r0:r1, c0:c1])
+                blit(image, draw_flag, flag_mask, cp_px)
             else:
                 color = (0, 200, 0) if hit else (0, 200, 255)
                 cv2.circle(image, cp_px, 5, color, -1)
@@ -988,9 +967,7 @@ def logical_operators(robot, image, td, user_code=None):
         total = len(CHECKPOINTS)
 
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"]   = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         elif hit < total:
             result["success"] = False
@@ -1008,6 +985,16 @@ def logical_operators(robot, image, td, user_code=None):
     return image, td, text, result
 
 
+
+preflight_checks = {
+    "intro_to_octoliner": _intro_to_octoliner_code,
+    "conditional_logic": _conditional_logic_code,
+    "arrays_and_elif": _arrays_and_elif_code,
+    "led_feedback": _led_feedback_code,
+    "simple_line_follower": _simple_line_follower_code,
+    "logical_operators": _logical_operators_code,
+}
+
 ##OLD
 
 '''
@@ -2,8 +2,24 @@ import cv2
 import math
 import time
 import os
+import sys
 import re
-import numpy as np
+
+_VERIFICATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _VERIFICATIONS_DIR not in sys.path:
+    sys.path.insert(0, _VERIFICATIONS_DIR)
+
+from checkerlib.assets import keyed_sprite, tinted_sprite
+from checkerlib.frames import FULL, NONE, POSE, draw_info
+from checkerlib.grammar import Grammar, Shape
+from checkerlib.hud import put_text
+from checkerlib.messages import MessageInbox
+from checkerlib.preflight import Preflight, from_missing, run_preflight
+from checkerlib.requirements import AllOf, AtLeast, Require, RequirementTable
+from checkerlib.source import analyze_code
+from checkerlib.sprites import blit
+from checkerlib.targets import TargetIndex
+from checkerlib.verdict import settle_when
 
 target_points = {
     'python_lists':        [(75, 30), (30, 0)],
@@ -23,6 +39,15 @@ block_library_functions = {
     'data_logging':         False,
 }
 
+frame_needs = {
+    'python_lists': FULL,
+    'telemetry': POSE,
+    'color_sensor_basics': NONE,
+    'color_classification': NONE,
+    'multiple_sensors': FULL,
+    'data_logging': NONE,
+}
+
 
 def get_block_library_functions(task):
     """Retrieve block library status for a given task."""
@@ -34,6 +59,21 @@ def get_target_points(task):
     return target_points.get(task, [])
 
 
+def get_frame_needs(task):
+    """Retrieve what the checker of a task needs from the camera frame."""
+    return frame_needs.get(task, FULL)
+
+
+def preflight(task, user_code):
+    """Static code checks of ``task`` without a robot (see ``checkerlib.preflight``)."""
+    return run_preflight(preflight_checks, task, user_code)
+
+
+def _missing_code(missing):
+    """Preflight of the lessons that list the required code elements not found."""
+    return from_missing(missing, "Code missing: {} | Score: 0")
+
+
 
 
 
@@ -41,6 +81,25 @@ def get_target_points(task):
 # 4.1 Python Lists
 # ──────────────────────────────────────────────────────────────────────────────
 
+def _python_lists_code(user_code):
+    code         = analyze_code(user_code)
+    active_code  = code.active
+
+    has_in_route        = "in route" in active_code
+    has_move_forward    = "move_forward_distance" in active_code
+    has_turn_right      = "turn_right" in active_code
+    has_len_route       = "len(route)" in active_code
+    has_waypoints_print = "waypoints" in active_code
+
+    missing = []
+    if not has_in_route:        missing.append("for loop with 'in route'")
+    if not has_move_forward:    missing.append("move_forward_distance()")
+    if not has_turn_right:      missing.append("turn_right()")
+    if not has_len_route:       missing.append("len(route)")
+    if not has_waypoints_print: missing.append("waypoint count print")
+    return _missing_code(missing)
+
+
 def python_lists(robot, image, td, user_code=None):
     """
     Verification for lesson: Python Lists (Waypoints) — 4.1
@@ -69,34 +128,18 @@ def python_lists(robot, image, td, user_code=None):
     # ── first-frame initialisation ────────────────────────────────────────────
     if td is None:
         # ── code validation ───────────────────────────────────────────────────
-        lines        = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code  = '\n'.join(active_lines)
-
-        has_in_route        = "in route" in active_code
-        has_move_forward    = "move_forward_distance" in active_code
-        has_turn_right      = "turn_right" in active_code
-        has_len_route       = "len(route)" in active_code
-        has_waypoints_print = "waypoints" in active_code
-        code_valid = (
-            has_in_route and has_move_forward and has_turn_right
-            and has_len_route and has_waypoints_print
-        )
-
-        missing = []
-        if not has_in_route:        missing.append("for loop with 'in route'")
-        if not has_move_forward:    missing.append("move_forward_distance()")
-        if not has_turn_right:      missing.append("turn_right()")
-        if not has_len_route:       missing.append("len(route)")
-        if not has_waypoints_print: missing.append("waypoint count print")
+        check = _python_lists_code(user_code)
 
         # ── td state init ─────────────────────────────────────────────────────
         td = {
             "start_time": time.time(),
             "end_time":   time.time() + 30,
+            "inbox":      MessageInbox(),
+            "targets":    TargetIndex(CHECKPOINTS, CHECKPOINT_RADIUS, ordered=True),
+            "preflight":  check,
             "data": {
-                "code_valid":            code_valid,
-                "missing":               missing,
+                "code_valid":            check.ok,
+                "missing":               check.missing,
                 "completed_verdict":     False,
                 "checkpoints_hit":       [],
                 "checkpoints_remaining": list(CHECKPOINTS),
@@ -111,23 +154,12 @@ def python_lists(robot, image, td, user_code=None):
 
         # ── flag image loading (dual-path fallback) ───────────────────────────
         try:
-            basepath = os.path.abspath(os.path.dirname(__file__))
-            filepath = os.path.join(basepath, "auto_tests", "images", "flag_finish.jpg")
-            if not os.path.exists(filepath):
-                filepath = os.path.join(basepath, "images", "flag_finish.jpg")
-            flag = cv2.imread(filepath)
+            flag = keyed_sprite("flag_finish.jpg", scale=1/3)
             if flag is None:
-                raise FileNotFoundError(f"flag_finish.jpg not found at {filepath}")
-            flag = cv2.resize(flag, (int(flag.shape[1] / 3), int(flag.shape[0] / 3)))
-            mask = cv2.bitwise_not(cv2.inRange(flag,
-                                               np.array([0, 240, 0]),
-                                               np.array([50, 255, 50])))
-            td["data"]["flag"]      = flag
-            td["data"]["flag_mask"] = mask
-            flag_green = flag.copy()
-            flag_green[mask > 0] = (0, 200, 0)
-            td["data"]["flag_green"]      = flag_green
-            td["data"]["flag_green_mask"] = mask
+                raise FileNotFoundError("flag_finish.jpg not found")
+            td["data"]["flag"], td["data"]["flag_mask"] = flag
+            td["data"]["flag_green"], td["data"]["flag_green_mask"] = tinted_sprite(
+                "flag_finish.jpg", (0, 200, 0), scale=1/3)
         except Exception as e:
             print(f"Flag load error: {e} — falling back to circle markers")
             td["data"]["image_error"] = True
@@ -138,19 +170,15 @@ def python_lists(robot, image, td, user_code=None):
 
     # ── checkpoint detection ──────────────────────────────────────────────────
     pos = robot.position
-    if pos is not None and td["data"]["checkpoints_remaining"]:
-        next_cp = td["data"]["checkpoints_remaining"][0]
-        dist = math.sqrt((pos[0] - next_cp[0])**2 + (pos[1] - next_cp[1])**2)
-        if dist < CHECKPOINT_RADIUS:
-            td["data"]["checkpoints_hit"].append(next_cp)
-            td["data"]["checkpoints_remaining"].pop(0)
+    for i in td["targets"].update(pos):
+        td["data"]["checkpoints_hit"].append(CHECKPOINTS[i])
+        td["data"]["checkpoints_remaining"].pop(0)
 
     # ── live status text ──────────────────────────────────────────────────────
     hit_now = len(td["data"]["checkpoints_hit"])
     text = f"Checkpoints reached: {hit_now}/{len(CHECKPOINTS)}"
 
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         text = f"Message: {msg}"
 
     # ── overlay drawing ───────────────────────────────────────────────────────
@@ -183,14 +211,14 @@ def python_lists(robot, image, td, user_code=None):
         cv2.circle(image, start_px, 5, (200, 200, 200), -1)
 
         #Start outline
-        cv2.putText(image, f"Start x:{START_POS_CM[0]} y:{START_POS_CM[1]}",
-                    (start_px[0] + label_offset_x, start_px[1] + label_offset_y),
-                    font, outline_scale, color_outline, outline_thickness, cv2.LINE_AA)
+        put_text(image, f"Start x:{START_POS_CM[0]} y:{START_POS_CM[1]}",
+                (start_px[0] + label_offset_x, start_px[1] + label_offset_y),
+                font, outline_scale, color_outline, outline_thickness, cv2.LINE_AA)
 
         #Start label
-        cv2.putText(image, f"Start x:{START_POS_CM[0]} y:{START_POS_CM[1]}",
-                    (start_px[0] + label_offset_x, start_px[1] + label_offset_y),
-                    font, font_scale, color_text, thickness, cv2.LINE_AA)
+        put_text(image, f"Start x:{START_POS_CM[0]} y:{START_POS_CM[1]}",
+                (start_px[0] + label_offset_x, start_px[1] + label_offset_y),
+                font, font_scale, color_text, thickness, cv2.LINE_AA)
 
         # checkpoint circles + flag overlays
         cp_names = ["CP1", "CP2", "CP3"]
@@ -200,30 +228,23 @@ def python_lists(robot, image, td, user_code=None):
             cv2.circle(image, cp_px, radius_px, (0, 200, 0) if hit else (0, 200, 255), 1)
             if use_flag:
                 draw_flag = flag_green if hit else flag
-                half_w = draw_flag.shape[1] // 2
-                half_h = draw_flag.shape[0] // 2
-                r0 = cp_px[1] - half_h
-                r1 = cp_px[1] + (draw_flag.shape[0] - half_h)
-                c0 = cp_px[0] - half_w
-                c1 = cp_px[0] + (draw_flag.shape[1] - half_w)
-                if 0 <= r0 and r1 < image.shape[0] and 0 <= c0 and c1 < image.shape[1]:
-                    cv2.copyTo(draw_flag, flag_mask, image[r0:r1, c0:c1])
+                blit(image, draw_flag, flag_mask, cp_px)
             else:
                 cv2.circle(image, cp_px, 5, (0, 200, 0) if hit else (0, 200, 255), -1)
 
         # checkpoint coordinate label outlines
         for i, cp_cm in enumerate(CHECKPOINTS):
             cp_px = (int(cp_cm[0] * px_per_cm), int(cp_cm[1] * px_per_cm))
-            cv2.putText(image, f"{cp_names[i]} x:{cp_cm[0]} y:{cp_cm[1]}",
-                        (cp_px[0] + label_offset_x, cp_px[1] + label_offset_y),
-                        font, outline_scale, color_outline, outline_thickness, cv2.LINE_AA)
+            put_text(image, f"{cp_names[i]} x:{cp_cm[0]} y:{cp_cm[1]}",
+                    (cp_px[0] + label_offset_x, cp_px[1] + label_offset_y),
+                    font, outline_scale, color_outline, outline_thickness, cv2.LINE_AA)
 
         # checkpoint coordinate labels
         for i, cp_cm in enumerate(CHECKPOINTS):
             cp_px = (int(cp_cm[0] * px_per_cm), int(cp_cm[1] * px_per_cm))
-            cv2.putText(image, f"{cp_names[i]} x:{cp_cm[0]} y:{cp_cm[1]}",
-                        (cp_px[0] + label_offset_x, cp_px[1] + label_offset_y),
-                        font, font_scale, color_text, thickness, cv2.LINE_AA)
+            put_text(image, f"{cp_names[i]} x:{cp_cm[0]} y:{cp_cm[1]}",
+                    (cp_px[0] + label_offset_x, cp_px[1] + label_offset_y),
+                    font, font_scale, color_text, thickness, cv2.LINE_AA)
 
 
 
@@ -233,9 +254,7 @@ def python_lists(robot, image, td, user_code=None):
         hit   = len(td["data"]["checkpoints_hit"])
         total = len(CHECKPOINTS)
         if not td["data"]["code_valid"]:
-            result["success"]     = False
-            result["score"]       = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         elif hit < total:
             result["success"]     = False
@@ -255,6 +274,37 @@ def python_lists(robot, image, td, user_code=None):
 # 4.2 Telemetry
 # ──────────────────────────────────────────────────────────────────────────────
 
+_STATUS_PAIR = re.compile(r'(\w+)=([^;]+)')
+
+
+def _status_pairs(body):
+    return dict(_STATUS_PAIR.findall(body))
+
+
+TELEMETRY_MESSAGES = Grammar([
+    Shape("status", r"(?s)STATUS:(?P<pairs>.*)", at_start=True, pairs=_status_pairs),
+])
+
+
+def _telemetry_code(user_code):
+    code         = analyze_code(user_code)
+    active_code  = code.active
+
+    has_move_forward  = "move_forward_distance(" in active_code
+    has_time_time     = active_code.count("time.time()") >= 2
+    has_robot_name    = "robot_name" in active_code
+    has_is_ready      = "is_ready" in active_code
+    has_fstring_print = "print(f" in active_code
+
+    missing = []
+    if not has_move_forward:  missing.append("move_forward_distance(")
+    if not has_time_time:     missing.append("time.time() used twice (start + end)")
+    if not has_robot_name:    missing.append("robot_name variable")
+    if not has_is_ready:      missing.append("is_ready variable")
+    if not has_fstring_print: missing.append("f-string inside print()")
+    return Preflight(missing)
+
+
 def telemetry(robot, image, td, user_code=None):
     """
     Verification for lesson: Telemetry — 4.2
@@ -273,36 +323,19 @@ def telemetry(robot, image, td, user_code=None):
     }
     text = "Speed test underway..."
 
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
 
     if td is None:
-        lines        = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code  = '\n'.join(active_lines)
-
-        has_move_forward  = "move_forward_distance(" in active_code
-        has_time_time     = active_code.count("time.time()") >= 2
-        has_robot_name    = "robot_name" in active_code
-        has_is_ready      = "is_ready" in active_code
-        has_fstring_print = "print(f" in active_code
-        code_valid = (
-            has_move_forward and has_time_time and has_robot_name
-            and has_is_ready and has_fstring_print
-        )
-
-        missing = []
-        if not has_move_forward:  missing.append("move_forward_distance(")
-        if not has_time_time:     missing.append("time.time() used twice (start + end)")
-        if not has_robot_name:    missing.append("robot_name variable")
-        if not has_is_ready:      missing.append("is_ready variable")
-        if not has_fstring_print: missing.append("f-string inside print()")
+        check = _telemetry_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time":   time.time() + 20,
+            "inbox":      MessageInbox(),
+            "preflight":  check,
             "data": {
-                "code_valid":        code_valid,
-                "missing":           missing,
+                "code_valid":        check.ok,
+                "missing":           check.missing,
                 "completed_verdict": False,
                 "phase":             1,
                 "moved":             False,
@@ -317,21 +350,20 @@ def telemetry(robot, image, td, user_code=None):
         text = f"Code missing: {', '.join(td['data']['missing'])}"
 
     if not td["data"]["msg_valid"]:
-        msg = robot.get_msg()
-        if msg is not None and msg.startswith("STATUS:"):
-            td["data"]["msg_raw"] = msg
-            body         = msg[len("STATUS:"):]
-            pairs        = dict(re.findall(r'(\w+)=([^;]+)', body))
-            keys_found   = set(pairs.keys())
-            missing_keys = REQUIRED_KEYS - keys_found
-            td["data"]["msg_keys_found"] = list(keys_found)
-            if not missing_keys:
-                td["data"]["msg_valid"] = True
-                text = "Telemetry validated!"
-            else:
+        for msg in td["inbox"].poll(robot):
+            status = TELEMETRY_MESSAGES.parse(msg)
+            if status is not None:
+                td["data"]["msg_raw"] = msg
+                keys_found   = set(status["pairs"].keys())
+                missing_keys = REQUIRED_KEYS - keys_found
+                td["data"]["msg_keys_found"] = list(keys_found)
+                if not missing_keys:
+                    td["data"]["msg_valid"] = True
+                    text = "Telemetry validated!"
+                    break
                 text = f"STATUS message missing keys: {', '.join(missing_keys)}"
-        elif msg is not None:
-            text = f"Message received but wrong format: {msg[:40]}"
+            else:
+                text = f"Message received but wrong format: {msg[:40]}"
 
     if td["data"]["phase"] == 1:
         pos = robot.position
@@ -379,6 +411,32 @@ def telemetry(robot, image, td, user_code=None):
 # 4.3 Color Sensor Basics
 # ──────────────────────────────────────────────────────────────────────────────
 
+COLOR_SCAN_MESSAGES = Grammar([
+    Shape("scan", r"Scan - R:(?P<r>\d+) G:(?P<g>\d+) B:(?P<b>\d+)", r=int, g=int, b=int),
+])
+
+
+def _color_sensor_basics_code(user_code):
+    code         = analyze_code(user_code)
+    active_code  = code.active
+
+    has_i2c        = "machine.I2C" in active_code
+    has_tcs3472    = "tcs3472" in active_code
+    has_range6     = "range(6)" in active_code
+    has_rgb        = ".rgb()" in active_code
+    has_move       = "move_forward_distance(10)" in active_code
+    has_scan_print = "Scan - R:" in active_code
+
+    missing = []
+    if not has_i2c:        missing.append("machine.I2C initialization")
+    if not has_tcs3472:    missing.append("tcs3472 sensor")
+    if not has_range6:     missing.append("range(6) loop")
+    if not has_rgb:        missing.append(".rgb() call")
+    if not has_move:       missing.append("move_forward_distance(10)")
+    if not has_scan_print: missing.append('print format "Scan - R:..."')
+    return _missing_code(missing)
+
+
 def color_sensor_basics(robot, image, td, user_code=None):
     """
     Verification for lesson: Color Sensor Basics — 4.3
@@ -395,38 +453,19 @@ def color_sensor_basics(robot, image, td, user_code=None):
     }
     text = "Waiting for scan data..."
 
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
 
     if td is None:
-        lines        = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code  = '\n'.join(active_lines)
-
-        has_i2c        = "machine.I2C" in active_code
-        has_tcs3472    = "tcs3472" in active_code
-        has_range6     = "range(6)" in active_code
-        has_rgb        = ".rgb()" in active_code
-        has_move       = "move_forward_distance(10)" in active_code
-        has_scan_print = "Scan - R:" in active_code
-        code_valid = (
-            has_i2c and has_tcs3472 and has_range6
-            and has_rgb and has_move and has_scan_print
-        )
-
-        missing = []
-        if not has_i2c:        missing.append("machine.I2C initialization")
-        if not has_tcs3472:    missing.append("tcs3472 sensor")
-        if not has_range6:     missing.append("range(6) loop")
-        if not has_rgb:        missing.append(".rgb() call")
-        if not has_move:       missing.append("move_forward_distance(10)")
-        if not has_scan_print: missing.append('print format "Scan - R:..."')
+        check = _color_sensor_basics_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time":   time.time() + 20,
+            "inbox":      MessageInbox(),
+            "preflight":  check,
             "data": {
-                "code_valid":        code_valid,
-                "missing":           missing,
+                "code_valid":        check.ok,
+                "missing":           check.missing,
                 "completed_verdict": False,
                 "valid_scans":       [],
                 "last_scan":         None,
@@ -436,11 +475,10 @@ def color_sensor_basics(robot, image, td, user_code=None):
     if not td["data"]["code_valid"]:
         text = f"Code missing: {', '.join(td['data']['missing'])}"
 
-    msg = robot.get_msg()
-    if msg is not None:
-        match = re.search(r'Scan - R:(\d+) G:(\d+) B:(\d+)', msg)
-        if match:
-            r, g, b = int(match.group(1)), int(match.group(2)), int(match.group(3))
+    for msg in td["inbox"].poll(robot):
+        scan = COLOR_SCAN_MESSAGES.parse(msg)
+        if scan is not None:
+            r, g, b = scan["r"], scan["g"], scan["b"]
             if 0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255:
                 td["data"]["valid_scans"].append((r, g, b))
                 td["data"]["last_scan"] = (r, g, b)
@@ -456,9 +494,7 @@ def color_sensor_basics(robot, image, td, user_code=None):
         td["data"]["completed_verdict"] = True
         valid = len(td["data"]["valid_scans"])
         if not td["data"]["code_valid"]:
-            result["success"]     = False
-            result["score"]       = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         elif valid < MIN_VALID_SCANS:
             result["success"]     = False
@@ -478,6 +514,41 @@ def color_sensor_basics(robot, image, td, user_code=None):
 # 4.4 Color Classification
 # ──────────────────────────────────────────────────────────────────────────────
 
+COLOR_CLASSIFICATION_MESSAGES = Grammar([
+    Shape("scan", r"Scan - (?P<color>\w+) \(Raw: R:(?P<r>\d+) G:(?P<g>\d+) B:(?P<b>\d+)\)",
+          r=int, g=int, b=int),
+])
+
+
+def _color_classification_code(user_code):
+    code         = analyze_code(user_code)
+    active_code  = code.active
+
+    has_i2c           = "machine.I2C" in active_code
+    has_tcs3472       = "tcs3472" in active_code
+    has_detect_func   = "def detect_color_name" in active_code
+    has_normalization = ("r_ratio" in active_code
+                         and "g_ratio" in active_code
+                         and "b_ratio" in active_code)
+    has_range6        = "range(6)" in active_code
+    has_rgb           = ".rgb()" in active_code
+    has_move          = "move_forward_distance(10)" in active_code
+    has_detect_call   = "detect_color_name(r, g, b)" in active_code
+    has_scan_print    = "Scan -" in active_code
+
+    missing = []
+    if not has_i2c:           missing.append("machine.I2C initialization")
+    if not has_tcs3472:       missing.append("tcs3472 sensor")
+    if not has_detect_func:   missing.append("detect_color_name() function")
+    if not has_normalization: missing.append("r_ratio / g_ratio / b_ratio normalization")
+    if not has_range6:        missing.append("range(6) loop")
+    if not has_rgb:           missing.append(".rgb() call")
+    if not has_move:          missing.append("move_forward_distance(10)")
+    if not has_detect_call:   missing.append("detect_color_name(r, g, b) call in loop")
+    if not has_scan_print:    missing.append('print format "Scan Scan -..."')
+    return _missing_code(missing)
+
+
 def color_classification(robot, image, td, user_code=None):
     """
     Verification for lesson: Color Classification — 4.4
@@ -495,47 +566,19 @@ def color_classification(robot, image, td, user_code=None):
     }
     text = "Waiting for scan data..."
 
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
 
     if td is None:
-        lines        = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code  = '\n'.join(active_lines)
-
-        has_i2c           = "machine.I2C" in active_code
-        has_tcs3472       = "tcs3472" in active_code
-        has_detect_func   = "def detect_color_name" in active_code
-        has_normalization = ("r_ratio" in active_code
-                             and "g_ratio" in active_code
-                             and "b_ratio" in active_code)
-        has_range6        = "range(6)" in active_code
-        has_rgb           = ".rgb()" in active_code
-        has_move          = "move_forward_distance(10)" in active_code
-        has_detect_call   = "detect_color_name(r, g, b)" in active_code
-        has_scan_print    = "Scan -" in active_code
-        code_valid = (
-            has_i2c and has_tcs3472 and has_detect_func and has_normalization
-            and has_range6 and has_rgb and has_move
-            and has_detect_call and has_scan_print
-        )
-
-        missing = []
-        if not has_i2c:           missing.append("machine.I2C initialization")
-        if not has_tcs3472:       missing.append("tcs3472 sensor")
-        if not has_detect_func:   missing.append("detect_color_name() function")
-        if not has_normalization: missing.append("r_ratio / g_ratio / b_ratio normalization")
-        if not has_range6:        missing.append("range(6) loop")
-        if not has_rgb:           missing.append(".rgb() call")
-        if not has_move:          missing.append("move_forward_distance(10)")
-        if not has_detect_call:   missing.append("detect_color_name(r, g, b) call in loop")
-        if not has_scan_print:    missing.append('print format "Scan Scan -..."')
+        check = _color_classification_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time":   time.time() + 20,
+            "inbox":      MessageInbox(),
+            "preflight":  check,
             "data": {
-                "code_valid":        code_valid,
-                "missing":           missing,
+                "code_valid":        check.ok,
+                "missing":           check.missing,
                 "completed_verdict": False,
                 "valid_scans":       [],
                 "last_scan":         None,
@@ -545,12 +588,11 @@ def color_classification(robot, image, td, user_code=None):
     if not td["data"]["code_valid"]:
         text = f"Code missing: {', '.join(td['data']['missing'])}"
 
-    msg = robot.get_msg()
-    if msg is not None:
-        match = re.search(r'Scan - (\w+) \(Raw: R:(\d+) G:(\d+) B:(\d+)\)', msg)
-        if match:
-            color_name = match.group(1)
-            r, g, b    = int(match.group(2)), int(match.group(3)), int(match.group(4))
+    for msg in td["inbox"].poll(robot):
+        scan = COLOR_CLASSIFICATION_MESSAGES.parse(msg)
+        if scan is not None:
+            color_name = scan["color"]
+            r, g, b    = scan["r"], scan["g"], scan["b"]
             if (color_name in VALID_COLORS
                     and 0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255):
                 td["data"]["valid_scans"].append((color_name, r, g, b))
@@ -567,9 +609,7 @@ def color_classification(robot, image, td, user_code=None):
         td["data"]["completed_verdict"] = True
         valid = len(td["data"]["valid_scans"])
         if not td["data"]["code_valid"]:
-            result["success"]     = False
-            result["score"]       = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         elif valid < MIN_VALID_SCANS:
             result["success"]     = False
@@ -589,6 +629,32 @@ def color_classification(robot, image, td, user_code=None):
 # 4.5 Multiple Sensors
 # ──────────────────────────────────────────────────────────────────────────────
 
+MULTIPLE_SENSORS_REQUIREMENTS = RequirementTable([
+    Require("machine.I2C",               "machine.I2C"),
+    Require("tcs3472",                   "tcs3472 sensor"),
+    Require("Octoliner",                 "Octoliner"),
+    Require("Pin(15",                    "Pin(15) LED"),
+    Require("def detect_color_name",     "detect_color_name() function"),
+    AllOf(("r_ratio", "g_ratio", "b_ratio"),
+          "r_ratio / g_ratio / b_ratio normalization"),
+    Require("while True",                "while True loop"),
+    Require("last_color",                "last_color spam filter"),
+    Require("break",                     "break statement"),
+    Require("analog_read_all()",         "analog_read_all()"),
+    Require("elif",                      "elif statement"),
+])
+
+
+MULTIPLE_SENSORS_MESSAGES = Grammar([
+    Shape("color", r"(?P<color>\w+) \(Raw: R:(?P<r>\d+) G:(?P<g>\d+) B:(?P<b>\d+)\)",
+          key=" (Raw: R:", r=int, g=int, b=int),
+])
+
+
+def _multiple_sensors_code(user_code):
+    return _missing_code(MULTIPLE_SENSORS_REQUIREMENTS.check(analyze_code(user_code).active).missing)
+
+
 def multiple_sensors(robot, image, td, user_code=None):
     """
     Verification for lesson: Multiple Sensors — 4.5
@@ -618,49 +684,16 @@ def multiple_sensors(robot, image, td, user_code=None):
     image = robot.draw_info(image)
 
     if td is None:
-        lines        = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code  = '\n'.join(active_lines)
-
-        has_i2c           = "machine.I2C" in active_code
-        has_tcs3472       = "tcs3472" in active_code
-        has_octoliner     = "Octoliner" in active_code
-        has_pin15         = "Pin(15" in active_code
-        has_detect_func   = "def detect_color_name" in active_code
-        has_normalization = ("r_ratio" in active_code
-                             and "g_ratio" in active_code
-                             and "b_ratio" in active_code)
-        has_while         = "while True" in active_code
-        has_last_color    = "last_color" in active_code
-        has_break         = "break" in active_code
-        has_read_all      = "analog_read_all()" in active_code
-        has_elif          = "elif" in active_code
-
-        code_valid = (
-            has_i2c and has_tcs3472 and has_octoliner and has_pin15
-            and has_detect_func and has_normalization and has_while
-            and has_last_color and has_break and has_read_all and has_elif
-        )
-
-        missing = []
-        if not has_i2c:           missing.append("machine.I2C")
-        if not has_tcs3472:       missing.append("tcs3472 sensor")
-        if not has_octoliner:     missing.append("Octoliner")
-        if not has_pin15:         missing.append("Pin(15) LED")
-        if not has_detect_func:   missing.append("detect_color_name() function")
-        if not has_normalization: missing.append("r_ratio / g_ratio / b_ratio normalization")
-        if not has_while:         missing.append("while True loop")
-        if not has_last_color:    missing.append("last_color spam filter")
-        if not has_break:         missing.append("break statement")
-        if not has_read_all:      missing.append("analog_read_all()")
-        if not has_elif:          missing.append("elif statement")
+        check = _multiple_sensors_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time":   time.time() + 20,
+            "inbox":      MessageInbox(),
+            "preflight":  check,
             "data": {
-                "code_valid":        code_valid,
-                "missing":           missing,
+                "code_valid":        check.ok,
+                "missing":           check.missing,
                 "completed_verdict": False,
                 "color_msgs":        [],
                 "led_on_received":   False,
@@ -676,12 +709,11 @@ def multiple_sensors(robot, image, td, user_code=None):
     if not td["data"]["code_valid"]:
         text = f"Code missing: {', '.join(td['data']['missing'])}"
 
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         td["data"]["last_msg"] = msg
 
-        match = re.search(r'(\w+) \(Raw: R:(\d+) G:(\d+) B:(\d+)\)', msg)
-        if match and match.group(1) in VALID_COLORS:
+        color = MULTIPLE_SENSORS_MESSAGES.parse(msg)
+        if color is not None and color["color"] in VALID_COLORS:
             td["data"]["color_msgs"].append(msg)
 
         if LED_ON_MSG in msg:
@@ -725,23 +757,23 @@ def multiple_sensors(robot, image, td, user_code=None):
                       (int(gx0 * px_per_cm), int(gy0 * px_per_cm)),
                       (int(gx1 * px_per_cm), int(gy1 * px_per_cm)),
                       zone_color, 2)
-        cv2.putText(image, "GREEN ZONE",
-                    (int(gx0 * px_per_cm), int(gy0 * px_per_cm) - 5),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.45, zone_color, 1, cv2.LINE_AA)
+        put_text(image, "GREEN ZONE",
+                (int(gx0 * px_per_cm), int(gy0 * px_per_cm) - 5),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.45, zone_color, 1, cv2.LINE_AA)
 
         bz_px        = (int(BLUE_ZONE_CENTER[0] * px_per_cm),
                         int(BLUE_ZONE_CENTER[1] * px_per_cm))
         bz_radius_px = int(BLUE_ZONE_RADIUS * px_per_cm)
         blue_color   = (255, 180, 0) if td["data"]["stopped_confirmed"] else (255, 200, 100)
         cv2.circle(image, bz_px, bz_radius_px, blue_color, 2)
-        cv2.putText(image, "BLUE ZONE",
-                    (bz_px[0] - 30, bz_px[1] - bz_radius_px - 5),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.45, blue_color, 1, cv2.LINE_AA)
+        put_text(image, "BLUE ZONE",
+                (bz_px[0] - 30, bz_px[1] - bz_radius_px - 5),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.45, blue_color, 1, cv2.LINE_AA)
 
     led_label = "LED ON" if td["data"]["mqtt_led_state"] else "LED OFF"
     led_color = (0, 255, 0) if td["data"]["mqtt_led_state"] else (0, 100, 100)
-    cv2.putText(image, led_label,
-                (20, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, led_color, 1)
+    put_text(image, led_label,
+            (20, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, led_color, 1)
 
     color_count = len(td["data"]["color_msgs"])
     last = td["data"]["last_msg"]
@@ -752,9 +784,7 @@ def multiple_sensors(robot, image, td, user_code=None):
         td["data"]["completed_verdict"] = True
         color_count = len(td["data"]["color_msgs"])
         if not td["data"]["code_valid"]:
-            result["success"]     = False
-            result["score"]       = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         elif color_count == 0:
             result["success"]     = False
@@ -802,6 +832,38 @@ def multiple_sensors(robot, image, td, user_code=None):
 # 4.6 Data Logging
 # ──────────────────────────────────────────────────────────────────────────────
 
+DATA_LOGGING_REQUIREMENTS = RequirementTable([
+    Require("machine.I2C",               "machine.I2C"),
+    Require("tcs3472",                   "tcs3472 sensor"),
+    Require("Octoliner",                 "Octoliner"),
+    Require("def detect_color_name",     "detect_color_name() function"),
+    AllOf(("r_ratio", "g_ratio", "b_ratio"),
+          "r_ratio / g_ratio / b_ratio normalization"),
+    Require("= []",                      "empty list (= [])"),
+    Require("mission_duration",          "mission_duration variable"),
+    Require("start_time",                "start_time variable"),
+    AtLeast("time.time()", 2,            "time.time() timer (used at least twice)"),
+    Require("while True",                "while True loop"),
+    Require("elapsed_time",              "elapsed_time check"),
+    Require("break",                     "break statement"),
+    Require(".append(",                  ".append() call"),
+    Require("analog_read_all()",         "analog_read_all()"),
+    Require("elif",                      "elif statement"),
+    Require("for ",                      "for loop for report"),
+    Require("End of transmission",       '"End of transmission" print'),
+])
+
+
+DATA_LOGGING_MESSAGES = Grammar([
+    Shape("anomaly", r"Found: (?P<color>\w+) \| Raw Data: R:(?P<r>\d+) G:(?P<g>\d+) B:(?P<b>\d+)",
+          r=int, g=int, b=int),
+])
+
+
+def _data_logging_code(user_code):
+    return _missing_code(DATA_LOGGING_REQUIREMENTS.check(analyze_code(user_code).active).missing)
+
+
 def data_logging(robot, image, td, user_code=None):
     """
     Verification for lesson: Data Logging — 4.6
@@ -823,67 +885,19 @@ def data_logging(robot, image, td, user_code=None):
     }
     text = "Waiting for mission start..."
 
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
 
     if td is None:
-        lines        = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code  = '\n'.join(active_lines)
-
-        has_i2c           = "machine.I2C" in active_code
-        has_tcs3472       = "tcs3472" in active_code
-        has_octoliner     = "Octoliner" in active_code
-        has_detect_func   = "def detect_color_name" in active_code
-        has_normalization = ("r_ratio" in active_code
-                             and "g_ratio" in active_code
-                             and "b_ratio" in active_code)
-        has_empty_list    = "= []" in active_code
-        has_mission_dur   = "mission_duration" in active_code
-        has_start_time    = "start_time" in active_code
-        has_timer         = active_code.count("time.time()") >= 2
-        has_while         = "while True" in active_code
-        has_elapsed       = "elapsed_time" in active_code
-        has_break         = "break" in active_code
-        has_append        = ".append(" in active_code
-        has_read_all      = "analog_read_all()" in active_code
-        has_elif          = "elif" in active_code
-        has_for_report    = "for " in active_code
-        has_end_msg       = "End of transmission" in active_code
-
-        code_valid = (
-            has_i2c and has_tcs3472 and has_octoliner
-            and has_detect_func and has_normalization
-            and has_empty_list and has_mission_dur and has_start_time and has_timer
-            and has_while and has_elapsed and has_break
-            and has_append and has_read_all and has_elif
-            and has_for_report and has_end_msg
-        )
-
-        missing = []
-        if not has_i2c:           missing.append("machine.I2C")
-        if not has_tcs3472:       missing.append("tcs3472 sensor")
-        if not has_octoliner:     missing.append("Octoliner")
-        if not has_detect_func:   missing.append("detect_color_name() function")
-        if not has_normalization: missing.append("r_ratio / g_ratio / b_ratio normalization")
-        if not has_empty_list:    missing.append("empty list (= [])")
-        if not has_mission_dur:   missing.append("mission_duration variable")
-        if not has_start_time:    missing.append("start_time variable")
-        if not has_timer:         missing.append("time.time() timer (used at least twice)")
-        if not has_while:         missing.append("while True loop")
-        if not has_elapsed:       missing.append("elapsed_time check")
-        if not has_break:         missing.append("break statement")
-        if not has_append:        missing.append(".append() call")
-        if not has_read_all:      missing.append("analog_read_all()")
-        if not has_elif:          missing.append("elif statement")
-        if not has_for_report:    missing.append("for loop for report")
-        if not has_end_msg:       missing.append('"End of transmission" print')
+        check = _data_logging_code(user_code)
 
         td = {
             "start_time": time.time(),
             "end_time":   time.time() + 40,
+            "inbox":      MessageInbox(),
+            "preflight":  check,
             "data": {
-                "code_valid":        code_valid,
-                "missing":           missing,
+                "code_valid":        check.ok,
+                "missing":           check.missing,
                 "completed_verdict": False,
                 "start_received":    False,
                 "anomaly_msgs":      [],
@@ -895,13 +909,12 @@ def data_logging(robot, image, td, user_code=None):
     if not td["data"]["code_valid"]:
         text = f"Code missing: {', '.join(td['data']['missing'])}"
 
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         td["data"]["last_msg"] = msg
         if START_MSG in msg:
             td["data"]["start_received"] = True
-        match = re.search(r'Found: (\w+) \| Raw Data: R:(\d+) G:(\d+) B:(\d+)', msg)
-        if match and match.group(1) in VALID_COLORS:
+        anomaly = DATA_LOGGING_MESSAGES.parse(msg)
+        if anomaly is not None and anomaly["color"] in VALID_COLORS:
             td["data"]["anomaly_msgs"].append(msg)
         if REPORT_END_MSG in msg:
             td["data"]["report_end"] = True
@@ -913,13 +926,14 @@ def data_logging(robot, image, td, user_code=None):
     if td["data"]["report_end"]:
         text = f"Report received! {anomaly_count} anomalies logged."
 
+    # invalid code fails whatever the robot does: give the verdict now
+    settle_when(td, invalid_code=not td["data"]["code_valid"])
+
     if td["end_time"] - time.time() < 1 and not td["data"].get("completed_verdict"):
         td["data"]["completed_verdict"] = True
         anomaly_count = len(td["data"]["anomaly_msgs"])
         if not td["data"]["code_valid"]:
-            result["success"]     = False
-            result["score"]       = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         elif not td["data"]["start_received"]:
             result["success"]     = False
@@ -953,6 +967,16 @@ def data_logging(robot, image, td, user_code=None):
 
     return image, td, text, result
 
+
+preflight_checks = {
+    "python_lists": _python_lists_code,
+    "telemetry": _telemetry_code,
+    "color_sensor_basics": _color_sensor_basics_code,
+    "color_classification": _color_classification_code,
+    "multiple_sensors": _multiple_sensors_code,
+    "data_logging": _data_logging_code,
+}
+
 #OLD
 
 '''
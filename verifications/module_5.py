@@ -2,8 +2,22 @@ import cv2
 import math
 import time
 import os
-import numpy as np
-import re
+import sys
+
+_VERIFICATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _VERIFICATIONS_DIR not in sys.path:
+    sys.path.insert(0, _VERIFICATIONS_DIR)
+
+from checkerlib.assets import keyed_sprite, tinted_sprite
+from checkerlib.frames import FULL, POSE, draw_info
+from checkerlib.grammar import Grammar, Shape
+from checkerlib.messages import MessageInbox
+from checkerlib.preflight import from_missing, run_preflight
+from checkerlib.requirements import AllOf, AnyOf, Require, RequirementTable
+from checkerlib.series import Series
+from checkerlib.source import analyze_code
+from checkerlib.sprites import blit
+from checkerlib.targets import TargetIndex
 
 target_points = {
     'concept_of_error': [(22, 86),(0,-30)],           # Start: x=22, y=86, direction=-30
@@ -21,6 +35,14 @@ block_library_functions = {
     'adaptive_speed': False,
 }
 
+frame_needs = {
+    'concept_of_error': POSE,
+    'upgraded_relay_controller': FULL,
+    'proportional_control': FULL,
+    'tuning_and_kick': POSE,
+    'adaptive_speed': FULL,
+}
+
 
 def get_block_library_functions(task):
     """Retrieve block library status for a given task."""
@@ -32,10 +54,49 @@ def get_target_points(task):
     return target_points.get(task, [])
 
 
+def get_frame_needs(task):
+    """Retrieve what the checker of a task needs from the camera frame."""
+    return frame_needs.get(task, FULL)
+
+
+def preflight(task, user_code):
+    """Static code checks of ``task`` without a robot (see ``checkerlib.preflight``)."""
+    return run_preflight(preflight_checks, task, user_code)
+
+
+def _missing_code(missing):
+    """Preflight of the lessons that list the required code elements not found."""
+    return from_missing(missing, "Code missing: {} | Score: 0")
+
+
 
 # ============================================================================
 # Task 5.1: Concept of Error
 # ============================================================================
+
+CONCEPT_OF_ERROR_MESSAGES = Grammar([
+    Shape("error", r"Error:\s*(?P<value>[-+]?[0-9]*\.?[0-9]+)", value=float),
+])
+
+
+def _concept_of_error_code(user_code):
+    code         = analyze_code(user_code)
+    active_code  = code.active
+
+    has_track_line      = 'octoliner.track_line()' in active_code
+    has_error_print     = 'print' in active_code and 'Error' in active_code
+    sweep_count         = active_code.count('diagnostic_sweep(')
+    has_two_sweeps      = sweep_count >= 2
+    has_forward_move    = 'move_forward_distance(30)' in active_code
+
+    missing = []
+    if not has_track_line:   missing.append('octoliner.track_line()')
+    if not has_error_print:  missing.append('print("Error:", ...)')
+    if not has_two_sweeps:   missing.append('two diagnostic_sweep() calls')
+    if not has_forward_move: missing.append('move_forward_distance(30)')
+    return _missing_code(missing)
+
+
 def concept_of_error(robot, image, td, user_code=None):
     """
     Verification for lesson: Concept of Error — 5.1
@@ -61,38 +122,22 @@ def concept_of_error(robot, image, td, user_code=None):
     }
     text = "Waiting for messages..."
 
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
 
     # ── first-frame initialisation ────────────────────────────────────────────
     if td is None:
         # ── code validation ───────────────────────────────────────────────────
-        lines        = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code  = '\n'.join(active_lines)
-
-        has_track_line      = 'octoliner.track_line()' in active_code
-        has_error_print     = 'print' in active_code and 'Error' in active_code
-        sweep_count         = active_code.count('diagnostic_sweep(')
-        has_two_sweeps      = sweep_count >= 2
-        has_forward_move    = 'move_forward_distance(30)' in active_code
-        
-        code_valid = (
-            has_track_line and has_error_print and has_two_sweeps and has_forward_move
-        )
-
-        missing = []
-        if not has_track_line:   missing.append('octoliner.track_line()')
-        if not has_error_print:  missing.append('print("Error:", ...)')
-        if not has_two_sweeps:   missing.append('two diagnostic_sweep() calls')
-        if not has_forward_move: missing.append('move_forward_distance(30)')
+        check = _concept_of_error_code(user_code)
 
         # ── td state init ─────────────────────────────────────────────────────
         td = {
             "start_time": time.time(),
             "end_time":   time.time() + 10,
+            "inbox":      MessageInbox(),
+            "preflight":  check,
             "data": {
-                "code_valid":            code_valid,
-                "missing":               missing,
+                "code_valid":            check.ok,
+                "missing":               check.missing,
                 "completed_verdict":     False,
                 
                 # Position tracking
@@ -100,10 +145,9 @@ def concept_of_error(robot, image, td, user_code=None):
                 "max_distance_moved":    0.0,
                 
                 # MQTT message tracking
-                "error_messages":        [],
-                "error_values":          [],
-                "left_sweep_values":     [],
-                "right_sweep_values":    [],
+                "error_values":          Series(),
+                "left_sweep_values":     Series(capacity=32),
+                "right_sweep_values":    Series(capacity=32),
                 "left_sweep_detected":   False,
                 "right_sweep_detected":  False,
                 "last_message":          None,
@@ -128,23 +172,21 @@ def concept_of_error(robot, image, td, user_code=None):
                 td["data"]["max_distance_moved"] = dist
 
     # ── MQTT message parsing ──────────────────────────────────────────────────
-    msg = robot.get_msg()
-    if msg is not None:
+    for stamp, msg in td["inbox"].poll_timed(robot):
         td["data"]["last_message"] = msg
         
         # Look for "Error: <value>" pattern
-        match = re.search(r'Error:\s*([-+]?[0-9]*\.?[0-9]+)', msg)
-        if match:
-            error_value = float(match.group(1))
-            td["data"]["error_messages"].append(msg)
-            td["data"]["error_values"].append(error_value)
+        error = CONCEPT_OF_ERROR_MESSAGES.parse(msg, stamp)
+        if error is not None:
+            error_value = error["value"]
+            td["data"]["error_values"].append(error_value, stamp)
             
             # Separate errors by sweep phase (no value checking, just collect)
             if td["data"]["sweep_phase"] == "first":
-                td["data"]["left_sweep_values"].append(error_value)
+                td["data"]["left_sweep_values"].append(error_value, stamp)
                     
             elif td["data"]["sweep_phase"] == "second":
-                td["data"]["right_sweep_values"].append(error_value)
+                td["data"]["right_sweep_values"].append(error_value, stamp)
         
         # Detect phase transitions and sweep completion from MQTT messages
         if "Starting sweep" in msg:
@@ -162,7 +204,7 @@ def concept_of_error(robot, image, td, user_code=None):
         if td["data"]["last_message"] is not None:
             text = f"Last message: {td['data']['last_message']}"
         
-        error_count = len(td["data"]["error_messages"])
+        error_count = td["data"]["error_values"].count
         distance = td["data"]["max_distance_moved"]
         if error_count > 0 or distance > 0:
             text = f"Last message: {td['data']['last_message']} | Position errors: {error_count}, Distance: {distance:.1f}cm"
@@ -172,21 +214,17 @@ def concept_of_error(robot, image, td, user_code=None):
         td["data"]["completed_verdict"] = True
         
         if not td["data"]["code_valid"]:
-            result["success"]     = False
-            result["score"]       = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         
         else:
             # Evaluate mission performance
-            error_count = len(td["data"]["error_messages"])
+            error_count = td["data"]["error_values"].count
             distance_moved = td["data"]["max_distance_moved"]
-            left_values = td["data"]["left_sweep_values"]
-            right_values = td["data"]["right_sweep_values"]
             
             # Format sweep gradients for display
-            left_gradient = ", ".join([f"{v:.2f}" for v in left_values]) if left_values else "none"
-            right_gradient = ", ".join([f"{v:.2f}" for v in right_values]) if right_values else "none"
+            left_gradient = td["data"]["left_sweep_values"].format("{:.2f}", empty="none")
+            right_gradient = td["data"]["right_sweep_values"].format("{:.2f}", empty="none")
             
             # Success criteria
             has_enough_messages = error_count >= MIN_ERROR_MESSAGES
@@ -234,6 +272,32 @@ def concept_of_error(robot, image, td, user_code=None):
 # ============================================================================
 # Task 5.2: Upgraded Relay Controller
 # ============================================================================
+
+def _upgraded_relay_controller_code(user_code):
+    code         = analyze_code(user_code)
+    active_code  = code.active
+
+    has_while_true      = 'while True' in active_code
+    has_analog_read     = 'analog_read_all()' in active_code
+    has_track_line      = 'track_line()' in active_code
+    has_max_check       = 'max(' in active_code and '< 500' in active_code
+    has_robot_stop      = 'robot.stop()' in active_code
+    has_break           = 'break' in active_code
+    has_left_threshold  = '< -0.3' in active_code or '<-0.3' in active_code
+    has_right_threshold = '> 0.3' in active_code or '>0.3' in active_code
+
+    missing = []
+    if not has_while_true:      missing.append('while True loop')
+    if not has_analog_read:     missing.append('analog_read_all()')
+    if not has_track_line:      missing.append('track_line()')
+    if not has_max_check:       missing.append('max(sensor_array) < 500 failsafe')
+    if not has_robot_stop:      missing.append('robot.stop()')
+    if not has_break:           missing.append('break statement')
+    if not has_left_threshold:  missing.append('left threshold (< -0.3)')
+    if not has_right_threshold: missing.append('right threshold (> 0.3)')
+    return _missing_code(missing)
+
+
 def upgraded_relay_controller(robot, image, td, user_code=None):
     """
     Verification for lesson: Upgraded Relay Controller — 5.2
@@ -265,42 +329,18 @@ def upgraded_relay_controller(robot, image, td, user_code=None):
     # ── first-frame initialisation ────────────────────────────────────────────
     if td is None:
         # ── code validation ───────────────────────────────────────────────────
-        lines        = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code  = '\n'.join(active_lines)
-
-        has_while_true      = 'while True' in active_code
-        has_analog_read     = 'analog_read_all()' in active_code
-        has_track_line      = 'track_line()' in active_code
-        has_max_check       = 'max(' in active_code and '< 500' in active_code
-        has_robot_stop      = 'robot.stop()' in active_code
-        has_break           = 'break' in active_code
-        has_left_threshold  = '< -0.3' in active_code or '<-0.3' in active_code
-        has_right_threshold = '> 0.3' in active_code or '>0.3' in active_code
-        
-        code_valid = (
-            has_while_true and has_analog_read and has_track_line
-            and has_max_check and has_robot_stop and has_break
-            and has_left_threshold and has_right_threshold
-        )
-
-        missing = []
-        if not has_while_true:      missing.append('while True loop')
-        if not has_analog_read:     missing.append('analog_read_all()')
-        if not has_track_line:      missing.append('track_line()')
-        if not has_max_check:       missing.append('max(sensor_array) < 500 failsafe')
-        if not has_robot_stop:      missing.append('robot.stop()')
-        if not has_break:           missing.append('break statement')
-        if not has_left_threshold:  missing.append('left threshold (< -0.3)')
-        if not has_right_threshold: missing.append('right threshold (> 0.3)')
+        check = _upgraded_relay_controller_code(user_code)
 
         # ── td state init ─────────────────────────────────────────────────────
         td = {
             "start_time": time.time(),
             "end_time":   time.time() + 90,
+            "inbox":      MessageInbox(),
+            "targets":    TargetIndex(CHECKPOINTS, CHECKPOINT_RADIUS, ordered=True),
+            "preflight":  check,
             "data": {
-                "code_valid":            code_valid,
-                "missing":               missing,
+                "code_valid":            check.ok,
+                "missing":               check.missing,
                 "completed_verdict":     False,
                 
                 # Position tracking
@@ -326,23 +366,12 @@ def upgraded_relay_controller(robot, image, td, user_code=None):
 
         # ── flag image loading (dual-path fallback) ───────────────────────────
         try:
-            basepath = os.path.abspath(os.path.dirname(__file__))
-            filepath = os.path.join(basepath, "auto_tests", "images", "flag_finish.jpg")
-            if not os.path.exists(filepath):
-                filepath = os.path.join(basepath, "images", "flag_finish.jpg")
-            flag = cv2.imread(filepath)
+            flag = keyed_sprite("flag_finish.jpg", scale=1/3)
             if flag is None:
-                raise FileNotFoundError(f"flag_finish.jpg not found at {filepath}")
-            flag = cv2.resize(flag, (int(flag.shape[1] / 3), int(flag.shape[0] / 3)))
-            mask = cv2.bitwise_not(cv2.inRange(flag,
-                                               np.array([0, 240, 0]),
-                                               np.array([50, 255, 50])))
-            td["data"]["flag"]      = flag
-            td["data"]["flag_mask"] = mask
-            flag_green = flag.copy()
-            flag_green[mask > 0] = (0, 200, 0)
-            td["data"]["flag_green"]      = flag_green
-            td["data"]["flag_green_mask"] = mask
+                raise FileNotFoundError("flag_finish.jpg not found")
+            td["data"]["flag"], td["data"]["flag_mask"] = flag
+            td["data"]["flag_green"], td["data"]["flag_green_mask"] = tinted_sprite(
+                "flag_finish.jpg", (0, 200, 0), scale=1/3)
         except Exception as e:
             print(f"Flag load error: {e} — falling back to circle markers")
             td["data"]["image_error"] = True
@@ -364,16 +393,12 @@ def upgraded_relay_controller(robot, image, td, user_code=None):
                 td["data"]["max_distance_moved"] = dist
 
     # ── checkpoint detection (visual feedback only) ───────────────────────────
-    if pos is not None and td["data"]["checkpoints_remaining"]:
-        next_cp = td["data"]["checkpoints_remaining"][0]
-        dist = math.sqrt((pos[0] - next_cp[0])**2 + (pos[1] - next_cp[1])**2)
-        if dist < CHECKPOINT_RADIUS:
-            td["data"]["checkpoints_hit"].append(next_cp)
-            td["data"]["checkpoints_remaining"].pop(0)
+    for i in td["targets"].update(pos):
+        td["data"]["checkpoints_hit"].append(CHECKPOINTS[i])
+        td["data"]["checkpoints_remaining"].pop(0)
 
     # ── MQTT message parsing ──────────────────────────────────────────────────
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         td["data"]["last_message"] = msg
         
         # Detect failsafe trigger
@@ -410,14 +435,7 @@ def upgraded_relay_controller(robot, image, td, user_code=None):
             
             if use_flag:
                 draw_flag = flag_green if hit else flag
-                half_w = draw_flag.shape[1] // 2
-                half_h = draw_flag.shape[0] // 2
-                r0 = cp_px[1] - half_h
-                r1 = cp_px[1] + (draw_flag.shape[0] - half_h)
-                c0 = cp_px[0] - half_w
-                c1 = cp_px[0] + (draw_flag.shape[1] - half_w)
-                if 0 <= r0 and r1 < image.shape[0] and 0 <= c0 and c1 < image.shape[1]:
-                    cv2.copyTo(draw_flag, flag_mask, image[r0:r1, c0:c1])
+                blit(image, draw_flag, flag_mask, cp_px)
             else:
                 cv2.circle(image, cp_px, 5, (0, 200, 0) if hit else (0, 200, 255), -1)
 
@@ -426,9 +444,7 @@ def upgraded_relay_controller(robot, image, td, user_code=None):
         td["data"]["completed_verdict"] = True
         
         if not td["data"]["code_valid"]:
-            result["success"]     = False
-            result["score"]       = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         
         else:
@@ -465,6 +481,42 @@ def upgraded_relay_controller(robot, image, td, user_code=None):
 # ============================================================================
 # Task 5.3: Proportional Control
 # ============================================================================
+
+def _proportional_control_code(user_code):
+    code         = analyze_code(user_code)
+    active_code  = code.active
+
+    has_while_true      = 'while True' in active_code
+    has_analog_read     = 'analog_read_all()' in active_code
+    has_track_line      = 'track_line()' in active_code
+    has_max_check       = 'max(' in active_code and '< 500' in active_code
+    has_robot_stop      = 'robot.stop()' in active_code
+    has_break           = 'break' in active_code
+
+    # P-controller checks
+    has_base_speed = 'base_speed' in active_code
+    has_kp         = 'kp' in active_code or 'Kp' in active_code or 'KP' in active_code
+    has_p_calc     = '* position' in active_code  # P = kp * position
+    has_left_speed = 'left_speed' in active_code
+    has_right_speed = 'right_speed' in active_code
+    has_add_subtract = ('+' in active_code and '-' in active_code)
+
+    missing = []
+    if not has_while_true:      missing.append('while True loop')
+    if not has_analog_read:     missing.append('analog_read_all()')
+    if not has_track_line:      missing.append('track_line()')
+    if not has_max_check:       missing.append('max(sensor_array) < 500 failsafe')
+    if not has_robot_stop:      missing.append('robot.stop()')
+    if not has_break:           missing.append('break statement')
+    if not has_base_speed:      missing.append('base_speed variable')
+    if not has_kp:              missing.append('kp variable')
+    if not has_p_calc:          missing.append('P = kp * position')
+    if not has_left_speed:      missing.append('left_speed calculation')
+    if not has_right_speed:     missing.append('right_speed calculation')
+    if not has_add_subtract:    missing.append('+ and - operations for steering')
+    return _missing_code(missing)
+
+
 def proportional_control(robot, image, td, user_code=None):
     """
     Verification for lesson: Proportional Control — 5.3
@@ -496,53 +548,18 @@ def proportional_control(robot, image, td, user_code=None):
     # ── first-frame initialisation ────────────────────────────────────────────
     if td is None:
         # ── code validation ───────────────────────────────────────────────────
-        lines        = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code  = '\n'.join(active_lines)
-
-        has_while_true      = 'while True' in active_code
-        has_analog_read     = 'analog_read_all()' in active_code
-        has_track_line      = 'track_line()' in active_code
-        has_max_check       = 'max(' in active_code and '< 500' in active_code
-        has_robot_stop      = 'robot.stop()' in active_code
-        has_break           = 'break' in active_code
-        
-        # P-controller checks
-        has_base_speed = 'base_speed' in active_code
-        has_kp         = 'kp' in active_code or 'Kp' in active_code or 'KP' in active_code
-        has_p_calc     = '* position' in active_code  # P = kp * position
-        has_left_speed = 'left_speed' in active_code
-        has_right_speed = 'right_speed' in active_code
-        has_add_subtract = ('+' in active_code and '-' in active_code)
-        
-        code_valid = (
-            has_while_true and has_analog_read and has_track_line
-            and has_max_check and has_robot_stop and has_break
-            and has_base_speed and has_kp and has_p_calc
-            and has_left_speed and has_right_speed and has_add_subtract
-        )
-
-        missing = []
-        if not has_while_true:      missing.append('while True loop')
-        if not has_analog_read:     missing.append('analog_read_all()')
-        if not has_track_line:      missing.append('track_line()')
-        if not has_max_check:       missing.append('max(sensor_array) < 500 failsafe')
-        if not has_robot_stop:      missing.append('robot.stop()')
-        if not has_break:           missing.append('break statement')
-        if not has_base_speed:      missing.append('base_speed variable')
-        if not has_kp:              missing.append('kp variable')
-        if not has_p_calc:          missing.append('P = kp * position')
-        if not has_left_speed:      missing.append('left_speed calculation')
-        if not has_right_speed:     missing.append('right_speed calculation')
-        if not has_add_subtract:    missing.append('+ and - operations for steering')
+        check = _proportional_control_code(user_code)
 
         # ── td state init ─────────────────────────────────────────────────────
         td = {
             "start_time": time.time(),
             "end_time":   time.time() + 60,
+            "inbox":      MessageInbox(),
+            "targets":    TargetIndex(CHECKPOINTS, CHECKPOINT_RADIUS, ordered=True),
+            "preflight":  check,
             "data": {
-                "code_valid":               code_valid,
-                "missing":                  missing,
+                "code_valid":               check.ok,
+                "missing":                  check.missing,
                 "completed_verdict":        False,
                 
                 # Position tracking
@@ -567,23 +584,12 @@ def proportional_control(robot, image, td, user_code=None):
 
         # ── flag image loading (dual-path fallback) ───────────────────────────
         try:
-            basepath = os.path.abspath(os.path.dirname(__file__))
-            filepath = os.path.join(basepath, "auto_tests", "images", "flag_finish.jpg")
-            if not os.path.exists(filepath):
-                filepath = os.path.join(basepath, "images", "flag_finish.jpg")
-            flag = cv2.imread(filepath)
+            flag = keyed_sprite("flag_finish.jpg", scale=1/3)
             if flag is None:
-                raise FileNotFoundError(f"flag_finish.jpg not found at {filepath}")
-            flag = cv2.resize(flag, (int(flag.shape[1] / 3), int(flag.shape[0] / 3)))
-            mask = cv2.bitwise_not(cv2.inRange(flag,
-                                               np.array([0, 240, 0]),
-                                               np.array([50, 255, 50])))
-            td["data"]["flag"]      = flag
-            td["data"]["flag_mask"] = mask
-            flag_green = flag.copy()
-            flag_green[mask > 0] = (0, 200, 0)
-            td["data"]["flag_green"]      = flag_green
-            td["data"]["flag_green_mask"] = mask
+                raise FileNotFoundError("flag_finish.jpg not found")
+            td["data"]["flag"], td["data"]["flag_mask"] = flag
+            td["data"]["flag_green"], td["data"]["flag_green_mask"] = tinted_sprite(
+                "flag_finish.jpg", (0, 200, 0), scale=1/3)
         except Exception as e:
             print(f"Flag load error: {e} — falling back to circle markers")
             td["data"]["image_error"] = True
@@ -605,16 +611,12 @@ def proportional_control(robot, image, td, user_code=None):
                 td["data"]["max_distance_moved"] = dist
 
     # ── checkpoint detection (visual feedback only) ───────────────────────────
-    if pos is not None and td["data"]["checkpoints_remaining"]:
-        next_cp = td["data"]["checkpoints_remaining"][0]
-        dist = math.sqrt((pos[0] - next_cp[0])**2 + (pos[1] - next_cp[1])**2)
-        if dist < CHECKPOINT_RADIUS:
-            td["data"]["checkpoints_hit"].append(next_cp)
-            td["data"]["checkpoints_remaining"].pop(0)
+    for i in td["targets"].update(pos):
+        td["data"]["checkpoints_hit"].append(CHECKPOINTS[i])
+        td["data"]["checkpoints_remaining"].pop(0)
 
     # ── MQTT message parsing ──────────────────────────────────────────────────
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         td["data"]["last_message"] = msg
 
     # ── live status text ──────────────────────────────────────────────────────
@@ -647,14 +649,7 @@ def proportional_control(robot, image, td, user_code=None):
             
             if use_flag:
                 draw_flag = flag_green if hit else flag
-                half_w = draw_flag.shape[1] // 2
-                half_h = draw_flag.shape[0] // 2
-                r0 = cp_px[1] - half_h
-                r1 = cp_px[1] + (draw_flag.shape[0] - half_h)
-                c0 = cp_px[0] - half_w
-                c1 = cp_px[0] + (draw_flag.shape[1] - half_w)
-                if 0 <= r0 and r1 < image.shape[0] and 0 <= c0 and c1 < image.shape[1]:
-                    cv2.copyTo(draw_flag, flag_mask, image[r0:r1, c0:c1])
+                blit(image, draw_flag, flag_mask, cp_px)
             else:
                 cv2.circle(image, cp_px, 5, (0, 200, 0) if hit else (0, 200, 255), -1)
 
@@ -663,9 +658,7 @@ def proportional_control(robot, image, td, user_code=None):
         td["data"]["completed_verdict"] = True
         
         if not td["data"]["code_valid"]:
-            result["success"]     = False
-            result["score"]       = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         
         else:
@@ -695,6 +688,33 @@ def proportional_control(robot, image, td, user_code=None):
 # ============================================================================
 # Task 5.4: Tuning and Kick
 # ============================================================================
+TUNING_AND_KICK_REQUIREMENTS = RequirementTable([
+    Require('while True',          'while True loop'),
+    Require('analog_read_all()',   'analog_read_all()'),
+    Require('track_line()',        'track_line()'),
+    Require('robot.stop()',        'robot.stop()'),
+    Require('break',               'break statement'),
+    # P-controller checks (from 5.3)
+    Require('base_speed',          'base_speed variable'),
+    AnyOf(('kp', 'Kp', 'KP'),      'kp variable'),
+    Require('* position',          'P = kp * position'),
+    Require('left_speed',          'left_speed calculation'),
+    Require('right_speed',         'right_speed calculation'),
+    AllOf(('+', '-'),              '+ and - operations for steering'),
+    # NEW: Kick timer checks
+    Require('last_kick_time',      'last_kick_time variable'),
+    AnyOf(('elapsed_time', 'elapsed'), 'elapsed_time calculation'),
+    AnyOf(('> 5', '>5'),           'time check (> 5 seconds)'),
+    Require('KICK',                'KICK print statement'),
+    AnyOf(('last_kick_time = time.time()', 'last_kick_time=time.time()'),
+          'timer reset (last_kick_time = time.time())'),
+])
+
+
+def _tuning_and_kick_code(user_code):
+    return _missing_code(TUNING_AND_KICK_REQUIREMENTS.check(analyze_code(user_code).active).missing)
+
+
 def tuning_and_kick(robot, image, td, user_code=None):
     """
     Verification for lesson: Tuning and Kick — 5.4
@@ -767,71 +787,22 @@ def tuning_and_kick(robot, image, td, user_code=None):
         result["description"] = f"Task incomplete. Kicks: {kick_count}, Distance: {distance_moved:.1f}cm | Score: 0"
         return "Task incomplete. Check code execution."
 
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
 
     # ── first-frame initialisation ────────────────────────────────────────────
     if td is None:
         # ── code validation ───────────────────────────────────────────────────
-        lines        = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code  = '\n'.join(active_lines)
-
-        has_while_true      = 'while True' in active_code
-        has_analog_read     = 'analog_read_all()' in active_code
-        has_track_line      = 'track_line()' in active_code
-        has_max_check       = 'max(' in active_code and '< 500' in active_code
-        has_robot_stop      = 'robot.stop()' in active_code
-        has_break           = 'break' in active_code
-        
-        # P-controller checks (from 5.3)
-        has_base_speed = 'base_speed' in active_code
-        has_kp         = 'kp' in active_code or 'Kp' in active_code or 'KP' in active_code
-        has_p_calc     = '* position' in active_code  # P = kp * position
-        has_left_speed = 'left_speed' in active_code
-        has_right_speed = 'right_speed' in active_code
-        has_add_subtract = ('+' in active_code and '-' in active_code)
-        
-        # NEW: Kick timer checks
-        has_last_kick_time = 'last_kick_time' in active_code
-        has_elapsed_time   = 'elapsed_time' in active_code or 'elapsed' in active_code
-        has_time_check     = '> 5' in active_code or '>5' in active_code  # Check if elapsed > 5
-        has_kick_print     = 'KICK' in active_code
-        has_time_reset     = 'last_kick_time = time.time()' in active_code or 'last_kick_time=time.time()' in active_code
-        
-        code_valid = (
-            has_while_true and has_analog_read and has_track_line
-            and has_robot_stop and has_break
-            and has_base_speed and has_kp and has_p_calc
-            and has_left_speed and has_right_speed and has_add_subtract
-            and has_last_kick_time and has_elapsed_time and has_time_check
-            and has_kick_print and has_time_reset
-        )
-
-        missing = []
-        if not has_while_true:      missing.append('while True loop')
-        if not has_analog_read:     missing.append('analog_read_all()')
-        if not has_track_line:      missing.append('track_line()')
-        if not has_robot_stop:      missing.append('robot.stop()')
-        if not has_break:           missing.append('break statement')
-        if not has_base_speed:      missing.append('base_speed variable')
-        if not has_kp:              missing.append('kp variable')
-        if not has_p_calc:          missing.append('P = kp * position')
-        if not has_left_speed:      missing.append('left_speed calculation')
-        if not has_right_speed:     missing.append('right_speed calculation')
-        if not has_add_subtract:    missing.append('+ and - operations for steering')
-        if not has_last_kick_time:  missing.append('last_kick_time variable')
-        if not has_elapsed_time:    missing.append('elapsed_time calculation')
-        if not has_time_check:      missing.append('time check (> 5 seconds)')
-        if not has_kick_print:      missing.append('KICK print statement')
-        if not has_time_reset:      missing.append('timer reset (last_kick_time = time.time())')
+        check = _tuning_and_kick_code(user_code)
 
         # ── td state init ─────────────────────────────────────────────────────
         td = {
             "start_time": time.time(),
             "end_time":   time.time() + 30,
+            "inbox":      MessageInbox(),
+            "preflight":  check,
             "data": {
-                "code_valid":               code_valid,
-                "missing":                  missing,
+                "code_valid":               check.ok,
+                "missing":                  check.missing,
                 "completed_verdict":        False,
                 
                 # Position tracking
@@ -841,7 +812,6 @@ def tuning_and_kick(robot, image, td, user_code=None):
                 # MQTT message tracking
                 "last_message":             None,
                 "kick_count":               0,
-                "kick_messages":            [],
                 "early_finish_reason":      None,
             }
         }
@@ -863,14 +833,12 @@ def tuning_and_kick(robot, image, td, user_code=None):
                 td["data"]["max_distance_moved"] = dist
 
     # ── MQTT message parsing ──────────────────────────────────────────────────
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         td["data"]["last_message"] = msg
         
         # Detect KICK messages
         if "KICK" in msg:
             td["data"]["kick_count"] += 1
-            td["data"]["kick_messages"].append(msg)
         if "Problem" in msg:
             td["data"]["early_finish_reason"] = "Problem"
 
@@ -892,9 +860,7 @@ def tuning_and_kick(robot, image, td, user_code=None):
         td["data"]["completed_verdict"] = True
         
         if not td["data"]["code_valid"]:
-            result["success"]     = False
-            result["score"]       = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         
         else:
@@ -906,6 +872,56 @@ def tuning_and_kick(robot, image, td, user_code=None):
 # ============================================================================
 # Task 5.5: Adaptive Speed
 # ============================================================================
+
+def _adaptive_speed_code(user_code):
+    code         = analyze_code(user_code)
+    active_code  = code.active
+
+    has_while_true      = 'while True' in active_code
+    has_analog_read     = 'analog_read_all()' in active_code
+    has_track_line      = 'track_line()' in active_code
+    has_max_check       = 'max(' in active_code and '< 500' in active_code
+    has_robot_stop      = 'robot.stop()' in active_code
+    has_break           = 'break' in active_code
+
+    # P-controller checks
+    has_kp         = 'kp' in active_code or 'Kp' in active_code or 'KP' in active_code
+    has_p_calc     = '* position' in active_code  # P = kp * position
+    has_left_speed = 'left_speed' in active_code
+    has_right_speed = 'right_speed' in active_code
+    has_add_subtract = ('+' in active_code and '-' in active_code)
+
+    # NEW: Adaptive speed checks
+    has_max_speed      = 'max_speed' in active_code
+    has_braking_force  = 'braking_force' in active_code
+    has_dynamic_speed  = 'dynamic_speed' in active_code
+    has_abs_function   = 'abs(position)' in active_code or 'abs( position)' in active_code
+    has_int_wrapper    = 'int(' in active_code  # Check for int() usage
+
+    # Should NOT have base_speed (replaced by adaptive speed)
+    has_base_speed = 'base_speed' in active_code
+
+    missing = []
+    if not has_while_true:      missing.append('while True loop')
+    if not has_analog_read:     missing.append('analog_read_all()')
+    if not has_track_line:      missing.append('track_line()')
+    if not has_max_check:       missing.append('max(sensor_array) < 500 failsafe')
+    if not has_robot_stop:      missing.append('robot.stop()')
+    if not has_break:           missing.append('break statement')
+    if not has_kp:              missing.append('kp variable')
+    if not has_p_calc:          missing.append('P = kp * position')
+    if not has_left_speed:      missing.append('left_speed calculation')
+    if not has_right_speed:     missing.append('right_speed calculation')
+    if not has_add_subtract:    missing.append('+ and - operations for steering')
+    if not has_max_speed:       missing.append('max_speed variable')
+    if not has_braking_force:   missing.append('braking_force variable')
+    if not has_dynamic_speed:   missing.append('dynamic_speed calculation')
+    if not has_abs_function:    missing.append('abs(position) function')
+    if not has_int_wrapper:     missing.append('int() wrapper for speeds')
+    if has_base_speed:          missing.append('remove base_speed (use dynamic_speed)')
+    return _missing_code(missing)
+
+
 def adaptive_speed(robot, image, td, user_code=None):
     """
     Verification for lesson: Adaptive Speed — 5.5
@@ -937,70 +953,18 @@ def adaptive_speed(robot, image, td, user_code=None):
     # ── first-frame initialisation ────────────────────────────────────────────
     if td is None:
         # ── code validation ───────────────────────────────────────────────────
-        lines        = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code  = '\n'.join(active_lines)
-
-        has_while_true      = 'while True' in active_code
-        has_analog_read     = 'analog_read_all()' in active_code
-        has_track_line      = 'track_line()' in active_code
-        has_max_check       = 'max(' in active_code and '< 500' in active_code
-        has_robot_stop      = 'robot.stop()' in active_code
-        has_break           = 'break' in active_code
-        
-        # P-controller checks
-        has_kp         = 'kp' in active_code or 'Kp' in active_code or 'KP' in active_code
-        has_p_calc     = '* position' in active_code  # P = kp * position
-        has_left_speed = 'left_speed' in active_code
-        has_right_speed = 'right_speed' in active_code
-        has_add_subtract = ('+' in active_code and '-' in active_code)
-        
-        # NEW: Adaptive speed checks
-        has_max_speed      = 'max_speed' in active_code
-        has_braking_force  = 'braking_force' in active_code
-        has_dynamic_speed  = 'dynamic_speed' in active_code
-        has_abs_function   = 'abs(position)' in active_code or 'abs( position)' in active_code
-        has_int_wrapper    = 'int(' in active_code  # Check for int() usage
-        
-        # Should NOT have base_speed (replaced by adaptive speed)
-        has_base_speed = 'base_speed' in active_code
-        
-        code_valid = (
-            has_while_true and has_analog_read and has_track_line
-            and has_max_check and has_robot_stop and has_break
-            and has_kp and has_p_calc
-            and has_left_speed and has_right_speed and has_add_subtract
-            and has_max_speed and has_braking_force and has_dynamic_speed
-            and has_abs_function and has_int_wrapper
-            and not has_base_speed  # Should NOT have base_speed
-        )
-
-        missing = []
-        if not has_while_true:      missing.append('while True loop')
-        if not has_analog_read:     missing.append('analog_read_all()')
-        if not has_track_line:      missing.append('track_line()')
-        if not has_max_check:       missing.append('max(sensor_array) < 500 failsafe')
-        if not has_robot_stop:      missing.append('robot.stop()')
-        if not has_break:           missing.append('break statement')
-        if not has_kp:              missing.append('kp variable')
-        if not has_p_calc:          missing.append('P = kp * position')
-        if not has_left_speed:      missing.append('left_speed calculation')
-        if not has_right_speed:     missing.append('right_speed calculation')
-        if not has_add_subtract:    missing.append('+ and - operations for steering')
-        if not has_max_speed:       missing.append('max_speed variable')
-        if not has_braking_force:   missing.append('braking_force variable')
-        if not has_dynamic_speed:   missing.append('dynamic_speed calculation')
-        if not has_abs_function:    missing.append('abs(position) function')
-        if not has_int_wrapper:     missing.append('int() wrapper for speeds')
-        if has_base_speed:          missing.append('remove base_speed (use dynamic_speed)')
+        check = _adaptive_speed_code(user_code)
 
         # ── td state init ─────────────────────────────────────────────────────
         td = {
             "start_time": time.time(),
             "end_time":   time.time() + 60,
+            "inbox":      MessageInbox(),
+            "targets":    TargetIndex(CHECKPOINTS, CHECKPOINT_RADIUS, ordered=True),
+            "preflight":  check,
             "data": {
-                "code_valid":               code_valid,
-                "missing":                  missing,
+                "code_valid":               check.ok,
+                "missing":                  check.missing,
                 "completed_verdict":        False,
                 
                 # Position tracking
@@ -1025,23 +989,12 @@ def adaptive_speed(robot, image, td, user_code=None):
 
         # ── flag image loading (dual-path fallback) ───────────────────────────
         try:
-            basepath = os.path.abspath(os.path.dirname(__file__))
-            filepath = os.path.join(basepath, "auto_tests", "images", "flag_finish.jpg")
-            if not os.path.exists(filepath):
-                filepath = os.path.join(basepath, "images", "flag_finish.jpg")
-            flag = cv2.imread(filepath)
+            flag = keyed_sprite("flag_finish.jpg", scale=1/3)
             if flag is None:
-                raise FileNotFoundError(f"flag_finish.jpg not found at {filepath}")
-            flag = cv2.resize(flag, (int(flag.shape[1] / 3), int(flag.shape[0] / 3)))
-            mask = cv2.bitwise_not(cv2.inRange(flag,
-                                               np.array([0, 240, 0]),
-                                               np.array([50, 255, 50])))
-            td["data"]["flag"]      = flag
-            td["data"]["flag_mask"] = mask
-            flag_green = flag.copy()
-            flag_green[mask > 0] = (0, 200, 0)
-            td["data"]["flag_green"]      = flag_green
-            td["data"]["flag_green_mask"] = mask
+                raise FileNotFoundError("flag_finish.jpg not found")
+            td["data"]["flag"], td["data"]["flag_mask"] = flag
+            td["data"]["flag_green"], td["data"]["flag_green_mask"] = tinted_sprite(
+                "flag_finish.jpg", (0, 200, 0), scale=1/3)
         except Exception as e:
             print(f"Flag load error: {e} — falling back to circle markers")
             td["data"]["image_error"] = True
@@ -1063,16 +1016,12 @@ def adaptive_speed(robot, image, td, user_code=None):
                 td["data"]["max_distance_moved"] = dist
 
     # ── checkpoint detection (visual feedback only) ───────────────────────────
-    if pos is not None and td["data"]["checkpoints_remaining"]:
-        next_cp = td["data"]["checkpoints_remaining"][0]
-        dist = math.sqrt((pos[0] - next_cp[0])**2 + (pos[1] - next_cp[1])**2)
-        if dist < CHECKPOINT_RADIUS:
-            td["data"]["checkpoints_hit"].append(next_cp)
-            td["data"]["checkpoints_remaining"].pop(0)
+    for i in td["targets"].update(pos):
+        td["data"]["checkpoints_hit"].append(CHECKPOINTS[i])
+        td["data"]["checkpoints_remaining"].pop(0)
 
     # ── MQTT message parsing ──────────────────────────────────────────────────
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         td["data"]["last_message"] = msg
 
     # ── live status text ──────────────────────────────────────────────────────
@@ -1105,14 +1054,7 @@ def adaptive_speed(robot, image, td, user_code=None):
             
             if use_flag:
                 draw_flag = flag_green if hit else flag
-                half_w = draw_flag.shape[1] // 2
-                half_h = draw_flag.shape[0] // 2
-                r0 = cp_px[1] - half_h
-                r1 = cp_px[1] + (draw_flag.shape[0] - half_h)
-                c0 = cp_px[0] - half_w
-                c1 = cp_px[0] + (draw_flag.shape[1] - half_w)
-                if 0 <= r0 and r1 < image.shape[0] and 0 <= c0 and c1 < image.shape[1]:
-                    cv2.copyTo(draw_flag, flag_mask, image[r0:r1, c0:c1])
+                blit(image, draw_flag, flag_mask, cp_px)
             else:
                 cv2.circle(image, cp_px, 5, (0, 200, 0) if hit else (0, 200, 255), -1)
 
@@ -1121,9 +1063,7 @@ def adaptive_speed(robot, image, td, user_code=None):
         td["data"]["completed_verdict"] = True
         
         if not td["data"]["code_valid"]:
-            result["success"]     = False
-            result["score"]       = 0
-            result["description"] = f"Code missing: {', '.join(td['data']['missing'])} | Score: 0"
+            result.update(td["preflight"].result)
             text = "Code validation failed."
         
         else:
@@ -1148,3 +1088,12 @@ def adaptive_speed(robot, image, td, user_code=None):
                 text = "Task incomplete. Check code execution."
 
     return image, td, text, result
+
+
+preflight_checks = {
+    "concept_of_error": _concept_of_error_code,
+    "upgraded_relay_controller": _upgraded_relay_controller_code,
+    "proportional_control": _proportional_control_code,
+    "tuning_and_kick": _tuning_and_kick_code,
+    "adaptive_speed": _adaptive_speed_code,
+}
@@ -2,9 +2,22 @@ import cv2
 import math
 import time
 import os
-import numpy as np
+import sys
 import ast
 
+_VERIFICATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _VERIFICATIONS_DIR not in sys.path:
+    sys.path.insert(0, _VERIFICATIONS_DIR)
+
+from checkerlib.assets import keyed_sprite, tinted_sprite
+from checkerlib.frames import FULL, POSE, draw_info
+from checkerlib.messages import MessageInbox
+from checkerlib.preflight import Preflight, from_missing, run_preflight
+from checkerlib.source import analyze_code
+from checkerlib.sprites import blit
+from checkerlib.targets import TargetIndex
+from checkerlib.verdict import settle_when
+
 target_points = {
     'art_of_debugging': [(50, 94), (30, 0)],           # Start: x=50, y=94, direction=30°
     'hardware_safety_net': [(60, 40), (0, 0)],         # Start: x=60, y=40, direction=0° (spins in place)
@@ -17,6 +30,12 @@ block_library_functions = {
     'code_clinic': False,
 }
 
+frame_needs = {
+    'art_of_debugging': FULL,
+    'hardware_safety_net': POSE,
+    'code_clinic': FULL,
+}
+
 
 def get_block_library_functions(task):
     """Retrieve block library status for a given task."""
@@ -28,9 +47,86 @@ def get_target_points(task):
     return target_points.get(task, [])
 
 
+def get_frame_needs(task):
+    """Retrieve what the checker of a task needs from the camera frame."""
+    return frame_needs.get(task, FULL)
+
+
+def preflight(task, user_code):
+    """Static code checks of ``task`` without a robot (see ``checkerlib.preflight``)."""
+    return run_preflight(preflight_checks, task, user_code)
+
+
 # ============================================================================
 # Task 6.1: The Art of Debugging
 # ============================================================================
+def _art_of_debugging_code(user_code):
+    code = analyze_code(user_code)
+    active_code = code.active
+
+    # Bug detection (progressive hints)
+    bugs_remaining = []
+    bug_categories = []
+
+    # Bug 1: Missing colon after while True
+    has_while_colon = 'while True:' in active_code
+    if not has_while_colon:
+        bugs_remaining.append('syntax_colon')
+        bug_categories.append('SYNTAX')
+
+    # Bug 2: NameError - print(sensor) should be print(sensor_array)
+    # Only flag as bug if the WRONG pattern exists
+    has_wrong_print = 'print(sensor)' in active_code
+    if has_wrong_print:
+        bugs_remaining.append('runtime_name')
+        bug_categories.append('RUNTIME')
+
+    # Bug 3: Failsafe max(sensor_array) < (not >)
+    has_correct_failsafe = 'max(sensor_array) <' in active_code
+    has_wrong_failsafe = 'max(sensor_array) >' in active_code
+    if has_wrong_failsafe or not has_correct_failsafe:
+        bugs_remaining.append('logic_threshold')
+        bug_categories.append('LOGIC')
+
+    # Bug 4: P calculation - kp * position (not +)
+    has_correct_p = 'kp * position' in active_code or 'position * kp' in active_code
+    has_wrong_p = 'kp + position' in active_code
+    if has_wrong_p or not has_correct_p:
+        bugs_remaining.append('logic_calculation')
+        bug_categories.append('LOGIC')
+
+    # Bug 5: Left motor differential - base_speed - P
+    has_correct_left = 'base_speed - P' in active_code
+    has_wrong_left = 'base_speed + P' in active_code
+    left_motor_assignments = active_code.count('base_speed + P')
+    if left_motor_assignments > 1 or not has_correct_left:
+        bugs_remaining.append('logic_steering')
+        bug_categories.append('LOGIC')
+
+    # Bug 6: Method typo - run_motors_speed (not run_motor_speed)
+    has_correct_method = 'run_motors_speed' in active_code
+    has_wrong_method = 'run_motor_speed' in active_code and not has_correct_method
+    if has_wrong_method or not has_correct_method:
+        bugs_remaining.append('runtime_method')
+        bug_categories.append('RUNTIME')
+
+    # Build category summary
+    syntax_count = bug_categories.count('SYNTAX')
+    runtime_count = bug_categories.count('RUNTIME')
+    logic_count = bug_categories.count('LOGIC')
+
+    category_summary = []
+    if syntax_count > 0:
+        category_summary.append(f'SYNTAX ({syntax_count})')
+    if runtime_count > 0:
+        category_summary.append(f'RUNTIME ({runtime_count})')
+    if logic_count > 0:
+        category_summary.append(f'LOGIC ({logic_count})')
+
+    return Preflight(bugs_remaining, bugs_fixed=6 - len(bugs_remaining),
+                     category_summary=', '.join(category_summary))
+
+
 def art_of_debugging(robot, frame, td, user_code=None):
     """
     Verification for lesson: The Art of Debugging — 6.1
@@ -57,81 +153,19 @@ def art_of_debugging(robot, frame, td, user_code=None):
     # ── first-frame initialisation ────────────────────────────────────────────
     if td is None:
         # ── code validation ───────────────────────────────────────────────────
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-
-        # Bug detection (progressive hints)
-        bugs_remaining = []
-        bug_categories = []
-
-        # Bug 1: Missing colon after while True
-        has_while_colon = 'while True:' in active_code
-        if not has_while_colon:
-            bugs_remaining.append('syntax_colon')
-            bug_categories.append('SYNTAX')
-
-        # Bug 2: NameError - print(sensor) should be print(sensor_array)
-        # Only flag as bug if the WRONG pattern exists
-        has_wrong_print = 'print(sensor)' in active_code
-        if has_wrong_print:
-            bugs_remaining.append('runtime_name')
-            bug_categories.append('RUNTIME')
-
-        # Bug 3: Failsafe max(sensor_array) < (not >)
-        has_correct_failsafe = 'max(sensor_array) <' in active_code
-        has_wrong_failsafe = 'max(sensor_array) >' in active_code
-        if has_wrong_failsafe or not has_correct_failsafe:
-            bugs_remaining.append('logic_threshold')
-            bug_categories.append('LOGIC')
-
-        # Bug 4: P calculation - kp * position (not +)
-        has_correct_p = 'kp * position' in active_code or 'position * kp' in active_code
-        has_wrong_p = 'kp + position' in active_code
-        if has_wrong_p or not has_correct_p:
-            bugs_remaining.append('logic_calculation')
-            bug_categories.append('LOGIC')
-
-        # Bug 5: Left motor differential - base_speed - P
-        has_correct_left = 'base_speed - P' in active_code
-        has_wrong_left = 'base_speed + P' in active_code
-        left_motor_assignments = active_code.count('base_speed + P')
-        if left_motor_assignments > 1 or not has_correct_left:
-            bugs_remaining.append('logic_steering')
-            bug_categories.append('LOGIC')
-
-        # Bug 6: Method typo - run_motors_speed (not run_motor_speed)
-        has_correct_method = 'run_motors_speed' in active_code
-        has_wrong_method = 'run_motor_speed' in active_code and not has_correct_method
-        if has_wrong_method or not has_correct_method:
-            bugs_remaining.append('runtime_method')
-            bug_categories.append('RUNTIME')
-
-        bugs_fixed = 6 - len(bugs_remaining)
-        code_valid = len(bugs_remaining) == 0
-
-        # Build category summary
-        syntax_count = bug_categories.count('SYNTAX')
-        runtime_count = bug_categories.count('RUNTIME')
-        logic_count = bug_categories.count('LOGIC')
-        
-        category_summary = []
-        if syntax_count > 0:
-            category_summary.append(f'SYNTAX ({syntax_count})')
-        if runtime_count > 0:
-            category_summary.append(f'RUNTIME ({runtime_count})')
-        if logic_count > 0:
-            category_summary.append(f'LOGIC ({logic_count})')
+        check = _art_of_debugging_code(user_code)
 
         # ── td state init ─────────────────────────────────────────────────────
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 60,
+            "targets": TargetIndex(CHECKPOINTS, CHECKPOINT_RADIUS, ordered=True),
+            "preflight": check,
             "data": {
-                "code_valid": code_valid,
-                "bugs_remaining": len(bugs_remaining),
-                "bugs_fixed": bugs_fixed,
-                "category_summary": ', '.join(category_summary),
+                "code_valid": check.ok,
+                "bugs_remaining": len(check.missing),
+                "bugs_fixed": check.details["bugs_fixed"],
+                "category_summary": check.details["category_summary"],
                 "completed_verdict": False,
                 
                 "start_position": None,
@@ -150,23 +184,12 @@ def art_of_debugging(robot, frame, td, user_code=None):
 
         # ── load checkpoint flag images ───────────────────────────────────────
         try:
-            basepath = os.path.abspath(os.path.dirname(__file__))
-            filepath = os.path.join(basepath, "auto_tests", "images", "flag_finish.jpg")
-            if not os.path.exists(filepath):
-                filepath = os.path.join(basepath, "images", "flag_finish.jpg")
-            flag = cv2.imread(filepath)
+            flag = keyed_sprite("flag_finish.jpg", scale=1/3)
             if flag is None:
-                raise FileNotFoundError(f"flag_finish.jpg not found")
-            flag = cv2.resize(flag, (int(flag.shape[1] / 3), int(flag.shape[0] / 3)))
-            mask = cv2.bitwise_not(cv2.inRange(flag,
-                                               np.array([0, 240, 0]),
-                                               np.array([50, 255, 50])))
-            td["data"]["flag"] = flag
-            td["data"]["flag_mask"] = mask
-            flag_green = flag.copy()
-            flag_green[mask > 0] = (0, 200, 0)
-            td["data"]["flag_green"] = flag_green
-            td["data"]["flag_green_mask"] = mask
+                raise FileNotFoundError("flag_finish.jpg not found")
+            td["data"]["flag"], td["data"]["flag_mask"] = flag
+            td["data"]["flag_green"], td["data"]["flag_green_mask"] = tinted_sprite(
+                "flag_finish.jpg", (0, 200, 0), scale=1/3)
         except Exception as e:
             print(f"Flag load error: {e}")
             td["data"]["image_error"] = True
@@ -189,12 +212,9 @@ def art_of_debugging(robot, frame, td, user_code=None):
                 td["data"]["max_distance_moved"] = dist
 
     # ── checkpoint detection (sequential) ─────────────────────────────────────
-    if pos is not None and td["data"]["checkpoints_remaining"]:
-        next_cp = td["data"]["checkpoints_remaining"][0]
-        dist = math.sqrt((pos[0] - next_cp[0])**2 + (pos[1] - next_cp[1])**2)
-        if dist < CHECKPOINT_RADIUS:
-            td["data"]["checkpoints_hit"].append(next_cp)
-            td["data"]["checkpoints_remaining"].pop(0)
+    for i in td["targets"].update(pos):
+        td["data"]["checkpoints_hit"].append(CHECKPOINTS[i])
+        td["data"]["checkpoints_remaining"].pop(0)
 
     # ── live status text ──────────────────────────────────────────────────────
     if not td["data"].get("completed_verdict"):
@@ -226,17 +246,14 @@ def art_of_debugging(robot, frame, td, user_code=None):
             
             if use_flag:
                 draw_flag = flag_green if hit else flag
-                half_w = draw_flag.shape[1] // 2
-                half_h = draw_flag.shape[0] // 2
-                r0 = cp_px[1] - half_h
-                r1 = cp_px[1] + (draw_flag.shape[0] - half_h)
-                c0 = cp_px[0] - half_w
-                c1 = cp_px[0] + (draw_flag.shape[1] - half_w)
-                if 0 <= r0 and r1 < frame.shape[0] and 0 <= c0 and c1 < frame.shape[1]:
-                    cv2.copyTo(draw_flag, flag_mask, frame[r0:r1, c0:c1])
+                blit(frame, draw_flag, flag_mask, cp_px)
             else:
                 cv2.circle(frame, cp_px, 5, (0, 200, 0) if hit else (0, 200, 255), -1)
 
+    # ── early verdict: fixed code with every checkpoint reached scores 100 ────
+    # (buggy code can still earn 85 by driving, so it is not settled early)
+    settle_when(td, passed=td["data"]["code_valid"] and td["targets"].done)
+
     # ── timeout / final verdict (fires exactly once) ──────────────────────────
     if td["end_time"] - time.time() < 1 and not td["data"].get("completed_verdict"):
         td["data"]["completed_verdict"] = True
@@ -286,6 +303,31 @@ def art_of_debugging(robot, frame, td, user_code=None):
 # ============================================================================
 # Task 6.2: The Hardware Safety Net
 # ============================================================================
+def _hardware_safety_net_code(user_code):
+    code = analyze_code(user_code)
+    active_code = code.active
+
+    missing = []
+
+    has_try = 'try:' in active_code
+    if not has_try:
+        missing.append('try: block')
+
+    has_except_zero = 'except ZeroDivisionError' in active_code
+    if not has_except_zero:
+        missing.append('except ZeroDivisionError:')
+
+    has_error_print = 'CRITICAL' in active_code or 'Sensor Blind' in active_code
+    if not has_error_print:
+        missing.append('error warning message')
+
+    has_return_unknown = 'return "Unknown"' in active_code or "return 'Unknown'" in active_code
+    if not has_return_unknown:
+        missing.append('return "Unknown"')
+
+    return from_missing(missing, "Code missing try-except: {} | Score: 0")
+
+
 def hardware_safety_net(robot, frame, td, user_code=None):
     """
     Verification for lesson: The Hardware Safety Net — 6.2
@@ -307,42 +349,22 @@ def hardware_safety_net(robot, frame, td, user_code=None):
     }
     text = "Processing scans..."
 
-    frame = robot.draw_info(frame)
+    frame = draw_info(robot, frame)
 
     # ── first-frame initialisation ────────────────────────────────────────────
     if td is None:
         # ── code validation ───────────────────────────────────────────────────
-        lines = user_code.split('\n') if user_code else []
-        active_lines = [line.split('#')[0] for line in lines]
-        active_code = '\n'.join(active_lines)
-
-        missing = []
-        
-        has_try = 'try:' in active_code
-        if not has_try:
-            missing.append('try: block')
-        
-        has_except_zero = 'except ZeroDivisionError' in active_code
-        if not has_except_zero:
-            missing.append('except ZeroDivisionError:')
-        
-        has_error_print = 'CRITICAL' in active_code or 'Sensor Blind' in active_code
-        if not has_error_print:
-            missing.append('error warning message')
-        
-        has_return_unknown = 'return "Unknown"' in active_code or "return 'Unknown'" in active_code
-        if not has_return_unknown:
-            missing.append('return "Unknown"')
-        
-        code_valid = len(missing) == 0
+        check = _hardware_safety_net_code(user_code)
 
         # ── td state init ─────────────────────────────────────────────────────
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 30,
+            "inbox": MessageInbox(),
+            "preflight": check,
             "data": {
-                "code_valid": code_valid,
-                "missing": missing,
+                "code_valid": check.ok,
+                "missing": check.missing,
                 "completed_verdict": False,
                 
                 "start_position": None,
@@ -373,8 +395,7 @@ def hardware_safety_net(robot, frame, td, user_code=None):
                 td["data"]["max_distance_moved"] = dist
 
     # ── MQTT message parsing ──────────────────────────────────────────────────
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         if "Sector #" in msg:
             td["data"]["sector_messages"].append(msg)
             td["data"]["scans_received"] += 1
@@ -406,11 +427,7 @@ def hardware_safety_net(robot, frame, td, user_code=None):
         unknown_count = td["data"]["unknown_detections"]
         
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = (
-                f"Code missing try-except: {', '.join(td['data']['missing'])} | Score: 0"
-            )
+            result.update(td["preflight"].result)
             text = "Implement try-except block first!"
         
         elif scans_received >= EXPECTED_SCANS and unknown_count >= 3:
@@ -465,6 +482,49 @@ def hardware_safety_net(robot, frame, td, user_code=None):
 # ============================================================================
 # Task 6.3: Code Clinic (Refactoring)
 # ============================================================================
+def _code_clinic_code(user_code):
+    missing = []
+    code = analyze_code(user_code, strip=False)
+
+    if code.syntax_ok:
+        # Find UPPERCASE constants
+        constants = code.constants
+
+        # Check required constants
+        if 'SENSITIVITY' not in constants:
+            missing.append('SENSITIVITY constant')
+        if not any(c in constants for c in ['LINE_LIMIT', 'LINE_THRESHOLD']):
+            missing.append('LINE_LIMIT constant')
+        if 'BASE_SPEED' not in constants:
+            missing.append('BASE_SPEED constant')
+        if not any(c in constants for c in ['KP', 'Kp']):
+            missing.append('KP constant')
+
+        # Find functions with properties
+        functions = {}
+        for name, node in code.functions.items():
+            functions[name] = {
+                'has_try_except': code.function_contains(name, ast.Try),
+                'params': [arg.arg for arg in node.args.args]
+            }
+
+        # Check required functions
+        if 'get_mineral_color' not in functions:
+            missing.append('get_mineral_color() function')
+        elif not functions['get_mineral_color']['has_try_except']:
+            missing.append('try-except in get_mineral_color()')
+
+        if 'calculate_steering' not in functions:
+            missing.append('calculate_steering() function')
+
+        if 'apply_movement' not in functions:
+            missing.append('apply_movement() function')
+    else:
+        missing.append(f'syntax error at line {code.syntax_error.lineno}')
+
+    return from_missing(missing, "Code not refactored: {} | Score: 0")
+
+
 def code_clinic(robot, frame, td, user_code=None):
     """
     Verification for lesson: Code Clinic (Refactoring) — 6.3
@@ -491,67 +551,18 @@ def code_clinic(robot, frame, td, user_code=None):
     # ── first-frame initialisation ────────────────────────────────────────────
     if td is None:
         # ── AST-based code validation ─────────────────────────────────────────
-        missing = []
-        code_valid = False
-        
-        try:
-            tree = ast.parse(user_code)
-            
-            # Find UPPERCASE constants
-            constants = set()
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Assign):
-                    for target in node.targets:
-                        if isinstance(target, ast.Name) and target.id.isupper():
-                            constants.add(target.id)
-            
-            # Check required constants
-            if 'SENSITIVITY' not in constants:
-                missing.append('SENSITIVITY constant')
-            if not any(c in constants for c in ['LINE_LIMIT', 'LINE_THRESHOLD']):
-                missing.append('LINE_LIMIT constant')
-            if 'BASE_SPEED' not in constants:
-                missing.append('BASE_SPEED constant')
-            if not any(c in constants for c in ['KP', 'Kp']):
-                missing.append('KP constant')
-            
-            # Find functions with properties
-            functions = {}
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    has_try = any(isinstance(n, ast.Try) for n in ast.walk(node))
-                    params = [arg.arg for arg in node.args.args]
-                    
-                    functions[node.name] = {
-                        'has_try_except': has_try,
-                        'params': params
-                    }
-            
-            # Check required functions
-            if 'get_mineral_color' not in functions:
-                missing.append('get_mineral_color() function')
-            elif not functions['get_mineral_color']['has_try_except']:
-                missing.append('try-except in get_mineral_color()')
-            
-            if 'calculate_steering' not in functions:
-                missing.append('calculate_steering() function')
-            
-            if 'apply_movement' not in functions:
-                missing.append('apply_movement() function')
-            
-            code_valid = len(missing) == 0
-            
-        except SyntaxError as e:
-            missing.append(f'syntax error at line {e.lineno}')
-            code_valid = False
+        check = _code_clinic_code(user_code)
 
         # ── td state init ─────────────────────────────────────────────────────
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 60,
+            "inbox": MessageInbox(),
+            "targets": TargetIndex(CHECKPOINTS, CHECKPOINT_RADIUS, ordered=True),
+            "preflight": check,
             "data": {
-                "code_valid": code_valid,
-                "missing": missing,
+                "code_valid": check.ok,
+                "missing": check.missing,
                 "completed_verdict": False,
                 
                 "start_position": None,
@@ -572,26 +583,12 @@ def code_clinic(robot, frame, td, user_code=None):
 
         # ── load checkpoint flag images ───────────────────────────────────────
         try:
-            basepath = os.path.abspath(os.path.dirname(__file__))
-            filepath = os.path.join(basepath, "auto_tests", "images", "flag_finish.jpg")
-            if not os.path.exists(filepath):
-                filepath = os.path.join(basepath, "images", "flag_finish.jpg")
-            
-            flag = cv2.imread(filepath)
+            flag = keyed_sprite("flag_finish.jpg", scale=1/3)
             if flag is None:
-                raise FileNotFoundError(f"flag_finish.jpg not found")
-            
-            flag = cv2.resize(flag, (int(flag.shape[1] / 3), int(flag.shape[0] / 3)))
-            mask = cv2.bitwise_not(cv2.inRange(flag,
-                                               np.array([0, 240, 0]),
-                                               np.array([50, 255, 50])))
-            td["data"]["flag"] = flag
-            td["data"]["flag_mask"] = mask
-            
-            flag_green = flag.copy()
-            flag_green[mask > 0] = (0, 200, 0)
-            td["data"]["flag_green"] = flag_green
-            td["data"]["flag_green_mask"] = mask
+                raise FileNotFoundError("flag_finish.jpg not found")
+            td["data"]["flag"], td["data"]["flag_mask"] = flag
+            td["data"]["flag_green"], td["data"]["flag_green_mask"] = tinted_sprite(
+                "flag_finish.jpg", (0, 200, 0), scale=1/3)
         except Exception as e:
             print(f"Flag load error: {e}")
             td["data"]["image_error"] = True
@@ -613,16 +610,12 @@ def code_clinic(robot, frame, td, user_code=None):
                 td["data"]["max_distance_moved"] = dist
 
     # ── checkpoint detection (sequential) ─────────────────────────────────────
-    if pos is not None and td["data"]["checkpoints_remaining"]:
-        next_cp = td["data"]["checkpoints_remaining"][0]
-        dist = math.sqrt((pos[0] - next_cp[0])**2 + (pos[1] - next_cp[1])**2)
-        if dist < CHECKPOINT_RADIUS:
-            td["data"]["checkpoints_hit"].append(next_cp)
-            td["data"]["checkpoints_remaining"].pop(0)
+    for i in td["targets"].update(pos):
+        td["data"]["checkpoints_hit"].append(CHECKPOINTS[i])
+        td["data"]["checkpoints_remaining"].pop(0)
 
     # ── MQTT message parsing ──────────────────────────────────────────────────
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         if "Mineral Detected" in msg or "mineral" in msg.lower():
             if msg not in td["data"]["minerals_detected"]:
                 td["data"]["minerals_detected"].append(msg)
@@ -660,15 +653,7 @@ def code_clinic(robot, frame, td, user_code=None):
             
             if use_flag:
                 draw_flag = flag_green if hit else flag
-                half_w = draw_flag.shape[1] // 2
-                half_h = draw_flag.shape[0] // 2
-                r0 = cp_px[1] - half_h
-                r1 = cp_px[1] + (draw_flag.shape[0] - half_h)
-                c0 = cp_px[0] - half_w
-                c1 = cp_px[0] + (draw_flag.shape[1] - half_w)
-                
-                if 0 <= r0 and r1 < frame.shape[0] and 0 <= c0 and c1 < frame.shape[1]:
-                    cv2.copyTo(draw_flag, flag_mask, frame[r0:r1, c0:c1])
+                blit(frame, draw_flag, flag_mask, cp_px)
             else:
                 cv2.circle(frame, cp_px, 5, (0, 200, 0) if hit else (0, 200, 255), -1)
 
@@ -684,11 +669,7 @@ def code_clinic(robot, frame, td, user_code=None):
         minerals_found = len(td["data"]["minerals_detected"])
         
         if not td["data"]["code_valid"]:
-            result["success"] = False
-            result["score"] = 0
-            result["description"] = (
-                f"Code not refactored: {', '.join(td['data']['missing'])} | Score: 0"
-            )
+            result.update(td["preflight"].result)
             text = "Complete refactoring requirements first!"
         
         elif all_checkpoints and minerals_found >= 1:
@@ -728,3 +709,10 @@ def code_clinic(robot, frame, td, user_code=None):
             text = "Refactoring done, but code has bugs."
 
     return frame, td, text, result
+
+
+preflight_checks = {
+    "art_of_debugging": _art_of_debugging_code,
+    "hardware_safety_net": _hardware_safety_net_code,
+    "code_clinic": _code_clinic_code,
+}
@@ -2,8 +2,22 @@ import cv2
 import math
 import time
 import os
+import sys
 import numpy as np
 
+_VERIFICATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _VERIFICATIONS_DIR not in sys.path:
+    sys.path.insert(0, _VERIFICATIONS_DIR)
+
+from checkerlib.assets import CONE_KEY, keyed_sprite
+from checkerlib.checkpoints import find_checkpoints
+from checkerlib.frames import FULL
+from checkerlib.messages import MessageInbox
+from checkerlib.preflight import Preflight
+from checkerlib.profiling import laps
+from checkerlib.sprites import blit_many
+from checkerlib.targets import TargetIndex
+
 target_points = {
     'basic_line_follower': [(25, 85), (0,-200)],
     'pi': [(100, 25), (30, 0)],
@@ -16,6 +30,12 @@ block_library_functions = {
     'pid': False,
 }
 
+frame_needs = {
+    'basic_line_follower': FULL,
+    'pi': FULL,
+    'pid': FULL,
+}
+
 
 def get_block_library_functions(task):
     """Retrieve block library status for a given task."""
@@ -26,6 +46,23 @@ def get_target_points(task):
     """Retrieve target points for a given task."""
     return target_points.get(task, [])
 
+
+def get_frame_needs(task):
+    """Retrieve what the checker of a task needs from the camera frame."""
+    return frame_needs.get(task, FULL)
+
+
+def preflight(task, user_code):
+    """No task here checks the code statically: every submission gets a robot."""
+    return Preflight()
+
+
+def _placeholder_cone():
+    """Plain backdrop used when traffic-sign.jpg is not deployed"""
+    cone = np.zeros((60, 60, 3), dtype=np.uint8)
+    cone[:, :] = (0, 255, 0)
+    return cone
+
 def basic_line_follower(robot, image, td: dict, user_code=None):
     """Place checkpoints only in cells 1 and 2 (first row, first two cells)"""
     cell_indices = [0, 1,4]  # Cells 1, 2
@@ -85,6 +122,7 @@ def checkpoint_verification_grid(
     [4]  [5]  [6]  [7]
     [8]  [9]  [10] [11]
     """
+    lap = laps("module_7.checkpoint_verification_grid")
     # --- CROP SETTINGS: Adjust these values to select your paper area ---
     top = 120
     bottom = 800
@@ -98,66 +136,22 @@ def checkpoint_verification_grid(
         "score": 100
     }
     text = "Follow the line through all checkpoints"
-    msg = robot.get_msg()
-    if msg is not None:
-        text = f"Message received: {msg}"
 
     image = robot.draw_info(image)
+    lap("overlay")
 
     # Only place checkpoints once
     if not td or "checkpoints" not in td.get("data", {}):
-        roi = image[top:bottom, left:right].copy()
-        roi_h, roi_w = roi.shape[:2]
-        
-        # 3x4 grid: 3 rows, 4 columns
-        num_rows = 3
-        num_cols = 4
-        cell_h = roi_h // num_rows
-        cell_w = roi_w // num_cols
+        # Same track layout -> same checkpoints; the CV pass runs once per layout
+        checkpoint_positions = find_checkpoints(image, cell_indices, (top, bottom, left, right))
 
-        checkpoint_positions = []
-        
-        # Process only the specified cells
-        for cell_index in cell_indices:
-            row = cell_index // num_cols
-            col = cell_index % num_cols
-            
-            y1 = row * cell_h
-            y2 = (row + 1) * cell_h if row < num_rows - 1 else roi_h
-            x1 = col * cell_w
-            x2 = (col + 1) * cell_w if col < num_cols - 1 else roi_w
-
-            cell = roi[y1:y2, x1:x2]
-            gray = cv2.cvtColor(cell, cv2.COLOR_BGR2GRAY)
-            binary = cv2.adaptiveThreshold(
-                gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10
-            )
-            kernel = np.ones((7, 7), np.uint8)
-            binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
-            contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            min_area = 800
-            filtered = [cnt for cnt in contours if cv2.contourArea(cnt) > min_area]
-
-            if filtered:
-                # Calculate cell center
-                cell_center = (cell_w // 2, cell_h // 2)
-                min_dist = float('inf')
-                closest_pt = None
-                for cnt in filtered:
-                    for pt in cnt.reshape(-1, 2):
-                        dist = (pt[0] - cell_center[0])**2 + (pt[1] - cell_center[1])**2
-                        if dist < min_dist:
-                            min_dist = dist
-                            closest_pt = pt
-                if closest_pt is not None:
-                    checkpoint_y = top + y1 + closest_pt[1]
-                    checkpoint_x = left + x1 + closest_pt[0]
-                    checkpoint_positions.append((checkpoint_y, checkpoint_x))
-        
         # Initialize test data
         td = {
             "start_time": time.time(),
             "end_time": time.time() + verification_time,
+            "inbox": MessageInbox(),
+            # checkpoints are (y, x); the robot reaches one within 100 px
+            "targets": TargetIndex([(x, y) for y, x in checkpoint_positions], 100),
             "data": {
                 "checkpoints": checkpoint_positions,
                 "reached_checkpoints": [False] * len(checkpoint_positions),
@@ -171,55 +165,39 @@ def checkpoint_verification_grid(
         
         # Load checkpoint image (cone) if needed
         try:
-            basepath = os.path.abspath(os.path.dirname(__file__))
-            filepath = os.path.join(basepath, "auto_tests", "traffic-sign.jpg")
-            if not os.path.exists(filepath):
-                cone = np.zeros((60, 60, 3), dtype=np.uint8)
-                cone[:, :] = (0, 255, 0)
-            else:
-                cone = cv2.imread(filepath)
-                cone = cv2.resize(cone, (60, 60))
-            mask = cv2.bitwise_not(cv2.inRange(cone, np.array([0, 240, 0]), np.array([35, 255, 35])))
-            td["data"]["cone"] = cone
-            td["data"]["cone-mask"] = mask
+            td["data"]["cone"], td["data"]["cone-mask"] = keyed_sprite(
+                "traffic-sign.jpg", size=(60, 60), key_range=CONE_KEY,
+                search=("auto_tests",), placeholder=_placeholder_cone, warn=False)
         except Exception as e:
             print(f"Error loading checkpoint image: {e}")
+    lap("init")
+
+    for msg in td["inbox"].poll(robot):
+        text = f"Message received: {msg}"
+    lap("messages")
 
     checkpoint_positions = td["data"]["checkpoints"]
-    # Place checkpoint markers (cones) on all uncompleted checkpoints
-    for i, (y, x) in enumerate(checkpoint_positions):
-        if not td["data"]["reached_checkpoints"][i]:
-            y_start = max(0, y - 30)
-            y_end = min(image.shape[0], y + 30)
-            x_start = max(0, x - 30)
-            x_end = min(image.shape[1], x + 30)
-            roi_img = image[y_start:y_end, x_start:x_end]
-            if roi_img.shape[0] > 0 and roi_img.shape[1] > 0:
-                if roi_img.shape != (60, 60, 3):
-                    resized_cone = cv2.resize(td["data"]["cone"], (roi_img.shape[1], roi_img.shape[0]))
-                    resized_mask = cv2.resize(td["data"]["cone-mask"], (roi_img.shape[1], roi_img.shape[0]))
-                    cv2.copyTo(resized_cone, resized_mask, roi_img)
-                else:
-                    cv2.copyTo(td["data"]["cone"], td["data"]["cone-mask"], roi_img)
+    # Place checkpoint markers (cones) on all uncompleted checkpoints, clipped at the frame edge
+    blit_many(image, ((td["data"]["cone"], td["data"]["cone-mask"], (x, y))
+                      for i, (y, x) in enumerate(checkpoint_positions)
+                      if not td["data"]["reached_checkpoints"][i]))
+    lap("drawing")
 
     # Check if robot passes through checkpoints
     if robot and robot.position_px:
         robot_x, robot_y = robot.position_px
-        for i, (y, x) in enumerate(checkpoint_positions):
-            if not td["data"]["reached_checkpoints"][i] and np.linalg.norm([robot_x - x, robot_y - y]) < 100:
-                td["data"]["reached_checkpoints"][i] = True
-                y_start = max(0, y - 30)
-                y_end = min(image.shape[0], y + 30)
-                x_start = max(0, x - 30)
-                x_end = min(image.shape[1], x + 30)
-                cv2.circle(image, (x, y), 30, (255, 255, 255), -1)
-                text = f"Checkpoint {i+1}/{len(checkpoint_positions)} reached!"
+        for i in td["targets"].update((robot_x, robot_y)):
+            y, x = checkpoint_positions[i]
+            td["data"]["reached_checkpoints"][i] = True
+            cv2.circle(image, (x, y), 30, (255, 255, 255), -1)
+            text = f"Checkpoint {i+1}/{len(checkpoint_positions)} reached!"
         
         # Check if all checkpoints are completed
         if all(td["data"]["reached_checkpoints"]) and not td["data"]["task_completed"]:
             td["data"]["task_completed"] = True
             td["data"]["completion_time"] = time.time()  # Record completion time
             text = "All checkpoints passed!"
+    lap("position")
 
     # Check if 0.5 seconds have passed since completion
     if td["data"]["task_completed"] and td["data"]["completion_time"]:
@@ -241,5 +219,6 @@ def checkpoint_verification_grid(
             completed = sum(td["data"]["reached_checkpoints"])
             total = len(td["data"]["reached_checkpoints"])
             result["description"] = f"The robot only passed {completed}/{total} checkpoints in the allotted time."
+    lap("verdict")
     
     return image, td, text, result
@@ -1,7 +1,21 @@
 import ast
 import cv2
-import numpy as np
 import time
+import os
+import sys
+
+_VERIFICATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _VERIFICATIONS_DIR not in sys.path:
+    sys.path.insert(0, _VERIFICATIONS_DIR)
+
+from checkerlib.frames import FULL, NONE, ROI, draw_info
+from checkerlib.grammar import Grammar, Shape
+from checkerlib.hud import put_text
+from checkerlib.led import LedDetector
+from checkerlib.messages import MessageInbox
+from checkerlib.preflight import Preflight
+from checkerlib.profiling import laps
+from checkerlib.series import Series
 
 target_points = {
     'line_sensor_leds': [(45, 50), (30, 0)],
@@ -13,6 +27,11 @@ block_library_functions = {
     'telemetry_heartbeat_health': False,
 }
 
+frame_needs = {
+    'line_sensor_leds': ROI,
+    'telemetry_heartbeat_health': NONE,
+}
+
 
 def get_block_library_functions(task):
     """Retrieve block library status for a given task."""
@@ -22,8 +41,27 @@ def get_block_library_functions(task):
 def get_target_points(task):
     """Retrieve target points for a given task."""
     return target_points.get(task, [])
-    
+
+
+def get_frame_needs(task):
+    """Retrieve what the checker of a task needs from the camera frame."""
+    return frame_needs.get(task, FULL)
+
+
+def preflight(task, user_code):
+    """No task here checks the code statically: every submission gets a robot."""
+    return Preflight()
+
+
+# e.g. "robot1 status=critical battery=3"
+HEARTBEAT_MESSAGES = Grammar([
+    Shape("status", r"(?P<robot>robot\d+)\s+status=(?P<status>\w+)\s+battery=(?P<battery>\d+)",
+          key="status=", battery=int),
+])
+
+
 def telemetry_heartbeat_health(robot, image, td, user_code=None):
+    lap = laps("module_8.telemetry_heartbeat_health")
     result = {
         "success": True,
         "description": "Verifying robot status messages...",
@@ -31,12 +69,14 @@ def telemetry_heartbeat_health(robot, image, td, user_code=None):
     }
     text = "Waiting for robot status messages..."
 
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
+    lap("overlay")
 
     if not td:
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 15,
+            "inbox": MessageInbox(),
             "data": {
                 "messages": [],
                 "robots": {}
@@ -44,21 +84,17 @@ def telemetry_heartbeat_health(robot, image, td, user_code=None):
             "finished": False,
             "finish_time": None
         }
+    lap("init")
 
-    msg = robot.get_msg()
-    if msg is not None:
+    for msg in td["inbox"].poll(robot):
         td["data"]["messages"].append(msg)
         text = f"Received: {msg}"
         
-        # Parse message format: "robot1 status=critical battery=3"
-        import re
-        pattern = r'(robot\d+)\s+status=(\w+)\s+battery=(\d+)'
-        match = re.search(pattern, msg)
-        
-        if match:
-            robot_name = match.group(1)
-            status = match.group(2)
-            battery = int(match.group(3))
+        heartbeat = HEARTBEAT_MESSAGES.parse(msg)
+        if heartbeat is not None:
+            robot_name = heartbeat["robot"]
+            status = heartbeat["status"]
+            battery = heartbeat["battery"]
             
             # Only store if it's one of the expected robots
             if robot_name in ["robot1", "robot2", "robot3"]:
@@ -66,13 +102,15 @@ def telemetry_heartbeat_health(robot, image, td, user_code=None):
                     "status": status,
                     "battery": battery
                 }
+    lap("messages")
 
     # Display detected robots
     status_y = 150
     for robot_name, data in td["data"]["robots"].items():
-        cv2.putText(image, f"{robot_name}: {data['status']}, battery={data['battery']}", 
-                    (20, status_y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        put_text(image, f"{robot_name}: {data['status']}, battery={data['battery']}", 
+                (20, status_y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
         status_y += 25
+    lap("drawing")
 
     # Expected values - ALL must match exactly
     expected = {
@@ -125,12 +163,14 @@ def telemetry_heartbeat_health(robot, image, td, user_code=None):
         if time.time() - td["finish_time"] >= 3:
             # Keep final result state (don't change success/score)
             pass
+    lap("verdict")
     
     return image, td, text, result
 
 
 def line_sensor_leds(robot, image, td: dict, user_code=None):
     """Verification: Check if LEDs flash with 2-second ON and 2-second OFF intervals"""
+    lap = laps("module_8.line_sensor_leds")
 
     result = {
         "success": True,
@@ -140,6 +180,7 @@ def line_sensor_leds(robot, image, td: dict, user_code=None):
     text = "Monitoring LED flashes..."
 
     image = robot.draw_info(image)
+    lap("overlay")
 
     if not td:
         td = {
@@ -149,59 +190,24 @@ def line_sensor_leds(robot, image, td: dict, user_code=None):
                 "flash_count": 0,
                 "last_state": None,
                 "state_start_time": None,
-                "on_durations": [],
-                "off_durations": [],
-                "state_buffer": []
+                # The verdict (at 7 flashes) reads at most 8 of each; the overlay shows the last 16
+                "on_durations": Series(capacity=16),
+                "off_durations": Series(capacity=16)
             },
+            # White-pixel share right of the marker, majority of the last 3 frames
+            "led": LedDetector(lower=245, on_percent=2),
             "finished": False,
             "finish_time": None
         }
-
-    percentage_white = 0
-    current_state = False
+    lap("init")
 
     if robot:
-        lower_white = np.array([245, 245, 245])
-        upper_white = np.array([255, 255, 255])
-
         robot_info = robot.get_info()
         robot_position = robot_info.get("position_px")
 
         if robot_position:
-            crop_x, crop_y = robot_position[0] + 80, robot_position[1] - 90
-            crop_width, crop_height = 80, 180
-
-            h, w, _ = image.shape
-            crop_x = max(0, min(crop_x, w - crop_width))
-            crop_y = max(0, min(crop_y, h - crop_height))
-
-            crop_x, crop_y = int(crop_x), int(crop_y)
-            crop_width, crop_height = int(crop_width), int(crop_height)
-
-            cropped_image = image[crop_y:crop_y + crop_height, crop_x:crop_x + crop_width]
-
-            mask = cv2.inRange(cropped_image, lower_white, upper_white)
-
-            total_pixels = cropped_image.shape[0] * cropped_image.shape[1]
-            white_pixels = cv2.countNonZero(mask)
-            percentage_white = (white_pixels / total_pixels) * 100
-
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            contour_image = cropped_image.copy()
-            cv2.drawContours(contour_image, contours, -1, (0, 255, 0), 2)
-            image[crop_y:crop_y + crop_height, crop_x:crop_x + crop_width] = contour_image
-
-            current_state = percentage_white > 2
-
-            # Smoothing with buffer (last 3 frames)
-            td["data"]["state_buffer"].append(current_state)
-            if len(td["data"]["state_buffer"]) > 3:
-                td["data"]["state_buffer"].pop(0)
-
-            if len(td["data"]["state_buffer"]) >= 2:
-                smoothed_state = sum(td["data"]["state_buffer"]) > len(td["data"]["state_buffer"]) / 2
-            else:
-                smoothed_state = current_state
+            smoothed_state = td["led"].update(image, robot_position)
+            td["led"].draw(image)
 
             if smoothed_state:
                 text = "LED ON"
@@ -219,18 +225,20 @@ def line_sensor_leds(robot, image, td: dict, user_code=None):
                 
                 # Store duration based on what state just ENDED
                 if td["data"]["last_state"]:  # Was ON, now OFF
-                    td["data"]["on_durations"].append(duration)
+                    td["data"]["on_durations"].append(duration, time.time())
                 else:  # Was OFF, now ON
-                    td["data"]["off_durations"].append(duration)
+                    td["data"]["off_durations"].append(duration, time.time())
                     td["data"]["flash_count"] += 1  # Count when turning ON
                 
                 td["data"]["last_state"] = smoothed_state
                 td["data"]["state_start_time"] = time.time()
+    lap("led")
     
-    if len(td["data"]["off_durations"]) > 0:
-        off_text = ", ".join([f"{d:.1f}s" for d in td["data"]["off_durations"]])
-        cv2.putText(image, f"OFF: {off_text}", 
-                    (20, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
+    if td["data"]["off_durations"].count > 0:
+        off_text = td["data"]["off_durations"].format("{:.1f}s")
+        put_text(image, f"OFF: {off_text}", 
+                (20, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
+    lap("drawing")
 
     # Check for task completion
     if not td.get("finished", False):
@@ -242,19 +250,19 @@ def line_sensor_leds(robot, image, td: dict, user_code=None):
             if td["data"]["state_start_time"]:
                 final_duration = time.time() - td["data"]["state_start_time"]
                 if td["data"]["last_state"]:
-                    td["data"]["on_durations"].append(final_duration)
+                    td["data"]["on_durations"].append(final_duration, time.time())
                 else:
-                    td["data"]["off_durations"].append(final_duration)
+                    td["data"]["off_durations"].append(final_duration, time.time())
             
             # Validation: Must have 5-7 flashes
             if 5 <= td["data"]["flash_count"] <= 7:
                 # Check ON durations (should be ~2 seconds, tolerance ±0.5s)
-                valid_on = [1.5 <= d <= 2.5 for d in td["data"]["on_durations"]]
-                on_ratio = sum(valid_on) / len(valid_on) if valid_on else 0
+                on = td["data"]["on_durations"]
+                on_ratio = on.count_within(1.5, 2.5) / len(on) if on else 0
                 
                 # Check OFF durations (should be ~2 seconds, tolerance ±0.5s)
-                valid_off = [1.5 <= d <= 2.5 for d in td["data"]["off_durations"]]
-                off_ratio = sum(valid_off) / len(valid_off) if valid_off else 0
+                off = td["data"]["off_durations"]
+                off_ratio = off.count_within(1.5, 2.5) / len(off) if off else 0
                 
                 # Need at least 60% of both ON and OFF durations to be valid
                 if on_ratio >= 0.6 and off_ratio >= 0.6:
@@ -281,5 +289,6 @@ def line_sensor_leds(robot, image, td: dict, user_code=None):
         if time.time() - td["finish_time"] >= 3:
             # Keep final result state
             pass
+    lap("verdict")
 
     return image, td, text, result
@@ -1,7 +1,26 @@
 import cv2
 import time
+import os
+import sys
 import numpy as np
 
+_VERIFICATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+if _VERIFICATIONS_DIR not in sys.path:
+    sys.path.insert(0, _VERIFICATIONS_DIR)
+
+from checkerlib.assets import CONE_KEY, keyed_sprite
+from checkerlib.fog import FogOfWar
+from checkerlib.frames import FULL, POSE, draw_info
+from checkerlib.grammar import Grammar, Shape
+from checkerlib.hud import put_text
+from checkerlib.led import LedDetector
+from checkerlib.messages import MessageInbox
+from checkerlib.preflight import Preflight
+from checkerlib.profiling import laps
+from checkerlib.series import Series
+from checkerlib.sprites import blit
+from checkerlib.targets import TargetIndex
+
 # Starting point configuration for module 9 tasks
 # Adjust points if the simulator expects a specific spawn zone
 # Format: "task": [(x, y), (angle, speed)]
@@ -17,6 +36,12 @@ block_library_functions = {
     "miniral_scanner_sweep": False,
 }
 
+frame_needs = {
+    "fog_of_war_survey": FULL,
+    "miniral_scanner_sweep": FULL,
+    "docking": POSE,
+}
+
 
 def get_block_library_functions(task):
     """Retrieve block library status for a given task."""
@@ -27,10 +52,28 @@ def get_target_points(task):
     """Retrieve target points for a given task."""
     return target_points.get(task, [])
 
+
+def get_frame_needs(task):
+    """Retrieve what the checker of a task needs from the camera frame."""
+    return frame_needs.get(task, FULL)
+
+
+def preflight(task, user_code):
+    """No task here checks the code statically: every submission gets a robot."""
+    return Preflight()
+
+
+def _placeholder_zone_marker():
+    """Solid marker used when traffic-sign.jpg is not deployed"""
+    zone_marker = np.zeros((60, 60, 3), dtype=np.uint8)
+    zone_marker[:, :] = (0, 200, 200)
+    return zone_marker
+
 def fog_of_war_survey(robot, image, td, user_code=None):
     """
     Assignment 1: Fog of War - Explore and reveal the map
     """
+    lap = laps("module_9.fog_of_war_survey")
     result = {
         "success": True,
         "description": "Exploring the map...",
@@ -39,28 +82,23 @@ def fog_of_war_survey(robot, image, td, user_code=None):
     text = "Explore to reveal the map!"
 
     image = robot.draw_info(image)
+    lap("overlay")
 
     # Define the map area (exclude right debug panel)
     map_width = 1300  # Width of map area (before debug panel starts)
+    reveal_radius = 100  # Radius around robot that gets revealed
 
     if not td:
-        # Initialize fog of war overlay (only for map area)
-        fog_overlay = np.zeros_like(image)
-        fog_overlay[:, :map_width] = (0, 0, 0)  # Black fog only on map
-
-        # Create revealed areas mask (only for map area)
-        revealed_mask = np.zeros((image.shape[0], image.shape[1]), dtype=np.uint8)
-
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 40,  # 50 seconds to explore
+            # Revealed/fog masks and the running revealed-pixel count (map area only)
+            "fog": FogOfWar(map_width, reveal_radius),
             "data": {
-                "fog_overlay": fog_overlay,
-                "revealed_mask": revealed_mask,
                 "map_width": map_width,
                 "total_pixels": image.shape[0] * map_width,  # Only count map pixels
                 "revealed_pixels": 0,
-                "reveal_radius": 100,  # Radius around robot that gets revealed
+                "reveal_radius": reveal_radius,
                 "target_percentage": 40,  # Need to reveal 40% of map
                 "task_completed": False,
                 "completion_time": None
@@ -68,6 +106,7 @@ def fog_of_war_survey(robot, image, td, user_code=None):
             "finished": False,
             "finish_time": None
         }
+    lap("init")
 
     # Get robot position
     revealed_percentage = 0
@@ -76,26 +115,15 @@ def fog_of_war_survey(robot, image, td, user_code=None):
 
         # Only reveal if robot is in map area
         if robot_x < td["data"]["map_width"]:
-            # Reveal area around robot
-            cv2.circle(td["data"]["revealed_mask"], (robot_x, robot_y), 
-                       td["data"]["reveal_radius"], 255, -1)
+            # Reveal area around robot (counts only the newly uncovered pixels)
+            td["fog"].reveal(image.shape, (robot_x, robot_y))
 
         # Calculate revealed percentage (only in map area)
-        map_revealed_mask = td["data"]["revealed_mask"][:, :td["data"]["map_width"]]
-        td["data"]["revealed_pixels"] = cv2.countNonZero(map_revealed_mask)
+        td["data"]["revealed_pixels"] = td["fog"].revealed_pixels
         revealed_percentage = (td["data"]["revealed_pixels"] / td["data"]["total_pixels"]) * 100
 
-        # Apply fog where not revealed (only on map area)
-        fog_mask = cv2.bitwise_not(td["data"]["revealed_mask"])
-
-        # Create a darkened version of the map (darken it even more)
-        darkened_map = (image[:, :td["data"]["map_width"]] * 0.1).astype(np.uint8)  # Darken to 5% brightness
-
-        # Apply the darkened map where fog exists
-        map_area = image[:, :td["data"]["map_width"]].copy()
-        fog_mask_map = fog_mask[:, :td["data"]["map_width"]]
-        map_area[fog_mask_map == 255] = darkened_map[fog_mask_map == 255]
-        image[:, :td["data"]["map_width"]] = map_area
+        # Darken the map to 10% brightness where fog remains
+        td["fog"].apply(image)
 
         # Update text with current progress
         time_remaining = max(0, td["end_time"] - time.time())
@@ -107,11 +135,12 @@ def fog_of_war_survey(robot, image, td, user_code=None):
             td["data"]["completion_time"] = time.time()
             elapsed_time = td["data"]["completion_time"] - td["start_time"]
             text = f"SUCCESS! Map explored in {elapsed_time:.1f}s! ({revealed_percentage:.1f}% revealed)"
+    lap("position")
 
     # Display progress on image
     progress_y = 30
-    cv2.putText(image, f"Map Revealed: {revealed_percentage:.1f}% / {td['data']['target_percentage']}%", 
-                (20, progress_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    put_text(image, f"Map Revealed: {revealed_percentage:.1f}% / {td['data']['target_percentage']}%", 
+            (20, progress_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
 
     # Draw progress bar
     bar_x, bar_y, bar_w, bar_h = 20, progress_y + 10, 300, 20
@@ -123,6 +152,7 @@ def fog_of_war_survey(robot, image, td, user_code=None):
     bar_color = (0, 255, 0) if td["data"]["task_completed"] else (0, 255, 255)
     cv2.rectangle(image, (bar_x, bar_y), (bar_x + progress_width, bar_y + bar_h), bar_color, -1)
     cv2.rectangle(image, (bar_x, bar_y), (bar_x + bar_w, bar_y + bar_h), (255, 255, 255), 2)
+    lap("drawing")
 
     # Check completion
     if not td.get("finished", False):
@@ -152,13 +182,15 @@ def fog_of_war_survey(robot, image, td, user_code=None):
     else:
         if time.time() - td["finish_time"] >= 2:
             pass  # Keep final state
+    lap("verdict")
 
     # Display time remaining (only if not finished)
     if not td.get("finished", False):
         time_remaining = max(0, td["end_time"] - time.time())
         time_text = f"Time Remaining: {time_remaining:.1f}s"
-        cv2.putText(image, time_text, (20, progress_y + 50), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+        put_text(image, time_text, (20, progress_y + 50), 
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    lap("drawing")
 
     return image, td, text, result
     
@@ -167,6 +199,7 @@ def miniral_scanner_sweep(robot, image, td, user_code=None):
     Lesson 2.7: Multi-Point Mineral Survey
     Visit 5 scanning zones and activate scanner at each zone
     """
+    lap = laps("module_9.miniral_scanner_sweep")
     # ===== SURVEY ZONE POSITIONS (ADJUST THESE) =====
     SURVEY_ZONES = [
         {"x": 300, "y": 200, "name": "Zone 1"},
@@ -184,16 +217,12 @@ def miniral_scanner_sweep(robot, image, td, user_code=None):
     }
     text = "Navigate to zones and activate scanner!"
     
-    msg = robot.get_msg()
-    if msg is not None:
-        text = f"Message: {msg}"
-    
     image = robot.draw_info(image)
+    lap("overlay")
     
     if not td:
         # Load mineral images for each zone
         minerals_data = []
-        basepath = os.path.abspath(os.path.dirname(__file__))
         
         for i in range(5):
             mineral_info = {
@@ -205,23 +234,21 @@ def miniral_scanner_sweep(robot, image, td, user_code=None):
         
         # Try to load zone marker image
         try:
-            zone_marker_path = os.path.join(basepath, "auto_tests", "images", "traffic-sign.jpg")
-            if os.path.exists(zone_marker_path):
-                zone_marker = cv2.imread(zone_marker_path)
-                zone_marker = cv2.resize(zone_marker, (60, 60))
-                zone_mask = cv2.bitwise_not(cv2.inRange(zone_marker, np.array([0, 240, 0]), np.array([35, 255, 35])))
-            else:
-                zone_marker = np.zeros((60, 60, 3), dtype=np.uint8)
-                zone_marker[:, :] = (0, 200, 200)
-                zone_mask = np.ones((60, 60), dtype=np.uint8) * 255
+            zone_marker, zone_mask = keyed_sprite(
+                "traffic-sign.jpg", size=(60, 60), key_range=CONE_KEY,
+                search=("auto_tests/images",), placeholder=_placeholder_zone_marker,
+                warn=False)
         except:
-            zone_marker = np.zeros((60, 60, 3), dtype=np.uint8)
-            zone_marker[:, :] = (0, 200, 200)
-            zone_mask = np.ones((60, 60), dtype=np.uint8) * 255
+            zone_marker, zone_mask = _placeholder_zone_marker(), np.ones((60, 60), dtype=np.uint8) * 255
         
+        zone_radius = 80  # Distance to consider "at zone"
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 60,  # 60 seconds time limit
+            "inbox": MessageInbox(),
+            # White blob over 500 px right of the marker, majority of the last 3 frames
+            "led": LedDetector(lower=215, min_area=500),
+            "targets": TargetIndex([(z["x"], z["y"]) for z in SURVEY_ZONES], zone_radius),
             "data": {
                 "zones": SURVEY_ZONES,
                 "minerals": minerals_data,
@@ -231,7 +258,7 @@ def miniral_scanner_sweep(robot, image, td, user_code=None):
                 "zone_led_off": [False] * 5,
                 "zone_marker": zone_marker,
                 "zone_mask": zone_mask,
-                "zone_radius": 80,  # Distance to consider "at zone"
+                "zone_radius": zone_radius,
                 "at_zone": False,
                 "scanner_active": False,
                 "last_led_state": False,
@@ -241,6 +268,11 @@ def miniral_scanner_sweep(robot, image, td, user_code=None):
             "finished": False,
             "finish_time": None
         }
+    lap("init")
+    
+    for msg in td["inbox"].poll(robot):
+        text = f"Message: {msg}"
+    lap("messages")
     
     # Draw all zone markers
     for i, zone in enumerate(td["data"]["zones"]):
@@ -251,26 +283,19 @@ def miniral_scanner_sweep(robot, image, td, user_code=None):
             # Scanned - show mineral with checkmark
             mineral = td["data"]["minerals"][i]
             cv2.circle(image, (zone_x, zone_y), 25, mineral["color"], -1)
-            cv2.putText(image, "✓", (zone_x - 10, zone_y + 10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+            put_text(image, "✓", (zone_x - 10, zone_y + 10),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
         elif i == td["data"]["current_zone"]:
             # Current target zone
-            y_start = max(0, zone_y - 30)
-            y_end = min(image.shape[0], zone_y + 30)
-            x_start = max(0, zone_x - 30)
-            x_end = min(image.shape[1], zone_x + 30)
-            roi_img = image[y_start:y_end, x_start:x_end]
-            if roi_img.shape[0] > 0 and roi_img.shape[1] > 0:
-                resized_marker = cv2.resize(td["data"]["zone_marker"], (roi_img.shape[1], roi_img.shape[0]))
-                resized_mask = cv2.resize(td["data"]["zone_mask"], (roi_img.shape[1], roi_img.shape[0]))
-                cv2.copyTo(resized_marker, resized_mask, roi_img)
+            blit(image, td["data"]["zone_marker"], td["data"]["zone_mask"], (zone_x, zone_y))
         else:
             # Future zones
             cv2.circle(image, (zone_x, zone_y), 25, (150, 150, 150), 2)
         
         # Draw zone label
-        cv2.putText(image, zone["name"], (zone_x - 30, zone_y - 40),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+        put_text(image, zone["name"], (zone_x - 30, zone_y - 40),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    lap("drawing")
     
     # LED detection using white color threshold
     current_time = time.time()
@@ -280,49 +305,16 @@ def miniral_scanner_sweep(robot, image, td, user_code=None):
     if robot and robot.position_px:
         robot_x, robot_y = robot.position_px
         
-        # Define crop region for LED detection (same as hazard lights)
-        crop_x = robot_x + 80
-        crop_y = robot_y - 90
-        crop_width = 80
-        crop_height = 180
-        
-        h, w, _ = image.shape
-        crop_x = max(0, min(crop_x, w - crop_width))
-        crop_y = max(0, min(crop_y, h - crop_height))
-        crop_x, crop_y = int(crop_x), int(crop_y)
-        crop_width, crop_height = int(crop_width), int(crop_height)
-        
-        cropped_image = image[crop_y:crop_y + crop_height, crop_x:crop_x + crop_width]
-        
-        # White color detection
-        lower_white = np.array([215, 215, 215])
-        upper_white = np.array([255, 255, 255])
-        
-        blurred = cv2.GaussianBlur(cropped_image, (5, 5), 0)
-        mask = cv2.inRange(blurred, lower_white, upper_white)
-        
-        kernel = np.ones((3, 3), np.uint8)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-        
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        valid_contours = [contour for contour in contours if cv2.contourArea(contour) > 500]
-        
-        # Draw contours for visualization
-        contour_image = cropped_image.copy()
-        cv2.drawContours(contour_image, valid_contours, -1, (0, 255, 0), 2)
-        image[crop_y:crop_y + crop_height, crop_x:crop_x + crop_width] = contour_image
-        
-        # LED state detection
-        led_detected = len(valid_contours) > 0
+        # LED state detection (same crop region as hazard lights)
+        led_detected = td["led"].update(image, (robot_x, robot_y))
+        td["led"].draw(image)
         
         # Check robot position for zone
         if current_zone_idx < len(td["data"]["zones"]):
             zone = td["data"]["zones"][current_zone_idx]
-            distance = np.sqrt((robot_x - zone["x"])**2 + (robot_y - zone["y"])**2)
             
             # Check if at zone
-            if distance < td["data"]["zone_radius"]:
+            if td["targets"].inside((robot_x, robot_y))[current_zone_idx]:
                 if not td["data"]["at_zone"]:
                     td["data"]["at_zone"] = True
                     text = f"Arrived at {zone['name']}. Turn LED ON then OFF!"
@@ -358,28 +350,30 @@ def miniral_scanner_sweep(robot, image, td, user_code=None):
         
         # Update last LED state
         td["data"]["last_led_state"] = led_detected
+    lap("led")
     
     # Draw scanner visualization
     if td["data"]["scanner_active"] and robot and robot.position_px:
         robot_x, robot_y = robot.position_px
         cv2.circle(image, (robot_x, robot_y), 100, (0, 255, 0), 3)
-        cv2.putText(image, "SCANNING...", (robot_x - 60, robot_y - 120),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        put_text(image, "SCANNING...", (robot_x - 60, robot_y - 120),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
     
     # Draw LED status indicator
     if led_detected:
-        cv2.putText(image, "LED: ON", (20, 180), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        put_text(image, "LED: ON", (20, 180), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
     else:
-        cv2.putText(image, "LED: OFF", (20, 180), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (100, 100, 100), 2)
+        put_text(image, "LED: OFF", (20, 180), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (100, 100, 100), 2)
     
     # Draw mission status
     completed_zones = sum(td["data"]["zone_scanned"])
-    cv2.putText(image, f"Zones Surveyed: {completed_zones}/5", 
-                (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
-    cv2.putText(image, f"Current: {td['data']['zones'][td['data']['current_zone']]['name'] if td['data']['current_zone'] < 5 else 'Complete'}", 
-                (20, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
-    cv2.putText(image, f"Time: {td['end_time'] - current_time:.1f}s", 
-                (20, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    put_text(image, f"Zones Surveyed: {completed_zones}/5", 
+            (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
+    put_text(image, f"Current: {td['data']['zones'][td['data']['current_zone']]['name'] if td['data']['current_zone'] < 5 else 'Complete'}", 
+            (20, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+    put_text(image, f"Time: {td['end_time'] - current_time:.1f}s", 
+            (20, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    lap("drawing")
     
     # Check completion
     if not td.get("finished", False):
@@ -400,10 +394,17 @@ def miniral_scanner_sweep(robot, image, td, user_code=None):
     else:
         if current_time - td["finish_time"] >= 2:
             pass
+    lap("verdict")
     
     return image, td, text, result
 
 
+# e.g. "Voltage: 23.40V, Charging: 12.34"
+DOCKING_MESSAGES = Grammar([
+    Shape("charging", r"(?s)Charging:(?P<value>.*?)(?=Charging:|\Z)", value=float),
+])
+
+
 def docking(robot, image, td, user_code=None):
     """
     Auto-dock verification - robot must achieve charging >= 10
@@ -415,15 +416,16 @@ def docking(robot, image, td, user_code=None):
     }
     text = "Move backward to find charging station!"
     
-    image = robot.draw_info(image)
+    image = draw_info(robot, image)
     
     if not td:
         td = {
             "start_time": time.time(),
             "end_time": time.time() + 30,  # 30 seconds timeout
+            "inbox": MessageInbox(),
             "data": {
                 "charging_detected": False,
-                "max_charging": 0,
+                "charging": Series(),
                 "current_charging": 0,
                 "detection_time": None,
                 "task_completed": False
@@ -435,22 +437,13 @@ def docking(robot, image, td, user_code=None):
     current_time = time.time()
     
     # Get charging status from robot messages
-    msg = robot.get_msg()
-    if msg:
-        # Try to parse charging value from message
-        # Assuming format like "Voltage: 23.40V, Charging: 12.34"
-        try:
-            if "Charging:" in str(msg):
-                charging_str = str(msg).split("Charging:")[1].strip()
-                td["data"]["current_charging"] = float(charging_str)
-        except:
-            pass
-    
-    # Update maximum charging seen
-    if td["data"]["current_charging"] > td["data"]["max_charging"]:
-        td["data"]["max_charging"] = td["data"]["current_charging"]
+    for stamp, msg in td["inbox"].poll_timed(robot):
+        charging = DOCKING_MESSAGES.parse(str(msg), stamp)
+        if charging is not None:
+            td["data"]["current_charging"] = charging["value"]
+            td["data"]["charging"].append(charging["value"], stamp)
     # Draw robot position
-    if robot and robot.position_px:
+    if image is not None and robot and robot.position_px:
         robot_x, robot_y = robot.position_px
         circle_color = (0, 255, 0) if td["data"]["current_charging"] >= 10 else (0, 165, 255)
         cv2.circle(image, (robot_x, robot_y), 25, circle_color, 3)
@@ -483,13 +476,15 @@ def docking(robot, image, td, user_code=None):
         elif current_time > td["end_time"]:
             td["finished"] = True
             td["finish_time"] = current_time
+            # the reading starts at 0 before any message
+            max_charging = max(td["data"]["charging"].max or 0, 0)
             result["success"] = False
             result["score"] = 0
             result["description"] = (
                 f"Timeout - Charging station not found. "
-                f"Max charging reached: {td['data']['max_charging']:.2f} (needed: 10.00)"
+                f"Max charging reached: {max_charging:.2f} (needed: 10.00)"
             )
-            text = f"✗ FAILED - Max charging: {td['data']['max_charging']:.2f}"
+            text = f"✗ FAILED - Max charging: {max_charging:.2f}"
     else:
         if current_time - td["finish_time"] >= 2:
             pass  # Keep final state